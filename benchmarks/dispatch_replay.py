@@ -0,0 +1,229 @@
+"""
+Replays a message stream through the old on_message handler and the
+CommandDispatcher, and reports throughput and per message latency.
+
+The stream is a JSON lines file, one message per line:
+    {"content": "!s btc eth", "server": "1234", "author": "42", "bot": false,
+     "prefix": "!"}
+"prefix" is only given for servers with their own prefix.
+A stream can be recorded from a live bot or generated with --generate.
+
+Usage:
+    python benchmarks/dispatch_replay.py --generate 50000 > stream.jsonl
+    python benchmarks/dispatch_replay.py stream.jsonl
+"""
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from cogs.modules.command_dispatcher import CommandDispatcher
+from discord.ext import commands
+import argparse
+import asyncio
+import discord
+import json
+import random
+import time
+
+
+DEFAULT_PREFIX = "$"
+BOT_ID = "353373501274456065"
+COMMAND_NAMES = [
+    "search", "s", "topfive", "rank", "screen", "stats", "profit", "p",
+    "profitb", "cc", "cf", "ccb", "cfb", "getp", "addp", "remp", "wl",
+    "watch", "unwatch", "addc", "remc", "getc", "sub", "unsub", "adda",
+    "rema", "geta", "profile", "updates", "donate", "info"
+]
+COINS = ["btc", "eth", "bitcoin", "ethereum", "xrp", "ltc", "doge", "ada",
+         "sol", "link", "etherium", "bitcoin-cash"]
+CHATTER = ["gm", "anyone know why btc is dumping?", "lol", "to the moon",
+           "what's the bot prefix", "$$$ incoming", "brb", "nice"]
+
+
+class Message:
+    """The parts of discord.Message the handlers read"""
+
+    def __init__(self, record, servers):
+        self.content = record["content"]
+        self.author = discord.User(username="user", id=record["author"],
+                                   discriminator="0001",
+                                   bot=record.get("bot", False))
+        self.server = servers.get(record.get("server"))
+        self.channel = None
+
+
+class Server:
+    def __init__(self, server_id):
+        self.id = server_id
+
+
+def make_bot():
+    """
+    Makes a bot with a do-nothing command for every bot command, so the
+    benchmark times routing and parsing, not the commands
+    """
+    bot = commands.Bot(command_prefix=DEFAULT_PREFIX)
+    bot.remove_command("help")
+    bot.connection.user = discord.User(username="bot", id=BOT_ID,
+                                       discriminator="0001", bot=True)
+
+    def make_command(name):
+        async def command(ctx, *args):
+            pass
+        return commands.Command(name, command, pass_context=True)
+
+    for name in COMMAND_NAMES:
+        bot.add_command(make_command(name))
+    return bot
+
+
+def legacy_handler(bot, prefix_list):
+    """
+    The on_message handler and process_cmd from before the dispatcher
+    """
+    async def process_cmd(message):
+        if message.content.startswith(DEFAULT_PREFIX):
+            cmd_input = message.content[1:].split(' ')
+            if cmd_input[0] not in bot.commands:
+                if cmd_input[0] != '':
+                    cmd_input.insert(0, "{}s".format(DEFAULT_PREFIX))
+                    message.content = ' '.join(cmd_input)
+            await bot.process_commands(message)
+
+    async def on_message(message):
+        if not message.author.bot:
+            if message.content.startswith("<@" + str(bot.user.id) + ">"):
+                return
+            try:
+                if message.server.id in prefix_list:
+                    server_prefix = prefix_list[message.server.id]
+                    if not message.content.startswith(server_prefix):
+                        return
+                    message.content = message.content.replace(server_prefix,
+                                                              DEFAULT_PREFIX,
+                                                              1)
+                await process_cmd(message)
+            except AttributeError:
+                await process_cmd(message)
+    return on_message
+
+
+class NullOutbound:
+    """Drops replies, the benchmark doesn't time sending"""
+
+    async def send(self, destination=None, content=None, embed=None, priority=0):
+        pass
+
+
+def dispatcher_handler(bot, prefix_list):
+    """
+    CommandDispatcher.on_message, the handler bot.py uses, without rate
+    limits so every command of the stream is routed
+    """
+    dispatcher = CommandDispatcher(bot, prefix_list, DEFAULT_PREFIX, outbound=NullOutbound())
+    return dispatcher.on_message
+
+
+def generate(count, seed=1):
+    """
+    Generates a stream with the mix seen in busy servers: mostly
+    chatter, then coin shortcuts, searches and other commands
+
+    @param count - number of messages
+    @return - list of message records
+    """
+    rng = random.Random(seed)
+    servers = [str(1000 + i) for i in range(50)]
+    records = []
+    for _ in range(count):
+        server = rng.choice(servers)
+        # every fifth server has its own prefix
+        prefix = "!" if int(server) % 5 == 0 else DEFAULT_PREFIX
+        roll = rng.random()
+        if roll < 0.6:
+            content = rng.choice(CHATTER)
+        elif roll < 0.8:
+            content = prefix + rng.choice(COINS)
+        elif roll < 0.9:
+            content = "{}s {} {}".format(prefix, rng.choice(COINS), rng.choice(COINS))
+        else:
+            content = "{}{} {}".format(prefix, rng.choice(COMMAND_NAMES), rng.choice(COINS))
+        record = {"content": content,
+                  "server": server,
+                  "author": str(rng.randrange(10 ** 6)),
+                  "bot": rng.random() < 0.02}
+        if prefix != DEFAULT_PREFIX:
+            record["prefix"] = prefix
+        records.append(record)
+    return records
+
+
+def replay(handler, records, servers):
+    """
+    Replays records through a handler
+
+    @return - (messages per second, latencies in seconds)
+    """
+    loop = asyncio.get_event_loop()
+    messages = [Message(record, servers) for record in records]
+    latencies = []
+
+    async def run():
+        for message in messages:
+            start = time.perf_counter()
+            await handler(message)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    loop.run_until_complete(run())
+    elapsed = time.perf_counter() - start
+    return len(messages) / elapsed, latencies
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("stream", nargs="?", help="JSON lines message stream")
+    parser.add_argument("--generate", type=int, metavar="N",
+                        help="print a generated stream of N messages and exit")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="replays per handler, the best one is reported")
+    args = parser.parse_args()
+    if args.generate:
+        for record in generate(args.generate):
+            print(json.dumps(record))
+        return
+    if args.stream:
+        with open(args.stream) as stream:
+            records = [json.loads(line) for line in stream if line.strip()]
+    else:
+        records = generate(20000)
+    server_ids = {record.get("server") for record in records}
+    servers = {server_id: Server(server_id) for server_id in server_ids if server_id}
+    prefix_list = {record["server"]: record["prefix"] for record in records
+                   if record.get("prefix")}
+    print("{:,} messages".format(len(records)))
+    for name, make_handler in (("before (on_message + process_cmd)", legacy_handler),
+                               ("after (CommandDispatcher)", dispatcher_handler)):
+        best = None
+        for _ in range(args.repeat):
+            bot = make_bot()
+            result = replay(make_handler(bot, prefix_list), records, servers)
+            bot.http.session.close()
+            if best is None or result[0] > best[0]:
+                best = result
+        throughput, latencies = best
+        print("{:36} {:>9,.0f} msg/s  p50 {:6.1f} us  p99 {:6.1f} us".format(
+            name,
+            throughput,
+            percentile(latencies, 0.5) * 1e6,
+            percentile(latencies, 0.99) * 1e6))
+
+
+if __name__ == "__main__":
+    main()
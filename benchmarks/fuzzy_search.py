@@ -0,0 +1,236 @@
+"""
+Measures how often FuzzySearch suggests the right coin for a labelled
+set of real-world misspellings, how often it suggests anything for
+ordinary chat words caught by the "$word" search shortcut, and how
+long a lookup takes. Sweeps the similarity threshold and the candidate
+cap, the two knobs that trade recall against noise and latency.
+
+The market is a saved listings response, e.g.
+    curl -H "X-CMC_PRO_API_KEY: <key>" \\
+        "https://pro-api.coinmarketcap.com/v1/cryptocurrency/listings/latest?limit=5000" \\
+        > listings.json
+Without one, the top coins below are padded with generated names up to
+--coins. Typos whose coin isn't in the market are left out.
+
+Usage:
+    python benchmarks/fuzzy_search.py
+    python benchmarks/fuzzy_search.py --listings listings.json
+"""
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from cogs.modules.fuzzy_search import FuzzySearch
+from cogs.modules.market_table import MarketTable, parse_listings
+import argparse
+import random
+import time
+
+
+TOP_COINS = [
+    ("bitcoin", "Bitcoin", "BTC"), ("ethereum", "Ethereum", "ETH"),
+    ("tether", "Tether", "USDT"), ("bnb", "BNB", "BNB"), ("xrp", "XRP", "XRP"),
+    ("usd-coin", "USD Coin", "USDC"), ("cardano", "Cardano", "ADA"),
+    ("dogecoin", "Dogecoin", "DOGE"), ("solana", "Solana", "SOL"), ("tron", "TRON", "TRX"),
+    ("polkadot-new", "Polkadot", "DOT"), ("polygon", "Polygon", "MATIC"),
+    ("litecoin", "Litecoin", "LTC"), ("shiba-inu", "Shiba Inu", "SHIB"),
+    ("avalanche", "Avalanche", "AVAX"), ("multi-collateral-dai", "Dai", "DAI"),
+    ("wrapped-bitcoin", "Wrapped Bitcoin", "WBTC"), ("uniswap", "Uniswap", "UNI"),
+    ("chainlink", "Chainlink", "LINK"), ("monero", "Monero", "XMR"),
+    ("ethereum-classic", "Ethereum Classic", "ETC"), ("stellar", "Stellar", "XLM"),
+    ("bitcoin-cash", "Bitcoin Cash", "BCH"), ("cosmos", "Cosmos", "ATOM"),
+    ("filecoin", "Filecoin", "FIL"), ("hedera", "Hedera", "HBAR"), ("aptos", "Aptos", "APT"),
+    ("cronos", "Cronos", "CRO"), ("vechain", "VeChain", "VET"),
+    ("near-protocol", "NEAR Protocol", "NEAR"), ("algorand", "Algorand", "ALGO"),
+    ("quant", "Quant", "QNT"), ("the-graph", "The Graph", "GRT"), ("aave", "Aave", "AAVE"),
+    ("eos", "EOS", "EOS"), ("tezos", "Tezos", "XTZ"), ("the-sandbox", "The Sandbox", "SAND"),
+    ("decentraland", "Decentraland", "MANA"), ("theta-network", "Theta Network", "THETA"),
+    ("multiversx-egld", "MultiversX", "EGLD"), ("fantom", "Fantom", "FTM"),
+    ("axie-infinity", "Axie Infinity", "AXS"), ("bitcoin-sv", "Bitcoin SV", "BSV"),
+    ("iota", "IOTA", "MIOTA"), ("neo", "Neo", "NEO"), ("zcash", "Zcash", "ZEC"),
+    ("dash", "Dash", "DASH"), ("maker", "Maker", "MKR"),
+    ("pancakeswap", "PancakeSwap", "CAKE"), ("curve-dao-token", "Curve DAO Token", "CRV"),
+    ("kucoin-token", "KuCoin Token", "KCS"), ("synthetix", "Synthetix", "SNX"),
+    ("nem", "NEM", "XEM"), ("waves", "Waves", "WAVES"), ("qtum", "Qtum", "QTUM"),
+    ("zilliqa", "Zilliqa", "ZIL"), ("enjin-coin", "Enjin Coin", "ENJ"),
+    ("basic-attention-token", "Basic Attention Token", "BAT"), ("decred", "Decred", "DCR"),
+    ("ravencoin", "Ravencoin", "RVN"), ("harmony", "Harmony", "ONE"), ("holo", "Holo", "HOT"),
+    ("siacoin", "Siacoin", "SC"), ("digibyte", "DigiByte", "DGB"), ("verge", "Verge", "XVG"),
+    ("nano", "Nano", "XNO"), ("ontology", "Ontology", "ONT"), ("icon", "ICON", "ICX"),
+    ("lisk", "Lisk", "LSK"), ("stratis", "Stratis", "STRAX"), ("golem", "Golem", "GLM"),
+    ("0x", "0x", "ZRX"), ("omisego", "OMG Network", "OMG"), ("pepe", "Pepe", "PEPE"),
+    ("arbitrum", "Arbitrum", "ARB"), ("optimism-ethereum", "Optimism", "OP"),
+    ("internet-computer", "Internet Computer", "ICP"), ("kaspa", "Kaspa", "KAS"),
+    ("render", "Render", "RNDR"), ("injective", "Injective", "INJ"), ("sui", "Sui", "SUI"),
+    ("toncoin", "Toncoin", "TON"), ("stacks", "Stacks", "STX"),
+    ("immutable-x", "Immutable", "IMX"), ("mina", "Mina", "MINA"), ("gala", "Gala", "GALA"),
+    ("chiliz", "Chiliz", "CHZ")
+]
+
+# misspelling -> slug of the coin that was meant
+TYPOS = {
+    "etherium": "ethereum", "etherum": "ethereum", "ethereun": "ethereum",
+    "bitcon": "bitcoin", "bitcoing": "bitcoin", "bitcion": "bitcoin", "btcoin": "bitcoin",
+    "litcoin": "litecoin", "lightcoin": "litecoin", "litecion": "litecoin",
+    "cardona": "cardano", "cardanno": "cardano", "dogcoin": "dogecoin",
+    "dodgecoin": "dogecoin", "dogecion": "dogecoin", "salana": "solana", "solanna": "solana",
+    "polkadott": "polkadot-new", "polkadat": "polkadot-new", "chainlnk": "chainlink",
+    "chianlink": "chainlink", "chain link": "chainlink", "monaro": "monero",
+    "monero coin": "monero", "steller": "stellar", "stellar lumens": "stellar",
+    "tehter": "tether", "teather": "tether", "ripple xrp": "xrp", "shiba": "shiba-inu",
+    "shibainu": "shiba-inu", "shiba inu coin": "shiba-inu", "avalance": "avalanche",
+    "avalanch": "avalanche", "uniswapp": "uniswap", "unswap": "uniswap", "cosmo": "cosmos",
+    "filecion": "filecoin", "file coin": "filecoin", "hedra": "hedera",
+    "algorithm": "algorand", "algorand coin": "algorand", "vechian": "vechain",
+    "ve chain": "vechain", "tezoz": "tezos", "decentraland mana": "decentraland",
+    "decentraleand": "decentraland", "fantomm": "fantom", "axie infinty": "axie-infinity",
+    "zcach": "zcash", "z cash": "zcash", "pancake swap": "pancakeswap",
+    "pancakeswp": "pancakeswap", "synthetics": "synthetix", "zilliqua": "zilliqa",
+    "ziliqa": "zilliqa", "raven coin": "ravencoin", "ravencion": "ravencoin",
+    "digibite": "digibyte", "harmoney": "harmony", "ontolgy": "ontology",
+    "ethereum clasic": "ethereum-classic", "bitcoin cach": "bitcoin-cash",
+    "bitcoincash": "bitcoin-cash", "wraped bitcoin": "wrapped-bitcoin",
+    "polygone": "polygon", "polgon": "polygon", "maticc": "polygon",
+    "arbitrium": "arbitrum", "optimisim": "optimism-ethereum",
+    "internet computor": "internet-computer", "kaspaa": "kaspa", "injectiv": "injective",
+    "toncion": "toncoin", "imutable": "immutable-x", "chilliz": "chiliz",
+    "cronoss": "cronos", "aptoss": "aptos", "near protocal": "near-protocol",
+    "the grapgh": "the-graph", "sandbox": "the-sandbox",
+    "basic attention": "basic-attention-token", "enjin": "enjin-coin",
+    "kucoin": "kucoin-token", "curve dao": "curve-dao-token"
+}
+
+# chat that starts with the prefix and reaches $search, nothing should be suggested
+CHATTER = [
+    "hello", "lol", "price", "moon", "help me", "when lambo", "test", "thanks",
+    "wow", "rekt", "pump", "dump", "hodl", "fomo", "scam", "bruh", "nope", "money",
+    "profit", "anyone", "what", "why", "buy", "sell", "dip", "crash", "gains", "nice",
+    "good morning", "whats up", "going up", "to the moon", "wen", "gg", "ok", "yes"
+]
+
+THRESHOLDS = [0.3, 0.35, 0.4, 0.45, 0.5, 0.55, 0.6]
+CAPS = [50, 100, 200, 400, 800, None]
+SYLLABLES = ["ba", "ko", "ri", "zen", "lu", "ta", "mo", "vex", "qi", "dra", "sol", "nix",
+             "por", "ael", "tu", "gri", "fy", "chai", "meta", "nova", "byte", "flux",
+             "coin", "swap", "chain", "verse", "dao"]
+
+
+def make_market(count, seed=7):
+    """
+    Makes a market of the top coins and generated names
+
+    @param count - number of coins
+    @param seed - random seed of the generated names
+    @return - MarketTable, market cap by rank
+    """
+    rand = random.Random(seed)
+    coins = list(TOP_COINS)
+    slugs = {coin[0] for coin in coins}
+    while len(coins) < count:
+        slug = "".join(rand.choice(SYLLABLES) for _ in range(rand.randint(2, 4)))
+        if slug not in slugs:
+            slugs.add(slug)
+            coins.append((slug, slug.title(), slug[:rand.randint(3, 5)].upper()))
+    market = MarketTable()
+    for rank, (slug, name, symbol) in enumerate(coins, 1):
+        market.append({"id": rank, "cmc_rank": rank, "slug": slug, "name": name,
+                       "symbol": symbol, "circulating_supply": 1, "total_supply": 1,
+                       "max_supply": None, "last_updated": "",
+                       "quote": {"USD": {"price": 1.0, "volume_24h": 1.0,
+                                         "market_cap": 1e12 / rank,
+                                         "percent_change_1h": 0,
+                                         "percent_change_24h": 0,
+                                         "percent_change_7d": 0}}})
+    return market
+
+
+def load_market(path):
+    """
+    @param path - saved listings response
+    @return - MarketTable
+    """
+    with open(path, "rb") as listings:
+        return parse_listings(iter(lambda: listings.read(64 * 1024), b""))
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def evaluate(search, typos, repeat):
+    """
+    Runs every typo and chat word through a search
+
+    @param search - FuzzySearch indexed with the market
+    @param typos - misspelling -> slug meant
+    @param repeat - lookups per query, the fastest one counts
+    @return - top 1 recall, top 5 recall, share of chatter with
+              suggestions, lookup latencies in microseconds
+    """
+    first = top = 0
+    latencies = []
+    for query, slug in typos.items():
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            suggestions = search.suggest(query)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        latencies.append(best * 1e6)
+        first += bool(suggestions) and suggestions[0] == slug
+        top += slug in suggestions
+    noisy = sum(1 for word in CHATTER if search.suggest(word))
+    return (first / len(typos), top / len(typos), noisy / len(CHATTER), latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--listings", help="saved listings response to search")
+    parser.add_argument("--coins", type=int, default=5000,
+                        help="market size without --listings")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    if args.listings:
+        market = load_market(args.listings)
+    else:
+        market = make_market(args.coins)
+    typos = {query: slug for query, slug in TYPOS.items() if slug in market}
+    search = FuzzySearch()
+    start = time.perf_counter()
+    search.update(market)
+    build = time.perf_counter() - start
+    search.market_list = None
+    start = time.perf_counter()
+    search.update(market)
+    update = time.perf_counter() - start
+    print("{} coins, {} terms, {} of {} typos in the market".format(len(market),
+                                                                    len(search.term_slugs),
+                                                                    len(typos), len(TYPOS)))
+    print("index build {:.1f} ms, update without changes {:.1f} ms\n".format(build * 1000,
+                                                                             update * 1000))
+    row = "{:<11}{:>8}{:>8}{:>9}{:>10}{:>10}{:>10}"
+    print(row.format("Threshold", "Top 1", "Top 5", "Chatter", "Median us", "P95 us", "Max us"))
+    for threshold in THRESHOLDS:
+        search.threshold = threshold
+        first, top, noisy, latencies = evaluate(search, typos, args.repeat)
+        print(row.format(threshold, "{:.0%}".format(first), "{:.0%}".format(top),
+                         "{:.0%}".format(noisy), "{:.0f}".format(percentile(latencies, 0.5)),
+                         "{:.0f}".format(percentile(latencies, 0.95)),
+                         "{:.0f}".format(max(latencies))))
+    search.threshold = FuzzySearch().threshold
+    print()
+    print(row.format("Candidates", "Top 1", "Top 5", "Chatter", "Median us", "P95 us", "Max us"))
+    for cap in CAPS:
+        search.max_candidates = cap
+        first, top, noisy, latencies = evaluate(search, typos, args.repeat)
+        print(row.format("all" if cap is None else cap, "{:.0%}".format(first),
+                         "{:.0%}".format(top), "{:.0%}".format(noisy),
+                         "{:.0f}".format(percentile(latencies, 0.5)),
+                         "{:.0f}".format(percentile(latencies, 0.95)),
+                         "{:.0f}".format(max(latencies))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Times IndicatorEngine.update, the per refresh indicator work, on the
+stand-in server's listings:
+
+- first: the first refresh, every coin gets its state rows
+- full: a full refresh one period after the last one
+- hot: a refresh of the top coins only
+- gap: a full refresh after the given hours without one, every coin
+  carries its last price over the gap
+
+Usage:
+    python benchmarks/indicators.py
+    python benchmarks/indicators.py --coins 20000 --gap-hours 6
+"""
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from cogs.modules.indicators import IndicatorEngine
+from cogs.modules.market_table import MarketTable, parse_listings
+from standin_server import StandInData
+from array import array
+import argparse
+import json
+import random
+import time
+
+RESOLUTION = 300
+
+
+def make_table(coins):
+    data = StandInData(coins)
+    return parse_listings([json.dumps(data.get_listings(1, coins)).encode()])
+
+
+def drifted(table, rand):
+    """
+    Returns a copy of a table with every price moved a little, like the
+    next refresh
+    """
+    numbers = {field: array('d', column) for field, column in table.numbers.items()}
+    numbers["price"] = array('d', (price * (1 + rand.gauss(0, 0.01))
+                                   for price in table.numbers["price"]))
+    return MarketTable(numbers, table.strings)
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return (time.perf_counter() - start) * 1000
+
+
+def warmed_up(table, rand, period):
+    """
+    @return - engine with every coin past its warm up, the next period
+    """
+    engine = IndicatorEngine(resolution=RESOLUTION)
+    for _ in range(engine.period + 2):
+        table = drifted(table, rand)
+        engine.update(table, period * RESOLUTION)
+        period += 1
+    return engine, period
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--coins", type=int, default=5000)
+    parser.add_argument("--hot-coins", type=int, default=200)
+    parser.add_argument("--gap-hours", type=int, default=6)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    table = make_table(args.coins)
+    rand = random.Random(1)
+    hot_coins = list(table.column("slug"))[:args.hot_coins]
+    gap = args.gap_hours * 3600 // RESOLUTION
+    first, full, hot, gapped = [], [], [], []
+    for _ in range(args.repeat):
+        engine = IndicatorEngine(resolution=RESOLUTION)
+        first.append(timed(lambda: engine.update(table, 0)))
+        engine, period = warmed_up(table, rand, 0)
+        table = drifted(table, rand)
+        full.append(timed(lambda: engine.update(table, period * RESOLUTION)))
+        period += 1
+        table = drifted(table, rand)
+        hot.append(timed(lambda: engine.update(table, period * RESOLUTION, hot_coins)))
+        period += gap
+        table = drifted(table, rand)
+        gapped.append(timed(lambda: engine.update(table, period * RESOLUTION)))
+    print("{:,} coins, best of {}\n".format(args.coins, args.repeat))
+    print("First refresh                      {:>8.1f} ms".format(min(first)))
+    print("Full refresh                       {:>8.1f} ms".format(min(full)))
+    print("Hot refresh, {:>4} coins            {:>8.2f} ms".format(args.hot_coins, min(hot)))
+    print("Full refresh after {:>2}h             {:>8.1f} ms".format(args.gap_hours,
+                                                                   min(gapped)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Times the work every market refresh does before anything is posted:
+parsing the listings response, recording the price history and
+scanning for anomalies. The listings come from the stand-in server's
+data generator.
+
+- parse: the streamed parse into a MarketTable against the old
+  json.loads of the whole body into a dict by slug, with the peak of
+  Python memory allocated by each (tracemalloc)
+- history: recording a full refresh into the memory mapped history,
+  the first time (rows are added) and after, plus one lookup
+- anomalies: a full refresh and a hot refresh of the top coins, once
+  every coin has a full baseline
+
+Usage:
+    python benchmarks/market_refresh.py
+    python benchmarks/market_refresh.py --coins 20000
+"""
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from cogs.modules.anomaly_scanner import AnomalyScanner
+from cogs.modules.market_table import MarketTable, parse_listings
+from cogs.modules.price_history import PriceHistory
+from standin_server import StandInData
+from array import array
+import argparse
+import json
+import random
+import tempfile
+import time
+import timeit
+import tracemalloc
+
+CHUNK_SIZE = 64 * 1024  # coin_market.STREAM_CHUNK_SIZE
+RESOLUTION = 300
+
+
+def make_payload(coins):
+    """
+    @return - listings response body of `coins` coins
+    """
+    data = StandInData(coins)
+    return json.dumps(data.get_listings(1, coins)).encode()
+
+
+def chunked(payload):
+    return (payload[i:i + CHUNK_SIZE] for i in range(0, len(payload), CHUNK_SIZE))
+
+
+def parse_whole(payload):
+    """
+    What the bot did before streaming: the body read in full, decoded,
+    then a dict by slug
+    """
+    body = b"".join(chunked(payload))
+    listings = json.loads(body.decode("utf-8"))
+    return {coin["slug"]: coin for coin in listings["data"]}
+
+
+def parse_streamed(payload):
+    return parse_listings(chunked(payload))
+
+
+def measure(func, payload, repeat):
+    """
+    @return - best time in milliseconds, peak memory in MiB
+    """
+    best = min(timeit.repeat(lambda: func(payload), number=1, repeat=repeat))
+    tracemalloc.start()
+    func(payload)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best * 1000, peak / 2 ** 20
+
+
+def drifted(table, rand):
+    """
+    Returns a copy of a table with every price moved a little, like the
+    next refresh
+    """
+    numbers = {field: array('d', column) for field, column in table.numbers.items()}
+    numbers["price"] = array('d', (price * (1 + rand.gauss(0, 0.01))
+                                   for price in table.numbers["price"]))
+    return MarketTable(numbers, table.strings)
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return (time.perf_counter() - start) * 1000
+
+
+def bench_history(table, repeat):
+    with tempfile.TemporaryDirectory() as directory:
+        history = PriceHistory(os.path.join(directory, "history.bin"),
+                               RESOLUTION, max_coins=len(table))
+        first = timed(lambda: history.record(table, 0))
+        later = min(timed(lambda: history.record(table, RESOLUTION * run))
+                    for run in range(1, repeat + 1))
+        ids = [int(coin_id) for coin_id in table.column("id")]
+        rand = random.Random(1)
+        sample = [rand.choice(ids) for _ in range(10000)]
+        lookups = min(timeit.repeat(lambda: [history.lookup(coin_id, RESOLUTION)
+                                             for coin_id in sample],
+                                    number=1, repeat=repeat))
+        # the column views keep the map open until the history is collected
+        del history
+    return first, later, lookups / len(sample) * 1e6
+
+
+def bench_anomalies(table, repeat, hot_count):
+    scanner = AnomalyScanner(resolution=RESOLUTION)
+    rand = random.Random(1)
+    period = 0
+    # a full baseline of returns for every coin
+    for _ in range(scanner.window + 2):
+        table = drifted(table, rand)
+        scanner.scan(table, period * RESOLUTION)
+        period += 1
+    full = []
+    for _ in range(repeat):
+        table = drifted(table, rand)
+        full.append(timed(lambda: scanner.scan(table, period * RESOLUTION)))
+        period += 1
+    hot_coins = list(table.column("slug"))[:hot_count]
+    hot = []
+    for _ in range(repeat):
+        table = drifted(table, rand)
+        hot.append(timed(lambda: scanner.scan(table, period * RESOLUTION, hot_coins)))
+        period += 1
+    return min(full), min(hot)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--coins", type=int, default=5000)
+    parser.add_argument("--hot-coins", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    payload = make_payload(args.coins)
+    print("{:,} coins, {:.1f} MB listings response\n".format(args.coins, len(payload) / 1e6))
+    print("{:<34}{:>10}{:>14}".format("Parse", "ms", "peak MiB"))
+    for name, func in (("json.loads + dict by slug", parse_whole),
+                       ("streamed into a MarketTable", parse_streamed)):
+        elapsed, peak = measure(func, payload, args.repeat)
+        print("{:<34}{:>10.1f}{:>14.1f}".format(name, elapsed, peak))
+    table = parse_streamed(payload)
+    first, later, lookup = bench_history(table, args.repeat)
+    print("\nHistory record, first refresh      {:>8.1f} ms".format(first))
+    print("History record, later refreshes    {:>8.1f} ms".format(later))
+    print("History lookup                     {:>8.2f} us".format(lookup))
+    full, hot = bench_anomalies(table, args.repeat, args.hot_coins)
+    print("\nAnomaly scan, full refresh         {:>8.1f} ms".format(full))
+    print("Anomaly scan, {:>4} hot coins       {:>8.2f} ms".format(args.hot_coins, hot))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Times the per-fiat formatters against the inline formatting CoinMarket
+did before them, on a market-sized column of prices, caps and supplies,
+one value at a time and a whole column at once (what CoinMarket does
+once per refresh and fiat). Every side is checked to give the same text
+before it is timed.
+
+Usage:
+    python benchmarks/number_format.py
+    python benchmarks/number_format.py --coins 5000 --fiats USD SEK CHF
+"""
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from cogs.modules.number_format import (fiat_currencies, fiat_suffix, format_count,
+                                        format_counts, get_formatter)
+import argparse
+import random
+import timeit
+
+
+def baseline_price(price, fiat):
+    converted_price = "{:,.6f}".format(price).rstrip('0')
+    if converted_price.endswith('.'):
+        converted_price = converted_price.replace('.', '')
+    if fiat in fiat_suffix:
+        return '{} {}'.format(converted_price, fiat_currencies[fiat])
+    return '{}{}'.format(fiat_currencies[fiat], converted_price)
+
+
+def baseline_amount(amount, fiat):
+    if fiat in fiat_suffix:
+        return '{:,} {}'.format(int(amount), fiat_currencies[fiat])
+    return '{}{:,}'.format(fiat_currencies[fiat], int(amount))
+
+
+def baseline_format_price(price, fiat):
+    if fiat in fiat_suffix:
+        formatted_fiat = "{:,.6f} {}".format(float(price), fiat_currencies[fiat])
+    else:
+        formatted_fiat = "{}{:,.6f}".format(fiat_currencies[fiat], float(price))
+    formatted_fiat = formatted_fiat.rstrip('0')
+    if formatted_fiat.endswith('.'):
+        formatted_fiat = formatted_fiat.replace('.', '')
+    return formatted_fiat
+
+
+def baseline_count(value):
+    return '{:,}'.format(int(float(value)))
+
+
+def make_market(count, seed=1):
+    """
+    Makes prices, caps and supplies spread like a coin listing's
+
+    @param count - number of coins
+    @param seed - random seed
+    @return - prices, market caps, supplies
+    """
+    rand = random.Random(seed)
+    prices = [10 ** rand.uniform(-8, 5) for _ in range(count)]
+    supplies = [10 ** rand.uniform(5, 12) for _ in range(count)]
+    caps = [price * supply for price, supply in zip(prices, supplies)]
+    return prices, caps, supplies
+
+
+def best_time(func, values, repeat):
+    """
+    @return - best time of formatting every value once, in milliseconds
+    """
+    run = lambda: [func(value) for value in values]
+    return min(timeit.repeat(run, number=1, repeat=repeat)) * 1000
+
+
+def best_column_time(func, values, repeat):
+    """
+    @return - best time of formatting the whole column at once, in
+              milliseconds
+    """
+    return min(timeit.repeat(lambda: func(values), number=1, repeat=repeat)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--coins", type=int, default=5000)
+    parser.add_argument("--fiats", nargs="+", default=["USD", "SEK", "CHF"])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    prices, caps, supplies = make_market(args.coins)
+    row = "{:<6}{:<14}{:>10}{:>10}{:>11}{:>9}"
+    print(row.format("Fiat", "Field", "Old ms", "New ms", "Column ms", "Speedup"))
+    row = "{:<6}{:<14}{:>10.2f}{:>10.2f}{:>11.2f}{:>9.2f}"
+    for fiat in args.fiats:
+        formatter = get_formatter(fiat)
+        cases = (("price", prices, lambda p: baseline_price(p, fiat),
+                  formatter.price, formatter.prices),
+                 ("format_price", prices, lambda p: baseline_format_price(p, fiat),
+                  formatter.quote, formatter.quotes),
+                 ("market cap", caps, lambda c: baseline_amount(c, fiat),
+                  formatter.amount, formatter.amounts))
+        for field, values, old, new, column in cases:
+            assert list(map(old, values)) == list(map(new, values)) == column(values)
+            old_ms = best_time(old, values, args.repeat)
+            new_ms = best_time(new, values, args.repeat)
+            column_ms = best_column_time(column, values, args.repeat)
+            print(row.format(fiat, field, old_ms, new_ms, column_ms, old_ms / column_ms))
+    assert list(map(baseline_count, supplies)) == format_counts(supplies)
+    old_ms = best_time(baseline_count, supplies, args.repeat)
+    new_ms = best_time(format_count, supplies, args.repeat)
+    column_ms = best_column_time(format_counts, supplies, args.repeat)
+    print(row.format("", "supply", old_ms, new_ms, column_ms, old_ms / column_ms))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Times $screen queries on the stand-in server's listings: the first run
+of a query after a refresh, the same query again (served from the
+results kept for the refresh), and the same filters as a Python loop
+over the listings as dicts, the way the market list used to be kept.
+
+Usage:
+    python benchmarks/screener.py
+    python benchmarks/screener.py --coins 20000 --query "change24h>5 rank<500"
+"""
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from cogs.modules.market_table import parse_listings
+from cogs.modules.screener import Screener
+from standin_server import StandInData
+import argparse
+import heapq
+import json
+import math
+import timeit
+
+DEFAULT_QUERY = "change24h>1 volume>5e5 rank<3000 sort=volume limit=10"
+
+
+def get_value(coin, field):
+    if field in coin:
+        return coin[field]
+    return coin["quote"]["USD"][field]
+
+
+def screen_dicts(coins, parsed):
+    """
+    The query as a loop over the listings
+    """
+    filters, sort_field, descending, limit, fiat = parsed
+    matches = []
+    for slug, coin in coins.items():
+        key = get_value(coin, sort_field)
+        if key is None or math.isnan(key):
+            continue
+        for field, compare, value in filters:
+            found = get_value(coin, field)
+            if found is None or not compare(found, value):
+                break
+        else:
+            matches.append((key, slug))
+    pick = heapq.nlargest if descending else heapq.nsmallest
+    return [slug for key, slug in pick(limit, matches)]
+
+
+def best(func, number, repeat):
+    """
+    @return - best time per call in milliseconds
+    """
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--coins", type=int, default=10000)
+    parser.add_argument("--query", default=DEFAULT_QUERY)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    listings = StandInData(args.coins).get_listings(1, args.coins)
+    market_list = parse_listings([json.dumps(listings).encode()])
+    coins = {coin["slug"]: coin for coin in listings["data"]}
+    screener = Screener()
+    parsed = screener.parse(args.query)
+    result = screener.screen(market_list, args.query)[0]
+    assert screen_dicts(coins, parsed) == result
+
+    def uncached():
+        screener.results.clear()
+        screener.screen(market_list, args.query)
+
+    print("{:,} coins, query: {}".format(args.coins, args.query))
+    print("{} coins shown\n".format(len(result)))
+    print("Screener, first run               {:>10.2f} ms".format(best(uncached, 10, args.repeat)))
+    print("Screener, cached                  {:>10.4f} ms".format(
+        best(lambda: screener.screen(market_list, args.query), 1000, args.repeat)))
+    print("Loop over listing dicts           {:>10.2f} ms".format(
+        best(lambda: screen_dicts(coins, parsed), 10, args.repeat)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,8 @@
 from discord.ext import commands
 from bot_logger import logger
+from cogs.modules.command_dispatcher import CommandDispatcher
+from cogs.modules.outbound_scheduler import OutboundScheduler
+from cogs.modules.rate_limiter import RateLimiter
 import json
 import logging
 import requests
@@ -37,6 +40,7 @@ class CoinMarketBot:
     @bot.event
     async def on_ready():
         try:
+            outbound.start()
             bot.load_extension(COG_MANAGER)
             update_server_count(len(bot.servers))
         except Exception as e:
@@ -46,36 +50,7 @@ class CoinMarketBot:
 
     @bot.event
     async def on_message(message):
-        if not message.author.bot:
-            if message.content.startswith("<@" + str(bot.user.id) + ">"):
-                try:
-                    if message.server.id in prefix_list:
-                        await bot.send_message(message.channel,
-                                               "The prefix for this bot is `{0}`. "
-                                               "Type `{0}help` for a list of commands."
-                                               "".format(prefix_list[message.server.id]))
-                    else:
-                        await bot.send_message(message.channel,
-                                               "The prefix for this bot is `{0}`. "
-                                               "Type `{0}help` for a list of commands."
-                                               "".format(config_data["cmd_prefix"]))
-                except AttributeError:
-                    await bot.send_message(message.channel,
-                                           "The prefix for this bot is `{0}`. "
-                                           "Type `{0}help` for a list of commands."
-                                           "".format(config_data["cmd_prefix"]))
-            else:
-                try:
-                    if message.server.id in prefix_list:
-                        server_prefix = prefix_list[message.server.id]
-                        if not message.content.startswith(server_prefix):
-                            return
-                        message.content = message.content.replace(server_prefix,
-                                                                  config_data["cmd_prefix"],
-                                                                  1)
-                    await process_cmd(message)
-                except AttributeError:
-                    await process_cmd(message)
+        await dispatcher.on_message(message)
 
     @bot.event
     async def on_command_error(error, ctx):
@@ -85,33 +60,20 @@ class CoinMarketBot:
             await send_cmd_help(ctx)
 
 
-async def process_cmd(message):
-    """
-    Processes command
-    """
-    if message.content.startswith(config_data["cmd_prefix"]):
-        cmd_input = message.content[1:].split(' ')
-        if cmd_input[0] not in bot.commands:
-            if cmd_input[0] != '':
-                cmd_input.insert(0, "{}s".format(config_data["cmd_prefix"]))
-                message.content = ' '.join(cmd_input)
-        await bot.process_commands(message)
-
-
 async def send_cmd_help(ctx):
     if ctx.invoked_subcommand:
         pages = bot.formatter.format_help_for(ctx, ctx.invoked_subcommand)
         for page in pages:
-            await bot.send_message(ctx.message.channel,
-                                   "Please make sure you're entering a valid"
-                                   "command:\n{}".format(page))
+            await outbound.send(ctx.message.channel,
+                                "Please make sure you're entering a valid"
+                                "command:\n{}".format(page))
     else:
         pages = bot.formatter.format_help_for(ctx, ctx.command)
         for page in pages:
-            await bot.send_message(ctx.message.channel,
-                                   "Command failed. Please make sure you're "
-                                   "entering the correct arguments to the "
-                                   "command:\n{}".format(page))
+            await outbound.send(ctx.message.channel,
+                                "Command failed. Please make sure you're "
+                                "entering the correct arguments to the "
+                                "command:\n{}".format(page))
 
 
 def save_prefix_file(prefix_data={}, backup=False):
@@ -205,6 +167,17 @@ async def prefix(ctx, prefix: str):
 
 prefix_list = check_prefix_file()
 save_prefix_file(prefix_list, backup=True)
+rate_limiter = RateLimiter(config_data.get("rate_limits"),
+                           config_data.get("shed_backlog", 50),
+                           config_data.get("rate_limit_warn_interval", 60))
+# shared with the cogs through bot.outbound, so every message the bot
+# posts goes through the same queue and rate limits
+outbound = bot.outbound = OutboundScheduler(bot, config_data.get("outbound_workers", 4))
+dispatcher = CommandDispatcher(bot,
+                               prefix_list,
+                               config_data["cmd_prefix"],
+                               rate_limiter,
+                               outbound)
 
 
 def main():
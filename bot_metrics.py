@@ -0,0 +1,94 @@
+from contextlib import contextmanager
+import time
+
+
+class Metrics:
+    """Keeps counters, gauges and timings reported by the bot"""
+
+    def __init__(self):
+        self.counters = {}
+        self.gauges = {}
+        self.timings = {}
+
+    def incr(self, name, amount=1):
+        """
+        Increments a counter
+
+        @param name - name of the counter
+        @param amount - amount to increment by
+        """
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def set_gauge(self, name, value):
+        """
+        Sets a gauge to its current value
+
+        @param name - name of the gauge
+        @param value - current value
+        """
+        self.gauges[name] = value
+
+    def get_gauge(self, name, default=0):
+        """
+        Returns the current value of a gauge
+
+        @param name - name of the gauge
+        @param default - value returned if the gauge was never set
+        """
+        return self.gauges.get(name, default)
+
+    def observe(self, name, seconds):
+        """
+        Records a duration
+
+        @param name - name of the timing
+        @param seconds - duration in seconds
+        """
+        timing = self.timings.get(name)
+        if timing is None:
+            timing = self.timings[name] = {"count": 0,
+                                           "total": 0.0,
+                                           "max": 0.0,
+                                           "last": 0.0}
+        timing["count"] += 1
+        timing["total"] += seconds
+        timing["last"] = seconds
+        if seconds > timing["max"]:
+            timing["max"] = seconds
+
+    @contextmanager
+    def timer(self, name):
+        """
+        Records how long the wrapped block takes to run
+
+        @param name - name of the timing
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def format(self):
+        """
+        Formats all metrics into readable lines
+
+        @return - formatted metrics
+        """
+        lines = []
+        for name in sorted(self.counters):
+            lines.append("{}: {:,}".format(name, self.counters[name]))
+        for name in sorted(self.gauges):
+            lines.append("{}: {}".format(name, self.gauges[name]))
+        for name in sorted(self.timings):
+            timing = self.timings[name]
+            lines.append("{}: last {:.1f}ms, avg {:.1f}ms, max {:.1f}ms "
+                         "({:,} runs)".format(name,
+                                              timing["last"] * 1000,
+                                              timing["total"] / timing["count"] * 1000,
+                                              timing["max"] * 1000,
+                                              timing["count"]))
+        return "\n".join(lines)
+
+
+metrics = Metrics()
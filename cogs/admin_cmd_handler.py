@@ -88,3 +88,12 @@ class AdminCommands:
         "$togglecal"
         """
         await self.cmd_function.toggle_commands(ctx, CAL_DISABLED)
+
+    @commands.command(name='metrics', pass_context=True)
+    async def metrics(self, ctx):
+        """
+        Displays bot metrics
+        An example for this command would be:
+        "$metrics"
+        """
+        await self.cmd_function.display_metrics(ctx)
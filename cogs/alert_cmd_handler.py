@@ -25,23 +25,22 @@ class AlertCommands:
         """
         await self.cmd_function.alert.add_alert(ctx, currency, operator, price, fiat)
 
-    # @commands.command(name='addab', pass_context=True)
-    # async def addab(self, ctx, currency: str, operator: str, btc_price: float):
-    #     """
-    #     Adds alert for when the btc price of crypto meets the condition given
-    #     An example for this command would be:
-    #     "$addab litecoin > 0.02"
-
-    #     @param currency - cryptocurrency to set an alert of
-    #     @param operator - operator for the given choices
-    #                       <  - less than
-    #                       <= - less than or equal to
-    #                       >  - greater than
-    #                       >= - greater than or equal to
-    #     @param btc_price - btc price for condition to compare
-    #     @param fiat - desired fiat currency (i.e. 'EUR', 'USD')
-    #     """
-    #     await self.cmd_function.alert.add_alert(ctx, currency, operator, btc_price, "USD", btc=True)
+    @commands.command(name='addab', pass_context=True)
+    async def addab(self, ctx, currency: str, operator: str, btc_price: float):
+        """
+        Adds alert for when the btc price of crypto meets the condition given
+        An example for this command would be:
+        "$addab litecoin > 0.02"
+
+        @param currency - cryptocurrency to set an alert of
+        @param operator - operator for the given choices
+                          <  - less than
+                          <= - less than or equal to
+                          >  - greater than
+                          >= - greater than or equal to
+        @param btc_price - btc price for condition to compare
+        """
+        await self.cmd_function.alert.add_alert(ctx, currency, operator, btc_price, "USD", btc=True)
 
     @commands.command(name='addah', pass_context=True)
     async def addahour(self, ctx, currency: str, operator: str, percent: float, fiat='USD'):
@@ -97,6 +96,68 @@ class AlertCommands:
         """
         await self.cmd_function.alert.add_alert(ctx, currency, operator, percent, fiat, week=True)
 
+    @commands.command(name='addac', pass_context=True)
+    async def addacustom(self, ctx, currency: str, window: str, operator: str, percent: float, fiat='USD'):
+        """
+        Adds alert for when percent change of crypto over a custom window
+        meets the condition given. The window is given in minutes (m),
+        hours (h) or days (d).
+        An example for this command would be:
+        "$addac bitcoin 15m >= 2.5"
+
+        @param currency - cryptocurrency to set an alert of
+        @param window - window of the change (i.e. 5m, 15m, 4h)
+        @param operator - operator for the given choices
+                          <  - less than
+                          <= - less than or equal to
+                          >  - greater than
+                          >= - greater than or equal to
+        @param percent - percent of change over the window to compare
+        @param fiat - desired fiat currency (i.e. 'EUR', 'USD')
+        """
+        await self.cmd_function.alert.add_alert(ctx, currency, operator, percent, fiat, window=window)
+
+    @commands.command(name='addai', pass_context=True)
+    async def addaindicator(self, ctx, currency: str, indicator: str, operator: str, value: float, fiat='USD'):
+        """
+        Adds alert for when an indicator of crypto meets the condition given
+        An example for this command would be:
+        "$addai bitcoin rsi >= 70"
+
+        @param currency - cryptocurrency to set an alert of
+        @param indicator - indicator for the given choices
+                           sma        - simple moving average
+                           ema        - exponential moving average
+                           rsi        - relative strength index
+                           volatility - realized volatility in %
+        @param operator - operator for the given choices
+                          <  - less than
+                          <= - less than or equal to
+                          >  - greater than
+                          >= - greater than or equal to
+        @param value - value of the indicator to compare
+        @param fiat - desired fiat currency (i.e. 'EUR', 'USD')
+        """
+        await self.cmd_function.alert.add_alert(ctx, currency, operator, value, fiat, indicator=indicator)
+
+    @commands.command(name='addap', pass_context=True)
+    async def addaportfolio(self, ctx, operator: str, value: float, fiat='USD'):
+        """
+        Adds alert for when the worth of the user's portfolio meets the
+        condition given
+        An example for this command would be:
+        "$addap >= 10000"
+
+        @param operator - operator for the given choices
+                          <  - less than
+                          <= - less than or equal to
+                          >  - greater than
+                          >= - greater than or equal to
+        @param value - worth of the portfolio to compare
+        @param fiat - desired fiat currency (i.e. 'EUR', 'USD')
+        """
+        await self.cmd_function.alert.add_alert(ctx, "portfolio", operator, value, fiat, portfolio=True)
+
     @commands.command(name='rema', pass_context=True)
     async def rema(self, ctx, alert_num: str):
         """
@@ -3,7 +3,9 @@ from cogs.alert_cmd_handler import AlertCommands
 # from cogs.cal_cmd_handler import CalCommands
 from cogs.coin_market_cmd_handler import CoinMarketCommands
 from cogs.misc_cmd_handler import MiscCommands
+from cogs.portfolio_cmd_handler import PortfolioCommands
 from cogs.subscriber_cmd_handler import SubscriberCommands
+from cogs.watchlist_cmd_handler import WatchlistCommands
 from cogs.modules.core_functionality import CoreFunctionality
 
 
@@ -14,4 +16,6 @@ def setup(bot):
     bot.add_cog(CoinMarketCommands(cmd_function))
     bot.add_cog(SubscriberCommands(cmd_function))
     bot.add_cog(AlertCommands(cmd_function))
+    bot.add_cog(PortfolioCommands(cmd_function))
+    bot.add_cog(WatchlistCommands(cmd_function))
     # bot.add_cog(CalCommands(cmd_function))
@@ -17,6 +17,8 @@ class CoinMarketCommands:
         "$s bitcoin"
         or even
         "$bitcoin"
+        Add "-c" to show several coins as a table with one line per coin:
+        "$search btc eth ltc -c"
 
         @param currency - cryptocurrency to search for
         @param fiat - desired fiat currency (i.e. 'EUR', 'USD')
@@ -49,6 +51,37 @@ class CoinMarketCommands:
         """
         await self.cmd_function.cmc.display_top_currencies(ctx, option, fiat)
 
+    @commands.command(name='rank', pass_context=True)
+    async def rank(self, ctx, rank_range: str, fiat='USD'):
+        """
+        Displays the cryptocurrencies within a range of ranks, with
+        reactions to flip through the pages.
+        An example for this command would be:
+        "$rank 50-75"
+
+        @param rank_range - ranks to show, up to 100 at a time
+        @param fiat - desired fiat currency (i.e. 'EUR', 'USD')
+        """
+        await self.cmd_function.cmc.display_rank(ctx, rank_range, fiat)
+
+    @commands.command(name='screen', pass_context=True)
+    async def screen(self, ctx, *args):
+        """
+        Displays the coins that pass every filter, sorted.
+        An example for this command would be:
+        "$screen change24h>10 volume>5e7 rank<300 sort=volume limit=10"
+
+        Fields are rank, price, volume, mcap, change1h, change24h,
+        change7d and supply, compared with >, <, >=, <=, = or !=.
+        Prices, volumes and market caps are in USD.
+        "sort=field" sorts by a field (largest first, "sort=-field" to
+        reverse), "limit=n" shows up to 50 coins and "fiat=EUR" sets
+        the fiat the results are shown in.
+
+        @param args - filters and options of the query
+        """
+        await self.cmd_function.cmc.display_screen(ctx, args)
+
     @commands.command(name='stats', pass_context=True)
     async def stats(self, ctx, fiat='USD'):
         """
@@ -94,22 +127,22 @@ class CoinMarketCommands:
                                                      cost,
                                                      fiat)
 
-    # @commands.command(name='cb', pass_context=True)
-    # async def cb(self, ctx, currency1: str, currency2: str, currency_amt: float):
-    #     """
-    #     Displays conversion from one cryptocurrency to another
-    #     An example for this command would be:
-    #     "$cb bitcoin litecoin 500"
-
-    #     @param currency1 - currency to convert from
-    #     @param currency2 - currency to convert to
-    #     @param currency_amt - amount of currency1 to convert
-    #                           to currency2
-    #     """
-    #     await self.cmd_function.cmc.calculate_coin_to_coin(ctx,
-    #                                                        currency1,
-    #                                                        currency2,
-    #                                                        currency_amt)
+    @commands.command(name='cb', pass_context=True)
+    async def cb(self, ctx, currency1: str, currency2: str, currency_amt: float):
+        """
+        Displays conversion from one cryptocurrency to another
+        An example for this command would be:
+        "$cb bitcoin litecoin 500"
+
+        @param currency1 - currency to convert from
+        @param currency2 - currency to convert to
+        @param currency_amt - amount of currency1 to convert
+                              to currency2
+        """
+        await self.cmd_function.cmc.calculate_coin_to_coin(ctx,
+                                                           currency1,
+                                                           currency2,
+                                                           currency_amt)
 
     @commands.command(name='cc', pass_context=True)
     async def cc(self, ctx, currency: str, currency_amt: float, fiat='USD'):
@@ -142,3 +175,43 @@ class CoinMarketCommands:
                                                            currency,
                                                            price,
                                                            fiat)
+
+    @commands.command(name='ccb', pass_context=True)
+    async def ccb(self, ctx, *, items: str):
+        """
+        Displays conversion from coins to fiat for many currencies at
+        once, with the total. Items are separated by commas or new lines
+        and the fiat can follow the last item.
+        An example for this command would be:
+        "$ccb btc 0.5, eth 10, ltc 200 EUR"
+
+        @param items - currency and amount of coins per item
+        """
+        await self.cmd_function.cmc.calculate_coin_to_fiat_batch(ctx, items)
+
+    @commands.command(name='cfb', pass_context=True)
+    async def cfb(self, ctx, *, items: str):
+        """
+        Displays conversion from fiat to coins for many currencies at
+        once, with the total spent. Items are separated by commas or new
+        lines and the fiat can follow the last item.
+        An example for this command would be:
+        "$cfb btc 500, eth 200"
+
+        @param items - currency and fiat amount per item
+        """
+        await self.cmd_function.cmc.calculate_fiat_to_coin_batch(ctx, items)
+
+    @commands.command(name='profitb', pass_context=True)
+    async def profitb(self, ctx, *, items: str):
+        """
+        Calculates and displays profit made from many purchases at once,
+        with the totals. Items are separated by commas or new lines and
+        the fiat can follow the last item.
+        An example for this command would be:
+        "$profitb btc 0.5 8000, eth 10 300"
+
+        @param items - currency, amount of coins and price paid per coin
+                       per item
+        """
+        await self.cmd_function.cmc.calculate_profit_batch(ctx, items)
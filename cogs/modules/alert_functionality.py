@@ -1,31 +1,46 @@
 from bot_logger import logger
-from cogs.modules.coin_market import CurrencyException, FiatException
+from bot_metrics import metrics
+from cogs.modules.coin_market import BITCOIN, CurrencyException, FiatException
+from cogs.modules.indicators import INDICATORS, PRICE_INDICATORS
+from cogs.modules.outbound_scheduler import ALERT, INTERACTIVE
+from cogs.modules.price_history import parse_window
 from collections import defaultdict
 from discord.errors import Forbidden
+import asyncio
+import datetime
 import discord
 import json
+import math
+import time
 
 
 CMB_ADMIN = "CMB ADMIN"
 ADMIN_ONLY = "ADMIN_ONLY"
 ALERT_DISABLED = "ALERT_DISABLED"
+YIELD_EVERY = 100  # alerts checked before giving commands a turn
 
 
 class AlertFunctionality:
     """Handles Alert Command functionality"""
 
-    def __init__(self, bot, coin_market, alert_capacity, server_data):
+    def __init__(self, bot, coin_market, alert_capacity, server_data, outbound, history=None, portfolio=None):
         self.bot = bot
+        self.history = history
+        self.portfolio = portfolio
+        self.window_changes = {}
+        self.price_ranges = {}
+        self.outbound = outbound
         self.server_data = server_data
         self.coin_market = coin_market
         self.alert_capacity = alert_capacity
         self.market_list = ""
         self.acronym_list = ""
+        self.fetched_at = None
         self.supported_operators = ["<", ">", "<=", ">="]
         self.alert_data = self._check_alert_file()
         self._save_alert_file(self.alert_data, backup=True)
 
-    def update(self, market_list=None, acronym_list=None, server_data=None):
+    def update(self, market_list=None, acronym_list=None, server_data=None, fetched_at=None):
         """
         Updates utilities with new coin market and server data
         """
@@ -33,8 +48,89 @@ class AlertFunctionality:
             self.server_data = server_data
         if market_list:
             self.market_list = market_list
+            self.window_changes.clear()
         if acronym_list:
             self.acronym_list = acronym_list
+        if fetched_at:
+            self.fetched_at = fetched_at
+
+    def get_watched_currencies(self):
+        """
+        Returns the currencies that have an alert set
+
+        @return - set of currencies
+        """
+        watched = set()
+        for alert_list in self.alert_data.values():
+            for alert in alert_list.values():
+                if "portfolio" not in alert:
+                    watched.add(alert["currency"])
+        return watched
+
+    def observe_prices(self, market_list, fetched_at, currencies=None):
+        """
+        Widens the low/high range of every alerted currency with the
+        latest prices. Ranges cover every refresh since the last alert
+        check, so a price that crosses a threshold and comes back while
+        a check is skipped (i.e. the previous one is still sending)
+        still triggers the alert.
+
+        @param market_list - MarketTable with the latest prices
+        @param fetched_at - time the prices were fetched
+        @param currencies - currencies that were refreshed, all if None
+        """
+        prices = market_list.column('price')
+        for currency in self.get_watched_currencies():
+            if currencies is not None and currency not in currencies:
+                continue
+            i = market_list.index.get(currency)
+            if i is None or math.isnan(prices[i]):
+                continue
+            price = prices[i]
+            price_range = self.price_ranges.get(currency)
+            if price_range is None:
+                # low, high and when the range started
+                self.price_ranges[currency] = [price, price, fetched_at]
+            elif price < price_range[0]:
+                price_range[0] = price
+            elif price > price_range[1]:
+                price_range[1] = price
+
+    def _get_window_change(self, currency, window):
+        """
+        Returns the percent change of a currency over a custom window,
+        worked out from the price history once per refresh
+
+        @param currency - cryptocurrency to get the change of
+        @param window - seconds to look back
+        @return - percent change, or None if the history can't tell
+        """
+        key = (currency, window)
+        if key not in self.window_changes:
+            change = None
+            if self.history is not None and self.fetched_at:
+                change = self.history.get_change(self.market_list[currency]['id'],
+                                                 window,
+                                                 self.fetched_at)
+            self.window_changes[key] = change
+        return self.window_changes[key]
+
+    def _record_trigger_latency(self, currency):
+        """
+        Records how long it took for a price change to reach the user,
+        both since coinmarketcap updated the price and since the bot
+        fetched it
+        """
+        try:
+            now = time.time()
+            if self.fetched_at:
+                metrics.observe("alerts.latency_since_fetch", now - self.fetched_at)
+            last_updated = self.market_list[currency]["last_updated"]
+            updated = datetime.datetime.strptime(last_updated[:19], "%Y-%m-%dT%H:%M:%S")
+            updated = updated.replace(tzinfo=datetime.timezone.utc).timestamp()
+            metrics.observe("alerts.latency_since_update", now - updated)
+        except Exception:
+            pass
 
     def _check_permission(self, ctx):
         """
@@ -88,7 +184,26 @@ class AlertFunctionality:
         else:
             raise Exception("Unable to translate operation.")
 
-    def _check_alert(self, currency, operator, user_value, fiat, kwargs=None):
+    def _meets_condition(self, operator, market_value, user_value):
+        """
+        Checks if a value meets an alert condition
+
+        @param operator - operator condition to notify the channel
+        @param market_value - value of the currency
+        @param user_value - price or percent for condition to compare
+        @return - True if the condition is met
+        """
+        if operator == "<":
+            return market_value < float(user_value)
+        elif operator == "<=":
+            return market_value <= float(user_value)
+        elif operator == ">":
+            return market_value > float(user_value)
+        elif operator == ">=":
+            return market_value >= float(user_value)
+        raise Exception("Operator not supported: {}".format(operator))
+
+    def _check_alert(self, currency, operator, user_value, fiat, kwargs=None, price_range=None):
         """
         Checks if the alert condition isn't true
 
@@ -96,21 +211,52 @@ class AlertFunctionality:
         @param operator - operator condition to notify the channel
         @param user_value - price or percent for condition to compare
         @param fiat - desired fiat currency (i.e. 'EUR', 'USD')
+        @param kwargs - kind of alert, a price alert if empty. For
+                        portfolio alerts, 'portfolio' holds the user id
+        @param price_range - low and high USD price seen since the last
+                             check, price alerts trigger if either meets
+                             the condition
         @return - True if condition doesn't exist, False if it does
         """
         if self.market_list is None:
             return True
+        if kwargs and "portfolio" in kwargs:
+            if self.portfolio is None:
+                return True
+            market_value = self.portfolio.get_value(kwargs["portfolio"], fiat)
+            if market_value is None:
+                return True
+            return not self._meets_condition(operator, market_value, user_value)
         if currency in self.market_list:
             if kwargs:
                 if "btc" in kwargs:
-                    # market_value = float(self.market_list[currency]['quote']['BTC']["price"])
-                    return False  # temporarily disabled
-                if "hour" in kwargs:
+                    if BITCOIN not in self.market_list:
+                        return True
+                    market_value = self.market_list.cross_price(currency, BITCOIN)
+                    if math.isnan(market_value):
+                        return True
+                elif "hour" in kwargs:
                     market_value = float(self.market_list[currency]['quote']['USD']["percent_change_1h"])
                 elif "day" in kwargs:
                     market_value = float(self.market_list[currency]['quote']['USD']["percent_change_24h"])
                 elif "week" in kwargs:
                     market_value = float(self.market_list[currency]['quote']['USD']["percent_change_7d"])
+                elif "window" in kwargs:
+                    market_value = self._get_window_change(currency, kwargs["window"])
+                    if market_value is None:
+                        return True
+                elif "indicator" in kwargs:
+                    indicators = self.coin_market.indicators
+                    if indicators is None:
+                        return True
+                    market_value = indicators.get(self.market_list[currency]['id'],
+                                                  kwargs["indicator"])
+                    if market_value is None:
+                        return True
+                    if kwargs["indicator"] in PRICE_INDICATORS:
+                        market_value = float(self.coin_market.format_price(market_value,
+                                                                           fiat,
+                                                                           False))
                 else:
                     raise Exception("Unsupported percent change format.")
             else:
@@ -118,44 +264,35 @@ class AlertFunctionality:
                 market_value = float(self.coin_market.format_price(market_value,
                                                                    fiat,
                                                                    False))
-            if operator in self.supported_operators:
-                if operator == "<":
-                    if market_value < float(user_value):
-                        return False
-                elif operator == "<=":
-                    if market_value <= float(user_value):
-                        return False
-                elif operator == ">":
-                    if market_value > float(user_value):
-                        return False
-                elif operator == ">=":
-                    if market_value >= float(user_value):
+                if price_range is not None:
+                    if operator in ("<", "<="):
+                        extreme = price_range[0]
+                    else:
+                        extreme = price_range[1]
+                    extreme = float(self.coin_market.format_price(extreme,
+                                                                  fiat,
+                                                                  False))
+                    if self._meets_condition(operator, extreme, user_value):
+                        if not self._meets_condition(operator, market_value, user_value):
+                            # crossed and came back between checks
+                            metrics.incr("alerts.crossing_triggers")
                         return False
-                return True
-            else:
-                raise Exception("Operator not supported: {}".format(operator))
+            return not self._meets_condition(operator, market_value, user_value)
         else:
             return False
 
-    async def _say_msg(self, msg=None, channel=None, emb=None):
+    async def _say_msg(self, msg=None, channel=None, emb=None, priority=INTERACTIVE):
         """
         Bot will say msg if given correct permissions
 
         @param msg - msg to say
         @param channel - channel to send msg to
         @param emb - embedded msg to say
+        @param priority - outbound priority of the msg
+        @return - the sent msg
         """
         try:
-            if channel:
-                if emb:
-                    await self.bot.send_message(channel, embed=emb)
-                else:
-                    await self.bot.send_message(channel, msg)
-            else:
-                if emb:
-                    await self.bot.say(embed=emb)
-                else:
-                    await self.bot.say(msg)
+            return await self.outbound.send(channel, msg, emb, priority)
         except Exception:
             pass
 
@@ -173,16 +310,49 @@ class AlertFunctionality:
                 return
             alert_num = None
             ucase_fiat = self.coin_market.fiat_check(fiat)
-            if currency.upper() in self.acronym_list:
+            if "portfolio" in kwargs:
+                if self.portfolio is None or self.portfolio.get_value(ctx.message.author.id,
+                                                                      ucase_fiat) is None:
+                    await self._say_msg("You don't have a portfolio yet. Add "
+                                        "coins with `$addp`.")
+                    return
+                kwargs["portfolio"] = ctx.message.author.id
+            elif currency.upper() in self.acronym_list:
                 currency = self.acronym_list[currency.upper()]
                 if "Duplicate" in currency:
                     await self._say_msg(currency)
                     return
-            if currency not in self.market_list:
+            if "portfolio" not in kwargs and currency not in self.market_list:
                 raise CurrencyException("Currency is invalid: ``{}``".format(currency))
+            indicator = kwargs.get("indicator")
+            if indicator is not None:
+                indicator = kwargs["indicator"] = indicator.lower()
+                if indicator not in INDICATORS:
+                    await self._say_msg("Invalid indicator: **{}**. Your choices "
+                                        "are {}.".format(indicator,
+                                                         ", ".join("**{}**".format(i)
+                                                                   for i in INDICATORS)))
+                    return
+            window = kwargs.get("window")
+            if window is not None:
+                try:
+                    kwargs["window"] = parse_window(window)
+                except ValueError:
+                    await self._say_msg("Invalid window: **{}**. Use minutes, "
+                                        "hours or days (i.e. **15m**, **4h**, "
+                                        "**1d**).".format(window))
+                    return
+                if self.history is None:
+                    await self._say_msg("Custom window alerts are unavailable.")
+                    return
+                if not self.history.covers(kwargs["window"]):
+                    await self._say_msg("Window must be between **{}m** and "
+                                        "**{}h**.".format(self.history.shortest_window() // 60,
+                                                         self.history.longest_window() // 3600))
+                    return
             try:
                 if not self._check_alert(currency, operator, user_value, ucase_fiat, kwargs):
-                    await self._say_msg("Failed to create alert. Current price "
+                    await self._say_msg("Failed to create alert. Current value "
                                         "of **{}** already meets the condition."
                                         "".format(currency.title()))
                     return
@@ -199,7 +369,7 @@ class AlertFunctionality:
                 raise Exception("Something went wrong with adding alert.")
             alert_cap = int(self.alert_capacity)
             if int(alert_num) > alert_cap:
-                await self.bot.say("Unable to add alert, user alert capacity of"
+                await self._say_msg("Unable to add alert, user alert capacity of"
                                    " **{}** has been reached.".format(alert_cap))
                 return
             alert_list = self.alert_data[user_id]
@@ -220,15 +390,30 @@ class AlertFunctionality:
                     if user_value.endswith('.'):
                         user_value = user_value.replace('.', '')
                     channel_alert["unit"] = {"btc": "{}".format(user_value)}
+                elif "indicator" in kwargs:
+                    channel_alert["indicator"] = indicator
+                    channel_alert["value"] = ("{:.6f}".format(user_value)).rstrip('0')
+                    if channel_alert["value"].endswith('.'):
+                        channel_alert["value"] = channel_alert["value"].replace('.', '')
+                elif "portfolio" in kwargs:
+                    channel_alert["portfolio"] = True
+                    channel_alert["value"] = ("{:.2f}".format(user_value)).rstrip('0')
+                    if channel_alert["value"].endswith('.'):
+                        channel_alert["value"] = channel_alert["value"].replace('.', '')
                 else:
                     channel_alert["percent"] = ("{}".format(user_value)).rstrip('0')
                     for arg in kwargs:
                         channel_alert["percent_change"] = arg
+                    if window is not None:
+                        channel_alert["window"] = window.lower()
             else:
                 channel_alert["price"] = ("{:.6f}".format(user_value)).rstrip('0')
                 if channel_alert["price"].endswith('.'):
                     channel_alert["price"] = channel_alert["price"].replace('.', '')
             channel_alert["fiat"] = ucase_fiat
+            # the refresh the alert was checked against, price ranges
+            # started before it don't count
+            channel_alert["created"] = self.fetched_at or time.time()
             self._save_alert_file(self.alert_data)
             await self._say_msg("Alert has been set. This bot will post the "
                                 "alert in this specific channel.")
@@ -291,6 +476,13 @@ class AlertFunctionality:
                         alert_value += " (24H)"
                     elif "week" == alert_setting["percent_change"]:
                         alert_value += " (7D)"
+                    elif "window" == alert_setting["percent_change"]:
+                        alert_value += " ({})".format(alert_setting["window"].upper())
+                elif "indicator" in alert_setting:
+                    alert_value = "{} ({})".format(alert_setting["value"],
+                                                   alert_setting["indicator"].upper())
+                elif "portfolio" in alert_setting:
+                    alert_value = alert_setting["value"]
                 else:
                     alert_value = alert_setting["price"]
                 alert_fiat = alert_setting["fiat"]
@@ -301,7 +493,7 @@ class AlertFunctionality:
                                  alert_currency.title(),
                                  alert_operation,
                                  alert_value))
-                if "price" in alert_setting:
+                if "price" in alert_setting or "portfolio" in alert_setting:
                     msg += "**{}** ".format(alert_fiat)
                 msg += "was successfully removed."
                 await self._say_msg(msg)
@@ -349,6 +541,9 @@ class AlertFunctionality:
                             if alert_percent.endswith('.'):
                                 alert_percent = alert_percent.replace('.', '')
                             alert_value = "{}%".format(alert_percent)
+                        elif ("indicator" in alert_list[alert]
+                              or "portfolio" in alert_list[alert]):
+                            alert_value = alert_list[alert]["value"]
                         else:
                             alert_value = alert_list[alert]["price"]
                         msg[int(alert)] = ("[**{}**] Alert when **{}** is "
@@ -367,6 +562,12 @@ class AlertFunctionality:
                                 msg[int(alert)] += "(**24H**)\n"
                             elif "week" == alert_list[alert]["percent_change"]:
                                 msg[int(alert)] += "(**7D**)\n"
+                            elif "window" == alert_list[alert]["percent_change"]:
+                                msg[int(alert)] += ("(**{}**)\n"
+                                                    "".format(alert_list[alert]["window"].upper()))
+                        elif "indicator" in alert_list[alert]:
+                            msg[int(alert)] += ("(**{}**)\n"
+                                                "".format(alert_list[alert]["indicator"].upper()))
                         else:
                             msg[int(alert)] += ("**{}**\n"
                                                 "".format(alert_list[alert]["fiat"]))
@@ -382,7 +583,7 @@ class AlertFunctionality:
             em = discord.Embed(title="Alerts",
                                description=result_msg,
                                colour=color)
-            await self.bot.say(embed=em)
+            await self._say_msg(emb=em)
         except Forbidden:
             pass
         except CurrencyException as e:
@@ -400,9 +601,17 @@ class AlertFunctionality:
         try:
             kwargs = {}
             raised_alerts = defaultdict(list)
-            for user in self.alert_data:
+            checked = 0
+            # prices seen from here on count towards the next check
+            price_ranges, self.price_ranges = self.price_ranges, {}
+            for user in list(self.alert_data):
                 alert_list = self.alert_data[str(user)]
-                for alert in alert_list:
+                for alert in list(alert_list):
+                    checked += 1
+                    if checked % YIELD_EVERY == 0:
+                        await asyncio.sleep(0)
+                        if alert not in alert_list:
+                            continue
                     alert_currency = alert_list[alert]["currency"]
                     operator_symbol = alert_list[alert]["operation"]
                     if "unit" in alert_list[alert]:
@@ -413,13 +622,26 @@ class AlertFunctionality:
                         alert_value = alert_list[alert]["percent"]
                         if alert_value.endswith('.'):
                             alert_value = alert_value.replace('.', '')
-                        kwargs[alert_list[alert]["percent_change"]] = True
+                        if alert_list[alert]["percent_change"] == "window":
+                            kwargs["window"] = parse_window(alert_list[alert]["window"])
+                        else:
+                            kwargs[alert_list[alert]["percent_change"]] = True
+                    elif "indicator" in alert_list[alert]:
+                        alert_value = alert_list[alert]["value"]
+                        kwargs["indicator"] = alert_list[alert]["indicator"]
+                    elif "portfolio" in alert_list[alert]:
+                        alert_value = alert_list[alert]["value"]
+                        kwargs["portfolio"] = user
                     else:
                         alert_value = alert_list[alert]["price"]
                     alert_fiat = alert_list[alert]["fiat"]
+                    price_range = price_ranges.get(alert_currency)
+                    if (price_range is not None
+                            and price_range[2] <= alert_list[alert].get("created", 0)):
+                        price_range = None
                     if not self._check_alert(alert_currency, operator_symbol,
                                              alert_value, alert_fiat,
-                                             kwargs):
+                                             kwargs, price_range):
                         alert_operator = self._translate_operation(operator_symbol)
                         raised_alerts[user].append(alert)
                         if "channel" not in alert_list[alert]:
@@ -429,7 +651,8 @@ class AlertFunctionality:
                             channel_obj = self.bot.get_channel(channel_obj)
                             if not channel_obj:
                                 channel_obj = await self.bot.get_user_info(user)
-                        if alert_currency in self.market_list:
+                        if (alert_currency in self.market_list
+                                or "portfolio" in alert_list[alert]):
                             msg = ("**{}** is **{}** **{}**"
                                    "".format(alert_currency.title(),
                                              alert_operator,
@@ -444,6 +667,10 @@ class AlertFunctionality:
                                     msg += "% (**24H**)\n"
                                 elif "week" == alert_list[alert]["percent_change"]:
                                     msg += "% (**7D**)\n"
+                                elif "window" == alert_list[alert]["percent_change"]:
+                                    msg += "% (**{}**)\n".format(alert_list[alert]["window"].upper())
+                            elif "indicator" in alert_list[alert]:
+                                msg += " (**{}**)\n".format(alert_list[alert]["indicator"].upper())
                             else:
                                 msg += " **{}**\n".format(alert_fiat)
                             msg += "<@{}>".format(user)
@@ -455,12 +682,15 @@ class AlertFunctionality:
                         em = discord.Embed(title="Alert **{}**".format(alert),
                                            description=msg,
                                            colour=0xFF9900)
-                        await self._say_msg(channel=channel_obj, emb=em)
+                        await self._say_msg(channel=channel_obj,
+                                            emb=em,
+                                            priority=ALERT)
+                        self._record_trigger_latency(alert_currency)
                     kwargs.clear()
             if raised_alerts:
                 for user in raised_alerts:
                     for alert_num in raised_alerts[user]:
-                        self.alert_data[user].pop(str(alert_num))
+                        self.alert_data[user].pop(str(alert_num), None)
                 self._save_alert_file(self.alert_data)
         except Exception as e:
             print("Failed to alert user. See error.log.")
@@ -0,0 +1,165 @@
+from bot_metrics import metrics
+from array import array
+import math
+
+
+PRICE_SPIKE = "price"
+VOLUME_SPIKE = "volume"
+
+
+class AnomalyScanner:
+    """
+    Finds coins moving unusually compared to their own recent past.
+
+    Every coin keeps a ring of its last `window` log returns and 24h
+    volumes, with running sums, so one pass over the refreshed coins
+    updates and checks each of them in constant time. Prices are sampled
+    at most once per `resolution` seconds, like the indicators.
+
+    Hot coins are sampled every refresh and the others only now and
+    then, so each return is divided by the square root of the periods
+    it spans. A random walk's spread grows with the square root of time,
+    so this puts an hourly coin's returns on the same per period scale
+    as a hot coin's.
+
+    - price spike: the latest scaled return is more than `z_score`
+                   standard deviations away from the mean of the recent
+                   scaled returns
+    - volume spike: the 24h volume is more than `volume_multiple` times
+                    its recent average
+    """
+
+    def __init__(self, window=24, z_score=4, volume_multiple=5, min_change=2,
+                 resolution=300):
+        """
+        @param window - number of samples the baseline covers
+        @param z_score - standard deviations a return has to be away
+                         from the mean to be a spike
+        @param volume_multiple - times the average volume the volume has
+                                 to reach to be a spike
+        @param min_change - least % change of a price spike, so coins that
+                            barely move aren't flagged on tiny changes
+        @param resolution - least seconds between two samples of a coin
+        """
+        self.window = int(window)
+        self.z_score = float(z_score)
+        self.volume_multiple = float(volume_multiple)
+        self.min_return = math.log(1 + float(min_change) / 100)
+        self.resolution = int(resolution)
+        self.rows = {}
+        self.samples = array('l')
+        self.last_period = array('l')
+        self.last_flagged = array('l')
+        self.last_price = array('d')
+        self.return_sum = array('d')
+        self.return_square_sum = array('d')
+        self.volume_sum = array('d')
+        self.return_ring = array('d')
+        self.volume_ring = array('d')
+
+    def _add_row(self, slug):
+        row = len(self.rows)
+        self.rows[slug] = row
+        self.samples.append(0)
+        self.last_period.append(-1)
+        self.last_flagged.append(-self.window)
+        for column in (self.last_price, self.return_sum,
+                       self.return_square_sum, self.volume_sum):
+            column.append(0.0)
+        self.return_ring.extend([0.0] * self.window)
+        self.volume_ring.extend([0.0] * self.window)
+        return row
+
+    def scan(self, market_list, timestamp, currencies=None):
+        """
+        Adds the latest prices and volumes to the baselines and returns
+        the coins that broke out of them. A coin is flagged at most once
+        per `window` samples.
+
+        @param market_list - MarketTable with the latest data
+        @param timestamp - time the data was fetched
+        @param currencies - currencies that were refreshed, all if None
+        @return - list of (kind, slug, z-score or volume multiple,
+                  % price change or volume)
+        """
+        window = self.window
+        sample_period = int(timestamp // self.resolution)
+        slugs = market_list.column('slug')
+        prices = market_list.column('price')
+        volumes = market_list.column('volume_24h')
+        if currencies is None:
+            indexes = range(len(slugs))
+        else:
+            indexes = [market_list.index[currency] for currency in currencies
+                       if currency in market_list.index]
+        found = []
+        # columns bound to locals, the loop runs over every coin
+        rows = self.rows
+        samples = self.samples
+        last_period = self.last_period
+        last_flagged = self.last_flagged
+        last_price = self.last_price
+        return_sum = self.return_sum
+        return_square_sum = self.return_square_sum
+        volume_sum = self.volume_sum
+        return_ring = self.return_ring
+        volume_ring = self.volume_ring
+        z_score = self.z_score
+        volume_multiple = self.volume_multiple
+        min_return = self.min_return
+        log = math.log
+        sqrt = math.sqrt
+        with metrics.timer("anomalies.scan"):
+            for i in indexes:
+                price = prices[i]
+                if not price > 0:
+                    continue
+                slug = slugs[i]
+                row = rows.get(slug)
+                if row is None:
+                    row = self._add_row(slug)
+                elif last_period[row] == sample_period:
+                    continue
+                volume = volumes[i]
+                if not volume > 0:
+                    volume = 0.0
+                n = samples[row]
+                quiet = sample_period - last_flagged[row] >= window
+                if n > 0:
+                    change = log(price / last_price[row])
+                    # per period return, however long since the last sample
+                    scaled = change / sqrt(sample_period - last_period[row])
+                    returns = n - 1  # returns in the ring
+                    if quiet and returns >= window and abs(change) >= min_return:
+                        mean = return_sum[row] / window
+                        variance = return_square_sum[row] / window - mean * mean
+                        if variance > 0:
+                            z = (scaled - mean) / sqrt(variance)
+                            if abs(z) >= z_score:
+                                found.append((PRICE_SPIKE, slug, z,
+                                              math.expm1(change) * 100))
+                                last_flagged[row] = sample_period
+                                quiet = False
+                    slot = row * window + returns % window
+                    if returns >= window:
+                        old = return_ring[slot]
+                        return_sum[row] -= old
+                        return_square_sum[row] -= old * old
+                    return_ring[slot] = scaled
+                    return_sum[row] += scaled
+                    return_square_sum[row] += scaled * scaled
+                slot = row * window + n % window
+                if n >= window:
+                    if quiet and volume and volume_sum[row] > 0:
+                        multiple = volume * window / volume_sum[row]
+                        if multiple >= volume_multiple:
+                            found.append((VOLUME_SPIKE, slug, multiple, volume))
+                            last_flagged[row] = sample_period
+                    volume_sum[row] -= volume_ring[slot]
+                volume_ring[slot] = volume
+                volume_sum[row] += volume
+                last_price[row] = price
+                last_period[row] = sample_period
+                samples[row] = n + 1
+        metrics.incr("anomalies.found", len(found))
+        return found
@@ -1,5 +1,6 @@
 from bot_logger import logger
-from cogs.modules.coinmarketcal import CoinMarketCal
+from cogs.modules.coinmarketcal import CoinMarketCal, DEFAULT_BASE_URL
+from cogs.modules.outbound_scheduler import INTERACTIVE
 import discord
 
 
@@ -15,12 +16,15 @@ MONTHS = ["January", "February", "March",
 class CalFunctionality:
     """Handles coinmarketcal functionality"""
 
-    def __init__(self, bot, config_data, server_data):
+    def __init__(self, bot, config_data, server_data, outbound):
         self.bot = bot
+        self.outbound = outbound
         self.acronym_list = ""
         self.server_data = server_data
         self.cal = CoinMarketCal(config_data["coinmarketcal_client_id"],
-                                 config_data["coinmarketcal_client_secret"])
+                                 config_data["coinmarketcal_client_secret"],
+                                 config_data.get("coinmarketcal_base_url",
+                                                 DEFAULT_BASE_URL))
 
     def _check_permission(self, ctx):
         """
@@ -49,25 +53,18 @@ class CalFunctionality:
         if acronym_list:
             self.acronym_list = acronym_list
 
-    async def _say_msg(self, msg=None, channel=None, emb=None):
+    async def _say_msg(self, msg=None, channel=None, emb=None, priority=INTERACTIVE):
         """
         Bot will say msg if given correct permissions
 
         @param msg - msg to say
         @param channel - channel to send msg to
         @param emb - embedded msg to say
+        @param priority - outbound priority of the msg
+        @return - the sent msg
         """
         try:
-            if channel:
-                if emb:
-                    await self.bot.send_message(channel, embed=emb)
-                else:
-                    await self.bot.send_message(channel, msg)
-            else:
-                if emb:
-                    await self.bot.say(embed=emb)
-                else:
-                    await self.bot.say(msg)
+            return await self.outbound.send(channel, msg, emb, priority)
         except Exception as e:
             pass
 
@@ -128,7 +125,7 @@ class CalFunctionality:
             try:
                 event = self.cal.get_coin_event(currency, page)[0]
             except Exception as e:
-                await self.bot.say("No event available for the following "
+                await self._say_msg("No event available for the following "
                                    "currency: **{}**".format(currency))
                 return
             em = self.format_events(currency, event)
@@ -0,0 +1,112 @@
+from bot_logger import logger
+from bot_metrics import metrics
+from cogs.modules.credit_pool import CreditException
+import asyncio
+import random
+import time
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    """
+    Stops requests to a failing service. After failure_threshold failed
+    requests in a row the breaker opens and requests are refused until
+    reset_timeout passes. A single probe request is then let through
+    (half open): success closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, name, failure_threshold=3, reset_timeout=300, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self._report()
+
+    def _report(self):
+        metrics.set_gauge("breaker.{}.state".format(self.name),
+                          STATE_VALUES[self.state])
+
+    def _set_state(self, state):
+        if state != self.state:
+            logger.warning("Circuit breaker '{}' is now {}".format(self.name, state))
+            self.state = state
+            self._report()
+
+    def allow_request(self):
+        """
+        Checks if a request may be made
+
+        @return - True if the request may be made
+        """
+        if self.state == OPEN:
+            if self.clock() - self.opened_at < self.reset_timeout:
+                return False
+            self._set_state(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self.probing:
+                return False
+            self.probing = True
+        return True
+
+    def record_success(self):
+        """
+        Closes the breaker after a successful request
+        """
+        self.failures = 0
+        self.probing = False
+        self._set_state(CLOSED)
+
+    def release(self):
+        """
+        Gives back a request that was allowed but never reached the
+        service, without counting it as a success or a failure
+        """
+        self.probing = False
+
+    def record_failure(self):
+        """
+        Counts a failed request, opening the breaker if needed
+        """
+        self.failures += 1
+        self.probing = False
+        metrics.incr("breaker.{}.failures".format(self.name))
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self.opened_at = self.clock()
+            self._set_state(OPEN)
+
+
+async def retry_with_backoff(func, attempts=4, base_delay=1, max_delay=30,
+                             sleep=asyncio.sleep, rand=random.uniform):
+    """
+    Calls a coroutine function until it succeeds, waiting exponentially
+    longer between attempts. Each wait is picked at random up to its cap
+    (full jitter) so retries don't line up. Running out of API credits
+    isn't retried, since credits only come back the next day.
+
+    @param func - coroutine function to call
+    @param attempts - maximum number of calls
+    @param base_delay - cap of the first wait in seconds
+    @param max_delay - largest cap a wait can have
+    @return - result of func
+    """
+    attempt = 0
+    while True:
+        try:
+            return await func()
+        except CreditException:
+            raise
+        except Exception:
+            attempt += 1
+            if attempt >= attempts:
+                raise
+            metrics.incr("fetch.retries")
+            await sleep(rand(0, min(max_delay, base_delay * 2 ** attempt)))
@@ -1,28 +1,30 @@
 from bot_logger import logger
-from coinmarketcap import Market
+from bot_metrics import metrics
+from cogs.modules.indicators import EMA, RSI, SMA, VOLATILITY
+from cogs.modules.credit_pool import CreditException, CreditPool, listings_cost, quotes_cost
+from cogs.modules.market_table import MarketTable, parse_listings
+from cogs.modules.number_format import fiat_currencies, format_count, format_counts, get_formatter
 from currency_converter import CurrencyConverter
+from itertools import repeat
 from requests.exceptions import RequestException
+import math
+import requests
 
-fiat_currencies = {
-    'AUD': '$', 'BRL': 'R$', 'CAD': '$', 'CHF': 'Fr.',
-    'CLP': '$', 'CNY': '¥', 'CZK': 'Kc', 'DKK': 'kr',
-    'EUR': '€', 'GBP': '£', 'HKD': 'HK$', 'HUF': 'Ft',
-    'IDR': 'Rp ', 'ILS': '₪', 'INR': '₹', 'JPY': '¥‎',
-    'KRW': '₩', 'MXN': '$', 'MYR': 'RM', 'NOK': 'kr',
-    'NZD': '$', 'PHP': '₱', 'PKR': 'Rupees', 'PLN': 'zł',
-    'RUB': '₽', 'SEK': 'kr', 'SGD': 'S$', 'THB': '฿',
-    'TRY': '₺', 'TWD': 'NT$', 'ZAR': 'R ', 'USD': '$'
-}
-
-fiat_suffix = [
-    'CZK', 'DKK', 'HUF',
-    'NOK', 'PKR', 'RUB',
-    'SEK'
-]
-
+BITCOIN = "bitcoin"
 ETHEREUM = "ethereum"
+CROSS_CURRENCIES = [BITCOIN, ETHEREUM]  # cross prices worked out every refresh
+DEFAULT_BASE_URL = "https://pro-api.coinmarketcap.com/v1/"
+LISTINGS_ENDPOINT = "cryptocurrency/listings/latest"
+QUOTES_ENDPOINT = "cryptocurrency/quotes/latest"
+FULL_LISTING_LIMIT = 5000
+STATS_ENDPOINT = "global-metrics/quotes/latest"
+REQUEST_TIMEOUT = 30
+STREAM_CHUNK_SIZE = 64 * 1024
+KEY_LIMIT_ERRORS = [1009, 1010]  # daily and monthly credit limit reached
 SMALL_GREEN_TRIANGLE = "<:small_green_triangle:396586561413578752>"
 SMALL_RED_TRIANGLE = ":small_red_triangle_down:"
+# rank, symbol, price, 1h, 24h and 7d change of the compact table
+COMPACT_ROW = "{:<6}{:<7}{:>20}{:>8}{:>8}{:>8}"
 
 
 class CurrencyException(Exception):
@@ -44,11 +46,30 @@ class MarketStatsException(Exception):
 class CoinMarket:
     """Handles CoinMarketCap API features"""
 
-    def __init__(self, api_key):
+    def __init__(self, api_keys, base_url=DEFAULT_BASE_URL, daily_credits=333, indicators=None):
         """
         Initiates CoinMarket
+
+        @param api_keys - coinmarketcap API key, or a list of keys to
+                          spread requests over
+        @param base_url - URL of the coinmarketcap API (or a stand-in)
+        @param daily_credits - API credits each key may spend per day
+        @param indicators - IndicatorEngine shown in single searches
         """
-        self.market = Market(api_key)
+        self.indicators = indicators
+        if isinstance(api_keys, str):
+            api_keys = [api_keys]
+        self.base_url = base_url.rstrip('/') + '/'
+        self.credits = CreditPool(api_keys, daily_credits)
+        self.session = requests.Session()
+        self.session.headers.update({'Accept': 'application/json'})
+        # loading the converter parses its rate file, so only do it once
+        self.converter = CurrencyConverter()
+        # formatted columns of the current market list by fiat, and
+        # compact table rows by fiat and id
+        self.formatted_columns = {}
+        self.compact_rows = {}
+        self.formatted_market = None
 
     def fiat_check(self, fiat):
         """
@@ -64,7 +85,7 @@ class CoinMarket:
             raise FiatException(error_msg)
         return fiat
 
-    def format_price(self, price, fiat, symbol=True):
+    def format_price(self, price, fiat, symbol=True, convert=True):
         """
         Formats price under the desired fiat
 
@@ -72,34 +93,165 @@ class CoinMarket:
         @param fiat - desired fiat currency (i.e. 'EUR', 'USD')
         @param symbol - if True add currency symbol to fiat
                         if False symbol will not be added
+        @param convert - if True the price is in USD and gets converted,
+                         if False it's already in the desired fiat
         @return - formatted price under fiat
         """
-        c = CurrencyConverter()
-        ucase_fiat = fiat.upper()
-        price = float(c.convert(float(price), "USD", fiat))
+        if convert:
+            price = float(self.converter.convert(float(price), "USD", fiat))
         if symbol:
-            if ucase_fiat in fiat_suffix:
-                formatted_fiat = "{:,.6f} {}".format(float(price),
-                                                     fiat_currencies[ucase_fiat])
-            else:
-                formatted_fiat = "{}{:,.6f}".format(fiat_currencies[ucase_fiat],
-                                                    float(price))
-        else:
-            formatted_fiat = str(price)
-        formatted_fiat = formatted_fiat.rstrip('0')
+            return get_formatter(fiat.upper()).quote(price)
+        formatted_fiat = str(price).rstrip('0')
         if formatted_fiat.endswith('.'):
             formatted_fiat = formatted_fiat.replace('.', '')
         return formatted_fiat
 
-    def fetch_currency_data(self, fiat="USD"):
+    def _check_market(self, market_list):
+        """
+        Drops everything formatted from an older market list
+        """
+        if market_list is not self.formatted_market:
+            self.formatted_market = market_list
+            self.formatted_columns.clear()
+            self.compact_rows.clear()
+
+    def get_formatted_columns(self, market_list, fiat):
+        """
+        Returns the price, market cap, volume and supplies of every coin
+        formatted in a fiat. They are formatted a whole column at a time,
+        once per fiat until the market list is refreshed.
+
+        @param market_list - MarketTable of the whole market
+        @param fiat - desired fiat currency (i.e. 'EUR', 'USD')
+        @return - dict of formatted column by field, missing values are
+                  formatted as 0
+        """
+        self._check_market(market_list)
+        columns = self.formatted_columns.get(fiat)
+        if columns is None:
+            formatter = get_formatter(fiat)
+            with metrics.timer("format.columns"):
+                converted = {}
+                for field in ('price', 'market_cap', 'volume_24h'):
+                    converted[field] = list(map(self.converter.convert,
+                                                market_list.column(field),
+                                                repeat('USD'),
+                                                repeat(fiat)))
+                columns = {
+                    'price': formatter.prices(converted['price']),
+                    'market_cap': formatter.amounts(converted['market_cap']),
+                    'volume_24h': formatter.amounts(converted['volume_24h']),
+                    'circulating_supply': format_counts(market_list.column('circulating_supply')),
+                    'max_supply': format_counts(market_list.column('max_supply'))
+                }
+            self.formatted_columns[fiat] = columns
+        return columns
+
+    def _get_formatted_fields(self, market_list, currency, fiat):
+        """
+        Returns the formatted fields of one coin from the formatted
+        columns
+
+        @param market_list - MarketTable of the whole market
+        @param currency - cryptocurrency (i.e. 'bitcoin')
+        @param fiat - desired fiat currency (i.e. 'EUR', 'USD')
+        @return - dict of formatted value by field
+        """
+        columns = self.get_formatted_columns(market_list, fiat)
+        row = market_list.index[currency]
+        return {field: column[row] for field, column in columns.items()}
+
+    def _format_fields(self, data, fiat):
+        """
+        Formats the price, market cap, volume and supplies of one coin
+        on their own, for when a single coin is shown
+
+        @param data - data of the cryptocurrency
+        @param fiat - desired fiat currency (i.e. 'EUR', 'USD')
+        @return - dict of formatted value by field, missing values are
+                  left out
+        """
+        formatter = get_formatter(fiat)
+        quote = data['quote']['USD']
+        formatted = {}
+        for field, format_value in (('price', formatter.price),
+                                    ('market_cap', formatter.amount),
+                                    ('volume_24h', formatter.amount)):
+            if quote[field] is not None:
+                formatted[field] = format_value(float(self.converter.convert(float(quote[field]),
+                                                                             'USD',
+                                                                             fiat)))
+        for field in ('circulating_supply', 'max_supply'):
+            if data[field] is not None:
+                formatted[field] = format_count(data[field])
+        return formatted
+
+    def _request(self, endpoint, params, cost, parse=None):
+        """
+        Requests an endpoint of the coinmarketcap API with the key that
+        has the most credits left, and counts the credits spent
+
+        @param endpoint - path of the endpoint under the base URL
+        @param params - query parameters
+        @param cost - credits the request is expected to cost
+        @param parse - function reading the response, decodes the
+                       whole body if not given
+        @return - decoded response
+        """
+        key = self.credits.acquire(cost)
+        response = self.session.get(self.base_url + endpoint,
+                                    params=params,
+                                    headers={'X-CMC_PRO_API_KEY': key},
+                                    timeout=REQUEST_TIMEOUT,
+                                    stream=parse is not None)
+        with response:
+            if response.status_code in (402, 429):
+                self._check_key_limit(key, response)
+            response.raise_for_status()
+            if parse is None:
+                data = response.json()
+            else:
+                data = parse(response)
+        if isinstance(data, MarketTable):
+            status = data.status
+        else:
+            status = data.get("status")
+        credits = None
+        if status:
+            credits = status.get("credit_count")
+        if credits is None:
+            credits = cost
+        self.credits.record(key, credits)
+        return data
+
+    def _check_key_limit(self, key, response):
+        """
+        Stops using a key that coinmarketcap refused for being out of
+        credits
+        """
+        try:
+            error_code = response.json()["status"]["error_code"]
+        except Exception:
+            return
+        if response.status_code == 402 or error_code in KEY_LIMIT_ERRORS:
+            self.credits.exhaust(key)
+
+    def fetch_currency_data(self, fiat="USD", limit=FULL_LISTING_LIMIT):
         """
-        Fetches all cryptocurrency data
+        Fetches all cryptocurrency data. The response is parsed while
+        it downloads, straight into a MarketTable.
 
         @param fiat - desired fiat currency (i.e. 'EUR', 'USD')
-        @return - currency data
+        @param limit - number of top ranked currencies to fetch
+        @return - MarketTable of currency data
         """
         try:
-            return self.market.listings(limit=5000, convert=fiat)
+            return self._request(LISTINGS_ENDPOINT,
+                                 {"limit": limit, "convert": fiat},
+                                 listings_cost(limit),
+                                 lambda r: parse_listings(r.iter_content(STREAM_CHUNK_SIZE)))
+        except CreditException:
+            raise
         except RequestException as e:
             logger.error("Failed to retrieve data - "
                          "Connection error: {}".format(str(e)))
@@ -107,7 +259,30 @@ class CoinMarket:
         except Exception as e:
             raise CurrencyException("Failed to fetch all cryptocurrencies: `{}`".format(str(e)))
 
-    def _format_currency_data(self, data, fiat, single_search=True):
+    def fetch_quotes(self, ids, fiat="USD"):
+        """
+        Fetches the data of specific cryptocurrencies
+
+        @param ids - coinmarketcap ids of the currencies
+        @param fiat - desired fiat currency (i.e. 'EUR', 'USD')
+        @return - list of currency data
+        """
+        try:
+            quotes = self._request(QUOTES_ENDPOINT,
+                                   {"id": ",".join(str(i) for i in ids),
+                                    "convert": fiat},
+                                   quotes_cost(len(ids)))
+            return list(quotes['data'].values())
+        except CreditException:
+            raise
+        except RequestException as e:
+            logger.error("Failed to retrieve data - "
+                         "Connection error: {}".format(str(e)))
+            return None
+        except Exception as e:
+            raise CurrencyException("Failed to fetch currency quotes: `{}`".format(str(e)))
+
+    def _format_currency_data(self, data, fiat, single_search=True, formatted=None):
         """
         Formats the data fetched
 
@@ -115,10 +290,13 @@ class CoinMarket:
                           'ethereum')
         @param fiat - desired fiat currency (i.e. 'EUR', 'USD')
         @param single_search - separate more lines if True
+        @param formatted - formatted price, market cap, volume and
+                           supplies, formatted here if None
         @return - formatted currency data
         """
         try:
-            price = CurrencyConverter()
+            if formatted is None:
+                formatted = self._format_fields(data, fiat)
             isPositivePercent = True
             formatted_data = ''
             hour_trend = ''
@@ -133,62 +311,41 @@ class CoinMarket:
                                                                                                  data['symbol'],
                                                                                                  hour_trend,
                                                                                                  data['slug'])
-            converted_price = float(price.convert(float(data['quote']['USD']['price']),
-                                                  'USD',
-                                                  fiat))
-            converted_price = "{:,.6f}".format(converted_price).rstrip('0')
-            if converted_price.endswith('.'):
-                converted_price = converted_price.replace('.', '')
             # formatted_btc = '{:,.8f}'.format(float(data['price_btc'])).rstrip('0')
             # if formatted_btc.endswith('.'):
             #     formatted_btc = formatted_btc.replace('.', '')
             # eth_price = eth_price.rstrip('.')
             # if single_search:
             #     eth_price += '\n'
+            if data['quote']['USD']['price'] is None:
+                formatted_price = 'Unknown'
+            else:
+                formatted_price = '**{}**'.format(formatted['price'])
             if data['quote']['USD']['market_cap'] is None:
                 formatted_market_cap = 'Unknown'
             else:
-                converted_market_cap = price.convert(float(data['quote']['USD']['market_cap']),
-                                                     'USD',
-                                                     fiat)
+                formatted_market_cap = '**{}**'.format(formatted['market_cap'])
             if data['quote']['USD']['volume_24h'] is None:
                 formatted_volume_24h = 'Unknown'
             else:
-                converted_volume_24h = price.convert(float(data['quote']['USD']['volume_24h']),
-                                                     'USD',
-                                                     fiat)
-            if fiat in fiat_suffix:
-                formatted_price = '**{} {}**'.format(converted_price,
-                                                     fiat_currencies[fiat])
-                if data['quote']['USD']['market_cap'] is not None:
-                    formatted_market_cap = '**{:,} {}**'.format(int(converted_market_cap),
-                                                                fiat_currencies[fiat])
-                if data['quote']['USD']['volume_24h'] is not None:
-                    formatted_volume_24h = '**{:,} {}**'.format(int(converted_volume_24h),
-                                                                fiat_currencies[fiat])
-            else:
-                formatted_price = '**{}{}**'.format(fiat_currencies[fiat],
-                                                    converted_price)
-                if data['quote']['USD']['market_cap'] is not None:
-                    formatted_market_cap = '**{}{:,}**'.format(fiat_currencies[fiat],
-                                                               int(converted_market_cap))
-                if data['quote']['USD']['volume_24h'] is not None:
-                    formatted_volume_24h = '**{}{:,}**'.format(fiat_currencies[fiat],
-                                                               int(converted_volume_24h))
+                formatted_volume_24h = '**{}**'.format(formatted['volume_24h'])
             if (data['circulating_supply'] is None):
                 circulating_supply = 'Unknown'
             else:
-                circulating_supply = '**{:,}**'.format(int(float(data['circulating_supply'])))
+                circulating_supply = '**{}**'.format(formatted['circulating_supply'])
             if (data['max_supply'] is None):
                 max_supply = 'Unknown'
             else:
-                max_supply = '**{:,}**'.format(int(float(data['max_supply'])))
+                max_supply = '**{}**'.format(formatted['max_supply'])
             if single_search:
                 formatted_volume_24h += '\n'
                 max_supply += '\n'
             percent_change_1h = '**{}%**'.format(data['quote']['USD']['percent_change_1h'])
             percent_change_24h = '**{}%**'.format(data['quote']['USD']['percent_change_24h'])
             percent_change_7d = '**{}%**'.format(data['quote']['USD']['percent_change_7d'])
+            formatted_indicators = ''
+            if single_search:
+                formatted_indicators = self._format_indicators(data, fiat)
             formatted_data = ("{}\n"
                               "Price ({}): {}\n"
                               # "Price (BTC): **{}**\n"
@@ -200,6 +357,7 @@ class CoinMarket:
                               "Percent Change (1H): {}\n"
                               "Percent Change (24H): {}\n"
                               "Percent Change (7D): {}\n"
+                              "{}"
                               "".format(header,
                                         fiat,
                                         formatted_price,
@@ -213,12 +371,39 @@ class CoinMarket:
                                         max_supply,
                                         percent_change_1h,
                                         percent_change_24h,
-                                        percent_change_7d))
+                                        percent_change_7d,
+                                        formatted_indicators))
             return formatted_data, isPositivePercent
         except Exception as e:
             raise CoinMarketException("Failed to format data ({}): {}".format(data['name'],
                                                                               e))
 
+    def _format_indicators(self, data, fiat):
+        """
+        Formats the indicators of a currency that have enough samples
+
+        @param data - currency data
+        @param fiat - desired fiat currency (i.e. 'EUR', 'USD')
+        @return - formatted indicators, one per line
+        """
+        if self.indicators is None:
+            return ''
+        period = self.indicators.period
+        formatted_indicators = ''
+        for indicator in (SMA, EMA):
+            value = self.indicators.get(data['id'], indicator)
+            if value is not None:
+                formatted_indicators += "{} ({}): **{}**\n".format(indicator.upper(),
+                                                                   period,
+                                                                   self.format_price(value, fiat))
+        rsi = self.indicators.get(data['id'], RSI)
+        if rsi is not None:
+            formatted_indicators += "RSI ({}): **{:.1f}**\n".format(period, rsi)
+        volatility = self.indicators.get(data['id'], VOLATILITY)
+        if volatility is not None:
+            formatted_indicators += "Volatility: **{:.2f}%**\n".format(volatility)
+        return formatted_indicators
+
     def get_current_currency(self, market_list, acronym_list, currency, fiat):
         """
         Obtains the data of the specified currency and returns them using
@@ -259,7 +444,9 @@ class CoinMarket:
         @return - market stats
         """
         try:
-            return self.market.stats(convert=fiat)
+            return self._request(STATS_ENDPOINT, {"convert": fiat}, 1)
+        except CreditException:
+            raise
         except RequestException as e:
             logger.error("Failed to retrieve data - "
                          "Connection error: {}".format(str(e)))
@@ -276,32 +463,21 @@ class CoinMarket:
         @return - formatted stats
         """
         try:
-            c = CurrencyConverter()
+            c = self.converter
+            formatter = get_formatter(fiat)
             formatted_stats = ''
             if stats['data']['quote']['USD']['total_market_cap'] is None:
                 formatted_stats += "Total Market Cap (USD): Unknown"
             else:
-                converted_price = int(c.convert(float(stats['data']['quote']['USD']['total_market_cap']), 'USD', fiat))
-                if fiat in fiat_suffix:
-                    formatted_stats += "Total Market Cap ({}): **{:,} {}**\n".format(fiat,
-                                                                                     converted_price,
-                                                                                     fiat_currencies[fiat])
-                else:
-                    formatted_stats += "Total Market Cap ({}): **{}{:,}**\n".format(fiat,
-                                                                                    fiat_currencies[fiat],
-                                                                                    converted_price)
+                converted_price = c.convert(float(stats['data']['quote']['USD']['total_market_cap']), 'USD', fiat)
+                formatted_stats += "Total Market Cap ({}): **{}**\n".format(fiat,
+                                                                          formatter.amount(converted_price))
             if stats['data']['quote']['USD']['total_volume_24h'] is None:
                 formatted_stats += "Total Volume 24h (USD): Unknown"
             else:
-                converted_price = int(c.convert(float(stats['data']['quote']['USD']['total_volume_24h']), 'USD', fiat))
-                if fiat in fiat_suffix:
-                    formatted_stats += "Total Volume 24h ({}): **{:,} {}**\n".format(fiat,
-                                                                                     converted_price,
-                                                                                     fiat_currencies[fiat])
-                else:
-                    formatted_stats += "Total Volume 24h ({}): **{}{:,}**\n".format(fiat,
-                                                                                    fiat_currencies[fiat],
-                                                                                    converted_price)
+                converted_price = c.convert(float(stats['data']['quote']['USD']['total_volume_24h']), 'USD', fiat)
+                formatted_stats += "Total Volume 24h ({}): **{}**\n".format(fiat,
+                                                                          formatter.amount(converted_price))
             formatted_stats += "Bitcoin Dominance: **{}%**\n".format(stats['data']['btc_dominance'])
             formatted_stats += "Ethereum Dominance: **{}%**\n".format(stats['data']['eth_dominance'])
             formatted_stats += "Active Exchanges: **{:,}**\n".format(stats['data']['active_exchanges'])
@@ -328,7 +504,24 @@ class CoinMarket:
         except Exception as e:
             raise CoinMarketException(e)
 
-    def get_current_multiple_currency(self, market_list, acronym_list, currency_list, fiat, cached_data=None):
+    def _format_table_row(self, market_list, data, fiat):
+        """
+        Formats one coin of a multiple coin listing from the formatted
+        columns
+
+        @param market_list - MarketTable of the whole market
+        @param data - data of the cryptocurrency
+        @param fiat - desired fiat currency (i.e. 'EUR', 'USD')
+        @return - formatted currency data
+        """
+        formatted = self._get_formatted_fields(market_list, data['slug'], fiat)
+        return self._format_currency_data(data,
+                                          # eth_price,
+                                          fiat,
+                                          False,
+                                          formatted)[0]
+
+    def get_current_multiple_currency(self, market_list, acronym_list, currency_list, fiat, cached_data=None, keep_order=False):
         """
         Returns updated info of multiple coin stats using the current
         updated market list
@@ -337,6 +530,8 @@ class CoinMarket:
         @param cached_data - a cache of formatted cryptocurrency data
         @param currency_list - list of cryptocurrencies to retrieve
         @param fiat - desired fiat currency (i.e. 'EUR', 'USD')
+        @param keep_order - if True, currencies are shown in the order
+                            given instead of by rank
         @return - list of formatted cryptocurrency data
         """
         try:
@@ -358,34 +553,26 @@ class CoinMarket:
                 except Exception as e:
                     raise CurrencyException("Invalid currency: `{}`"
                                             "".format(currency))
-            data_list.sort(key=lambda x: int(x['cmc_rank']))
+            if not keep_order:
+                data_list.sort(key=lambda x: int(x['cmc_rank']))
             for data in data_list:
                 # eth_price = self.get_converted_coin_amt(market_list,
                 #                                         data['id'],
                 #                                         ETHEREUM,
                 #                                         1)
                 if cached_data is None:
-                    formatted_msg = self._format_currency_data(data,
-                                                               # eth_price,
-                                                               fiat,
-                                                               False)[0]
+                    formatted_msg = self._format_table_row(market_list, data, fiat)
                 else:
                     if cached_data:
                         if fiat not in cached_data:
                             cached_data[fiat] = {}
                         if data['id'] not in cached_data[fiat]:
-                            formatted_msg = self._format_currency_data(data,
-                                                                       # eth_price,
-                                                                       fiat,
-                                                                       False)[0]
+                            formatted_msg = self._format_table_row(market_list, data, fiat)
                             cached_data[fiat][data['id']] = formatted_msg
                         else:
                             formatted_msg = cached_data[fiat][data['id']]
                     else:
-                        formatted_msg = self._format_currency_data(data,
-                                                                   # eth_price,
-                                                                   fiat,
-                                                                   False)[0]
+                        formatted_msg = self._format_table_row(market_list, data, fiat)
                         if fiat not in cached_data:
                             cached_data[fiat] = {}
                         if data['id'] not in cached_data[fiat]:
@@ -404,16 +591,111 @@ class CoinMarket:
         except Exception as e:
             raise CoinMarketException(e)
 
+    def _format_compact_row(self, data, fiat):
+        """
+        Formats one row of the compact table
+
+        @param data - data of the cryptocurrency
+        @param fiat - desired fiat currency (i.e. 'EUR', 'USD')
+        @return - fixed width row
+        """
+        quote = data['quote']['USD']
+        price = quote['price']
+        if price is None:
+            formatted_price = "?"
+        else:
+            price = float(self.converter.convert(float(price), 'USD', fiat))
+            formatted_price = get_formatter(fiat).short_price(price)
+        changes = []
+        for field in ('percent_change_1h', 'percent_change_24h', 'percent_change_7d'):
+            if quote[field] is None:
+                changes.append("?")
+            else:
+                changes.append("{:+.2f}".format(float(quote[field])))
+        return COMPACT_ROW.format("#{}".format(data['cmc_rank']),
+                                  data['symbol'][:6],
+                                  formatted_price,
+                                  *changes)
+
+    def get_compact_table(self, market_list, acronym_list, currency_list, fiat, keep_order=False):
+        """
+        Returns a fixed width table of multiple coins, one line per coin.
+        Rows are formatted once per fiat until the market list is
+        refreshed.
+
+        @param market_list - list of entire crypto market
+        @param acronym_list - list of cryptocurrency acronyms
+        @param currency_list - list of cryptocurrencies to retrieve
+        @param fiat - desired fiat currency (i.e. 'EUR', 'USD')
+        @param keep_order - if True, currencies are shown in the order
+                            given instead of by rank
+        @return - list of formatted tables
+        """
+        try:
+            self._check_market(market_list)
+            data_list = []
+            for currency in currency_list:
+                if acronym_list is not None and currency.upper() in acronym_list:
+                    currency = acronym_list[currency.upper()]
+                    if "Duplicate" in currency:
+                        raise CurrencyException(currency)
+                if currency not in market_list:
+                    raise CurrencyException("Invalid currency: `{}`"
+                                            "".format(currency))
+                data = market_list[currency]
+                if data not in data_list:
+                    data_list.append(data)
+            if not keep_order:
+                data_list.sort(key=lambda x: int(x['cmc_rank']))
+            if fiat not in self.compact_rows:
+                self.compact_rows[fiat] = {}
+            cached_rows = self.compact_rows[fiat]
+            header = COMPACT_ROW.format("Rank", "Coin", "Price ({})".format(fiat),
+                                        "1H %", "24H %", "7D %")
+            formatted_data = []
+            result_msg = header
+            for data in data_list:
+                row = cached_rows.get(data['id'])
+                if row is None:
+                    row = cached_rows[data['id']] = self._format_compact_row(data, fiat)
+                # room for the code block around the table
+                if len(result_msg) + len(row) < 1990:
+                    result_msg += "\n{}".format(row)
+                else:
+                    formatted_data.append("```{}```".format(result_msg))
+                    result_msg = "{}\n{}".format(header, row)
+            formatted_data.append("```{}```".format(result_msg))
+            return formatted_data
+        except CurrencyException as e:
+            raise
+        except Exception as e:
+            raise CoinMarketException(e)
+
     def get_converted_coin_amt(self, market_list, currency1, currency2, currency_amt):
         """
-        Converts coin to coin based on btc price
+        Converts coin to coin based on the cross price of the two coins
+
+        @param market_list - MarketTable of the market
+        @param currency1 - currency to convert from
+        @param currency2 - currency to convert to
+        @param currency_amt - amount of currency1 to convert
+        @return - formatted amount of currency2
         """
         try:
-            price_btc1 = float(market_list[currency1]['price_btc'])
-            price_btc2 = float(market_list[currency2]['price_btc'])
-            btc_amt = float("{:.8f}".format(currency_amt * price_btc1))
-            converted_amt = "{:.8f}".format(btc_amt/price_btc2).rstrip('0')
+            for currency in (currency1, currency2):
+                if currency not in market_list:
+                    raise CurrencyException("Invalid currency: `{}`".format(currency))
+            cross_price = market_list.cross_price(currency1, currency2)
+            if math.isnan(cross_price):
+                raise CurrencyException("No price to convert with: `{}`, `{}`"
+                                        "".format(currency1, currency2))
+            converted_amt = "{:.8f}".format(currency_amt * cross_price).rstrip('0')
+            if converted_amt.endswith('.'):
+                converted_amt = converted_amt.replace('.', '')
             return converted_amt
+        except CurrencyException as e:
+            raise
         except Exception as e:
             print("Failed to convert coin. See error.log.")
             logger.error("Exception: {}".format(str(e)))
+            raise CoinMarketException(e)
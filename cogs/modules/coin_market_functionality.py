@@ -1,19 +1,37 @@
 from bot_logger import logger
+from bot_metrics import metrics
 from cogs.modules.coin_market import CoinMarketException, CurrencyException, FiatException, MarketStatsException
+from cogs.modules.fuzzy_search import FuzzySearch
+from cogs.modules.outbound_scheduler import INTERACTIVE
+from cogs.modules.screener import Screener, ScreenerException
 from discord.errors import Forbidden
+from itertools import repeat
 import discord
+import math
+import operator
+import re
 
 
 CMB_ADMIN = "CMB ADMIN"
 ADMIN_ONLY = "ADMIN_ONLY"
 CMC_DISABLED = "CMC_DISABLED"
+STALE_FOOTER = ("Coinmarketcap can't be reached right now, "
+                "prices shown may be out of date.")
+MAX_RANK_RANGE = 100
+MAX_BATCH_ITEMS = 100
+COMPACT_FLAG = "-c"  # $search option for the compact table
+BATCH_SEPARATORS = re.compile(r"[,;\n]")
+PAGE_TIMEOUT = 120
+PREVIOUS_PAGE = "\u25c0"
+NEXT_PAGE = "\u25b6"
 
 
 class CoinMarketFunctionality:
     """Handles CMC command functionality"""
 
-    def __init__(self, bot, coin_market, server_data):
+    def __init__(self, bot, coin_market, server_data, outbound):
         self.bot = bot
+        self.outbound = outbound
         self.server_data = server_data
         self.acronym_list = ""
         self.market_list = ""
@@ -21,18 +39,29 @@ class CoinMarketFunctionality:
         self.top_five = []
         self.top_five_gains = []
         self.top_five_losses = []
+        self.ranked_currencies = []
+        self.rank_pages = {}
+        self.market_stale = False
         self.coin_market = coin_market
+        self.screener = Screener()
+        self.fuzzy_search = FuzzySearch()
 
-    def update(self, market_list=None, acronym_list=None, market_stats=None, server_data=None, top_five=None, top_five_gains=None, top_five_losses=None):
+    def update(self, market_list=None, acronym_list=None, market_stats=None, server_data=None, top_five=None, top_five_gains=None, top_five_losses=None, stale=None, ranked_currencies=None):
         """
         Updates utilities with new coin market and server data
         """
+        if stale is not None:
+            self.market_stale = stale
         if server_data:
             self.server_data = server_data
         if market_list:
             self.market_list = market_list
+            self.rank_pages.clear()
+            self.fuzzy_search.update(market_list)
         if acronym_list:
             self.acronym_list = acronym_list
+        if ranked_currencies:
+            self.ranked_currencies = ranked_currencies
         if market_stats:
             self.market_stats = market_stats
         if top_five:
@@ -60,25 +89,18 @@ class CoinMarketFunctionality:
         except Exception as e:
             return True
 
-    async def _say_msg(self, msg=None, channel=None, emb=None):
+    async def _say_msg(self, msg=None, channel=None, emb=None, priority=INTERACTIVE):
         """
         Bot will say msg if given correct permissions
 
         @param msg - msg to say
         @param channel - channel to send msg to
         @param emb - embedded msg to say
+        @param priority - outbound priority of the msg
+        @return - the sent msg
         """
         try:
-            if channel:
-                if emb:
-                    await self.bot.send_message(channel, embed=emb)
-                else:
-                    await self.bot.send_message(channel, msg)
-            else:
-                if emb:
-                    await self.bot.say(embed=emb)
-                else:
-                    await self.bot.say(msg)
+            return await self.outbound.send(channel, msg, emb, priority)
         except CoinMarketException as e:
             pass
 
@@ -89,7 +111,7 @@ class CoinMarketFunctionality:
         @param e - error object
         """
         try:
-            await self.bot.say(e)
+            await self.outbound.send(content=e)
         except Exception as e:
             pass
 
@@ -147,6 +169,135 @@ class CoinMarketFunctionality:
             print("An error has occured. See error.log.")
             logger.error("Exception: {}".format(str(e)))
 
+    def _make_page(self, title, pages, page):
+        """
+        Builds the embed of one page
+
+        @param title - title of every page
+        @param pages - msgs to show
+        @param page - index of the page to build
+        """
+        em = discord.Embed(title=title,
+                           description=pages[page],
+                           colour=0xFF9900)
+        footer = "Page {}/{}".format(page + 1, len(pages))
+        if self.market_stale:
+            footer = "{} - {}".format(footer, STALE_FOOTER)
+        em.set_footer(text=footer)
+        return em
+
+    async def _paginate(self, ctx, title, pages):
+        """
+        Shows the first page and lets the user who sent the command
+        flip through the rest with reactions. Flipping runs in its own
+        task so the command is done once the first page is sent.
+
+        @param ctx - context of the command sent
+        @param title - title of every page
+        @param pages - msgs to show
+        """
+        msg = await self._say_msg(emb=self._make_page(title, pages, 0))
+        if msg is not None and len(pages) > 1:
+            self.bot.loop.create_task(self._flip_pages(msg,
+                                                       ctx.message.author,
+                                                       title,
+                                                       pages))
+
+    async def _flip_pages(self, msg, user, title, pages):
+        """
+        Edits a paged msg whenever the user reacts with an arrow, until
+        nobody has reacted for a while
+
+        @param msg - msg showing the first page
+        @param user - user allowed to flip pages
+        @param title - title of every page
+        @param pages - msgs to show
+        """
+        page = 0
+        try:
+            await self.bot.add_reaction(msg, PREVIOUS_PAGE)
+            await self.bot.add_reaction(msg, NEXT_PAGE)
+            while True:
+                result = await self.bot.wait_for_reaction([PREVIOUS_PAGE, NEXT_PAGE],
+                                                          user=user,
+                                                          timeout=PAGE_TIMEOUT,
+                                                          message=msg)
+                if result is None:
+                    break
+                if result.reaction.emoji == NEXT_PAGE:
+                    page = (page + 1) % len(pages)
+                else:
+                    page = (page - 1) % len(pages)
+                await self.bot.edit_message(msg,
+                                            embed=self._make_page(title, pages, page))
+                try:
+                    await self.bot.remove_reaction(msg,
+                                                   result.reaction.emoji,
+                                                   result.user)
+                except Forbidden:
+                    pass
+            await self.bot.clear_reactions(msg)
+        except Forbidden:
+            pass
+        except Exception as e:
+            print("An error has occured. See error.log.")
+            logger.error("Exception: {}".format(str(e)))
+
+    async def display_rank(self, ctx, rank_range, fiat):
+        """
+        Displays the currencies within a range of ranks, one page at a
+        time
+
+        @param ctx - context of the command sent
+        @param rank_range - ranks to show (i.e. '50-75' or '50')
+        @param fiat - desired fiat currency (i.e. 'EUR', 'USD')
+        """
+        try:
+            if not self._check_permission(ctx):
+                return
+            start, _, end = rank_range.partition("-")
+            try:
+                start = int(start)
+                end = int(end) if end else start
+            except ValueError:
+                await self._say_msg("Please enter a range of ranks, i.e. "
+                                    "`$rank 50-75`.")
+                return
+            if start < 1 or end < start or end - start >= MAX_RANK_RANGE:
+                await self._say_msg("Please enter a range of up to {} ranks, "
+                                    "i.e. `$rank 50-75`.".format(MAX_RANK_RANGE))
+                return
+            ucase_fiat = self.coin_market.fiat_check(fiat)
+            key = (start, end, ucase_fiat)
+            pages = self.rank_pages.get(key)
+            if pages is None:
+                currencies = self.ranked_currencies[start - 1:end]
+                if not currencies:
+                    await self._say_msg("No currencies are ranked that low.")
+                    return
+                pages = self.coin_market.get_current_multiple_currency(self.market_list,
+                                                                       None,
+                                                                       currencies,
+                                                                       ucase_fiat,
+                                                                       keep_order=True)[0]
+                self.rank_pages[key] = pages
+            else:
+                metrics.incr("rank.cached_pages")
+            await self._paginate(ctx,
+                                 "Ranks {}-{}".format(start, end),
+                                 pages)
+        except Forbidden:
+            pass
+        except FiatException as e:
+            logger.error("FiatException: {}".format(str(e)))
+            await self._say_error(e)
+        except CoinMarketException as e:
+            print("An error has occured. See error.log.")
+            logger.error("CoinMarketException: {}".format(str(e)))
+        except Exception as e:
+            print("An error has occured. See error.log.")
+            logger.error("Exception: {}".format(str(e)))
+
     async def display_search(self, ctx, args):
         """
         Embeds search results and displays it in chat.
@@ -161,9 +312,15 @@ class CoinMarketFunctionality:
                 await self._say_msg("No coins were entered.")
                 return
             args = list(args)
+            compact = COMPACT_FLAG in args
+            if compact:
+                args = [arg for arg in args if arg != COMPACT_FLAG]
+                if not args:
+                    await self._say_msg("No coins were entered.")
+                    return
             first_post = True
             currency = args[0]
-            if len(args) == 1:
+            if len(args) == 1 and not compact:
                 fiat = 'USD'
             else:
                 try:
@@ -172,11 +329,17 @@ class CoinMarketFunctionality:
                 except FiatException:
                     fiat = 'USD'
                     pass
-                if len(args) > 1:
+                if compact:
+                    data = self.coin_market.get_compact_table(self.market_list,
+                                                              self.acronym_list,
+                                                              args,
+                                                              fiat)
+                elif len(args) > 1:
                     data = self.coin_market.get_current_multiple_currency(self.market_list,
                                                                           self.acronym_list,
                                                                           args,
                                                                           fiat)[0]
+                if compact or len(args) > 1:
                     for msg in data:
                         if first_post:
                             em = discord.Embed(title="Search results",
@@ -201,13 +364,88 @@ class CoinMarketFunctionality:
                                    description=data,
                                    colour=0xD14836)
             em.set_thumbnail(url='https://s2.coinmarketcap.com/static/img/coins/128x128/{}.png'.format(id))
-            await self.bot.say(embed=em)
+            if self.market_stale:
+                em.set_footer(text=STALE_FOOTER)
+            await self._say_msg(emb=em)
         except Forbidden:
             pass
         except CurrencyException as e:
             # logger.error("CurrencyException: {}".format(str(e)))
             # await self._say_error(e)
+            msg = self._format_suggestions(args)
+            if msg:
+                await self._say_msg(msg)
+        except CoinMarketException as e:
+            print("An error has occured. See error.log.")
+            logger.error("CoinMarketException: {}".format(str(e)))
+        except Exception as e:
+            print("An error has occured. See error.log.")
+            logger.error("Exception: {}".format(str(e)))
+
+    def _format_suggestions(self, currencies):
+        """
+        Suggests coins for the searched currencies that weren't found
+
+        @param currencies - cryptocurrencies that were searched for
+        @return - 'did you mean' msg, or None if there's nothing close
+        """
+        lines = []
+        for currency in currencies:
+            if (currency.upper() in self.acronym_list
+                    or currency in self.market_list):
+                continue
+            suggestions = self.fuzzy_search.suggest(currency)
+            if suggestions:
+                lines.append("Couldn't find `{}`. Did you mean {}?"
+                             "".format(currency,
+                                       ", ".join("**{}** (`{}`)".format(self.market_list[slug]['name'],
+                                                                        slug)
+                                                 for slug in suggestions)))
+        if lines:
+            return "\n".join(lines)
+        return None
+
+    async def display_screen(self, ctx, args):
+        """
+        Displays the coins that pass the filters of a screener query
+
+        @param ctx - context of the command sent
+        @param args - filters and options of the query
+        """
+        try:
+            if not self._check_permission(ctx):
+                return
+            currencies, fiat = self.screener.screen(self.market_list,
+                                                    " ".join(args))
+            if not currencies:
+                await self._say_msg("No coins match the screener.")
+                return
+            ucase_fiat = self.coin_market.fiat_check(fiat)
+            data = self.coin_market.get_current_multiple_currency(self.market_list,
+                                                                  None,
+                                                                  currencies,
+                                                                  ucase_fiat,
+                                                                  keep_order=True)[0]
+            first_post = True
+            for msg in data:
+                if first_post:
+                    em = discord.Embed(title="Screener results",
+                                       description=msg,
+                                       colour=0xFF9900)
+                    first_post = False
+                else:
+                    em = discord.Embed(description=msg,
+                                       colour=0xFF9900)
+                if self.market_stale:
+                    em.set_footer(text=STALE_FOOTER)
+                await self._say_msg(emb=em)
+        except Forbidden:
             pass
+        except ScreenerException as e:
+            await self._say_error(e)
+        except FiatException as e:
+            logger.error("FiatException: {}".format(str(e)))
+            await self._say_error(e)
         except CoinMarketException as e:
             print("An error has occured. See error.log.")
             logger.error("CoinMarketException: {}".format(str(e)))
@@ -228,7 +466,7 @@ class CoinMarketFunctionality:
             em = discord.Embed(title="Market Stats",
                                description=data,
                                colour=0x008000)
-            await self.bot.say(embed=em)
+            await self._say_msg(emb=em)
         except Forbidden:
             pass
         except MarketStatsException as e:
@@ -283,11 +521,11 @@ class CoinMarketFunctionality:
                                                 acronym2)),
                                description=result,
                                colour=0xFF9900)
-            await self.bot.say(embed=em)
+            await self._say_msg(emb=em)
         except Forbidden:
             pass
         except Exception as e:
-            await self.bot.say("Command failed. Make sure the arguments are valid.")
+            await self._say_error("Command failed. Make sure the arguments are valid.")
             print("An error has occured. See error.log.")
             logger.error("Exception: {}".format(str(e)))
 
@@ -318,7 +556,7 @@ class CoinMarketFunctionality:
                                                            ucase_fiat),
                                description=result,
                                colour=0xFF9900)
-            await self.bot.say(embed=em)
+            await self._say_msg(emb=em)
         except Forbidden:
             pass
         except CurrencyException as e:
@@ -328,7 +566,7 @@ class CoinMarketFunctionality:
             logger.error("FiatException: {}".format(str(e)))
             await self._say_error(e)
         except Exception as e:
-            await self.bot.say("Command failed. Make sure the arguments are valid.")
+            await self._say_error("Command failed. Make sure the arguments are valid.")
             print("An error has occured. See error.log.")
             logger.error("Exception: {}".format(str(e)))
 
@@ -360,7 +598,7 @@ class CoinMarketFunctionality:
                                                            data['symbol']),
                                description=result,
                                colour=0xFF9900)
-            await self.bot.say(embed=em)
+            await self._say_msg(emb=em)
         except Forbidden:
             pass
         except CurrencyException as e:
@@ -370,7 +608,7 @@ class CoinMarketFunctionality:
             logger.error("FiatException: {}".format(str(e)))
             await self._say_error(e)
         except Exception as e:
-            await self.bot.say("Command failed. Make sure the arguments are valid.")
+            await self._say_error("Command failed. Make sure the arguments are valid.")
             print("An error has occured. See error.log.")
             logger.error("Exception: {}".format(str(e)))
 
@@ -411,7 +649,282 @@ class CoinMarketFunctionality:
             em = discord.Embed(title="Profit calculated ({})".format(currency),
                                description=msg,
                                colour=color)
-            await self.bot.say(embed=em)
+            await self._say_msg(emb=em)
+        except Forbidden:
+            pass
+        except CurrencyException as e:
+            logger.error("CurrencyException: {}".format(str(e)))
+            await self._say_error(e)
+        except FiatException as e:
+            logger.error("FiatException: {}".format(str(e)))
+            await self._say_error(e)
+        except Exception as e:
+            await self._say_error("Command failed. Make sure the arguments are valid.")
+            print("An error has occured. See error.log.")
+            logger.error("Exception: {}".format(str(e)))
+
+    def _parse_batch(self, items, fields):
+        """
+        Reads the items of a batch command and resolves their currencies
+        in one pass
+
+        @param items - items separated by commas or new lines, each a
+                       currency followed by `fields` numbers. The last
+                       item may end with the fiat of the whole batch
+        @param fields - numbers each item has after the currency
+        @return - (symbols, rows, numbers, fiat, invalid), where rows are
+                  the MarketTable rows of the currencies, numbers holds
+                  one list per field and invalid lists the items that
+                  couldn't be read
+        """
+        entries = [item.split() for item in BATCH_SEPARATORS.split(items)
+                   if item.strip()]
+        if len(entries) > MAX_BATCH_ITEMS:
+            raise CurrencyException("Up to {} items can be converted at once."
+                                    "".format(MAX_BATCH_ITEMS))
+        fiat = "USD"
+        if entries and len(entries[-1]) == fields + 2:
+            fiat = entries[-1].pop()
+        fiat = self.coin_market.fiat_check(fiat)
+        index = self.market_list.index
+        symbol_column = self.market_list.column('symbol')
+        symbols = []
+        rows = []
+        numbers = [[] for _ in range(fields)]
+        invalid = []
+        for entry in entries:
+            row = None
+            if len(entry) == fields + 1:
+                currency = entry[0]
+                if currency.upper() in self.acronym_list:
+                    currency = self.acronym_list[currency.upper()]
+                row = index.get(currency)
+                try:
+                    values = [float(value) for value in entry[1:]]
+                except ValueError:
+                    row = None
+            if row is None:
+                invalid.append(" ".join(entry))
+                continue
+            symbols.append(symbol_column[row])
+            rows.append(row)
+            for column, value in zip(numbers, values):
+                column.append(value)
+        return symbols, rows, numbers, fiat, invalid
+
+    def _format_amount(self, amount):
+        """
+        Formats an amount of coins without trailing zeros
+        """
+        formatted_amount = "{:,.8f}".format(amount).rstrip('0')
+        if formatted_amount.endswith('.'):
+            formatted_amount = formatted_amount.replace('.', '')
+        return formatted_amount
+
+    def _format_worth(self, worth, fiat):
+        """
+        Formats a fiat amount that's already converted, '?' if unknown
+        """
+        if math.isnan(worth):
+            return "?"
+        return self.coin_market.format_price(worth, fiat, convert=False)
+
+    def _format_profit(self, profit, fiat):
+        """
+        Formats a profit with its sign, '?' if unknown
+        """
+        if math.isnan(profit):
+            return "?"
+        sign = "-" if profit < 0 else "+"
+        return "{}{}".format(sign, self.coin_market.format_price(abs(profit),
+                                                                 fiat,
+                                                                 convert=False))
+
+    def _make_table_pages(self, header, table_rows, totals, invalid):
+        """
+        Lays rows out as an aligned table, split into pages that fit a
+        msg, with the totals and the unreadable items on the last page
+
+        @param header - column names
+        @param table_rows - rows of formatted cells
+        @param totals - msg to show under the table
+        @param invalid - items that couldn't be read
+        @return - list of page msgs
+        """
+        widths = [max(len(row[column]) for row in [header] + table_rows)
+                  for column in range(len(header))]
+
+        def make_line(row):
+            cells = [row[0].ljust(widths[0])]
+            cells += [cell.rjust(width) for cell, width in zip(row[1:], widths[1:])]
+            return "  ".join(cells)
+
+        header_line = make_line(header)
+        footer = totals
+        if invalid:
+            footer += "\nCouldn't read: {}".format(", ".join("`{}`".format(item)
+                                                            for item in invalid))
+        pages = []
+        lines = []
+        size = len(header_line)
+        for row in table_rows:
+            line = make_line(row)
+            if size + len(line) + 10 > 2000:
+                pages.append("```\n{}\n{}```".format(header_line, "\n".join(lines)))
+                lines = []
+                size = len(header_line)
+            lines.append(line)
+            size += len(line) + 1
+        page = "```\n{}\n{}```".format(header_line, "\n".join(lines))
+        if len(page) + len(footer) < 2000:
+            pages.append("{}\n{}".format(page, footer))
+        else:
+            pages.append(page)
+            pages.append(footer)
+        return pages
+
+    async def calculate_coin_to_fiat_batch(self, ctx, items):
+        """
+        Calculates what many amounts of coins are worth and displays
+        them as one table with the total
+
+        @param ctx - context of the command sent
+        @param items - currency and amount of coins per item (i.e.
+                       'btc 0.5, eth 10, ltc 200 EUR')
+        """
+        try:
+            if not self._check_permission(ctx):
+                return
+            with metrics.timer("batch.coin_to_fiat"):
+                symbols, rows, numbers, fiat, invalid = self._parse_batch(items, 1)
+                if not rows:
+                    await self._say_error("No valid items were entered. Enter "
+                                          "a currency and an amount per item.")
+                    return
+                amounts = numbers[0]
+                rate = float(self.coin_market.converter.convert(1.0, "USD", fiat))
+                prices = self.market_list.column('price')
+                worths = list(map(operator.mul,
+                                  amounts,
+                                  map(operator.mul, map(prices.__getitem__, rows), repeat(rate))))
+                total = math.fsum(worth for worth in worths if not math.isnan(worth))
+                table_rows = [[symbol,
+                               self._format_amount(amount),
+                               self._format_worth(worth, fiat)]
+                              for symbol, amount, worth in zip(symbols, amounts, worths)]
+                pages = self._make_table_pages(["Coin", "Amount", "Worth"],
+                                               table_rows,
+                                               "Total worth: **{}**".format(self._format_worth(total, fiat)),
+                                               invalid)
+            await self._paginate(ctx, "Coins to {}".format(fiat), pages)
+        except Forbidden:
+            pass
+        except CurrencyException as e:
+            logger.error("CurrencyException: {}".format(str(e)))
+            await self._say_error(e)
+        except FiatException as e:
+            logger.error("FiatException: {}".format(str(e)))
+            await self._say_error(e)
+        except Exception as e:
+            await self._say_error("Command failed. Make sure the arguments are valid.")
+            print("An error has occured. See error.log.")
+            logger.error("Exception: {}".format(str(e)))
+
+    async def calculate_fiat_to_coin_batch(self, ctx, items):
+        """
+        Calculates how many coins many fiat amounts buy and displays
+        them as one table with the total spent
+
+        @param ctx - context of the command sent
+        @param items - currency and fiat amount per item (i.e.
+                       'btc 500, eth 200 EUR')
+        """
+        try:
+            if not self._check_permission(ctx):
+                return
+            with metrics.timer("batch.fiat_to_coin"):
+                symbols, rows, numbers, fiat, invalid = self._parse_batch(items, 1)
+                if not rows:
+                    await self._say_error("No valid items were entered. Enter "
+                                          "a currency and a fiat amount per item.")
+                    return
+                spent = numbers[0]
+                rate = float(self.coin_market.converter.convert(1.0, "USD", fiat))
+                prices = self.market_list.column('price')
+                coin_amounts = list(map(operator.truediv,
+                                        spent,
+                                        map(operator.mul, map(prices.__getitem__, rows), repeat(rate))))
+                total = math.fsum(spent)
+                table_rows = [[symbol,
+                               self._format_worth(price, fiat),
+                               "?" if math.isnan(amount) else self._format_amount(amount)]
+                              for symbol, price, amount in zip(symbols, spent, coin_amounts)]
+                pages = self._make_table_pages(["Coin", "Spent", "Coins"],
+                                               table_rows,
+                                               "Total spent: **{}**".format(self._format_worth(total, fiat)),
+                                               invalid)
+            await self._paginate(ctx, "{} to coins".format(fiat), pages)
+        except Forbidden:
+            pass
+        except CurrencyException as e:
+            logger.error("CurrencyException: {}".format(str(e)))
+            await self._say_error(e)
+        except FiatException as e:
+            logger.error("FiatException: {}".format(str(e)))
+            await self._say_error(e)
+        except Exception as e:
+            await self._say_error("Command failed. Make sure the arguments are valid.")
+            print("An error has occured. See error.log.")
+            logger.error("Exception: {}".format(str(e)))
+
+    async def calculate_profit_batch(self, ctx, items):
+        """
+        Performs the profit calculation of many purchases and displays
+        them as one table with the totals
+
+        @param ctx - context of the command sent
+        @param items - currency, amount of coins and price paid per coin
+                       per item (i.e. 'btc 0.5 8000, eth 10 300 EUR')
+        """
+        try:
+            if not self._check_permission(ctx):
+                return
+            with metrics.timer("batch.profit"):
+                symbols, rows, numbers, fiat, invalid = self._parse_batch(items, 2)
+                if not rows:
+                    await self._say_error("No valid items were entered. Enter a "
+                                          "currency, an amount and a cost per item.")
+                    return
+                amounts, costs = numbers
+                rate = float(self.coin_market.converter.convert(1.0, "USD", fiat))
+                prices = self.market_list.column('price')
+                investments = list(map(operator.mul, amounts, costs))
+                worths = list(map(operator.mul,
+                                  amounts,
+                                  map(operator.mul, map(prices.__getitem__, rows), repeat(rate))))
+                profits = list(map(operator.sub, worths, investments))
+                known = [i for i, worth in enumerate(worths) if not math.isnan(worth)]
+                total_investment = math.fsum(investments[i] for i in known)
+                total_worth = math.fsum(worths[i] for i in known)
+                total_profit = total_worth - total_investment
+                table_rows = [[symbol,
+                               self._format_amount(amount),
+                               self._format_worth(investment, fiat),
+                               self._format_worth(worth, fiat),
+                               self._format_profit(profit, fiat)]
+                              for symbol, amount, investment, worth, profit
+                              in zip(symbols, amounts, investments, worths, profits)]
+                totals = ("Initial investment: **{}**\n"
+                          "Profit: **{}**\n"
+                          "Total investment worth: **{}**"
+                          "".format(self._format_worth(total_investment, fiat),
+                                    self._format_profit(total_profit, fiat),
+                                    self._format_worth(total_worth, fiat)))
+                pages = self._make_table_pages(["Coin", "Amount", "Cost", "Worth", "Profit"],
+                                               table_rows,
+                                               totals,
+                                               invalid)
+            await self._paginate(ctx, "Profit calculated ({})".format(fiat), pages)
         except Forbidden:
             pass
         except CurrencyException as e:
@@ -421,6 +934,6 @@ class CoinMarketFunctionality:
             logger.error("FiatException: {}".format(str(e)))
             await self._say_error(e)
         except Exception as e:
-            await self.bot.say("Command failed. Make sure the arguments are valid.")
+            await self._say_error("Command failed. Make sure the arguments are valid.")
             print("An error has occured. See error.log.")
             logger.error("Exception: {}".format(str(e)))
@@ -2,10 +2,9 @@ from bot_logger import logger
 import requests
 
 
-TOKEN_URL = ("https://api.coinmarketcal.com/oauth/v2/token?"
-             "grant_type=client_credentials")
-
-EVENT_URL = "https://api.coinmarketcal.com/v1/events?"
+DEFAULT_BASE_URL = "https://api.coinmarketcal.com/"
+TOKEN_PATH = "oauth/v2/token?grant_type=client_credentials"
+EVENT_PATH = "v1/events?"
 
 
 class CoinMarketCalException(Exception):
@@ -15,10 +14,17 @@ class CoinMarketCalException(Exception):
 class CoinMarketCal:
     """Handles coinmarketcal API features"""
 
-    def __init__(self, client_id, client_secret):
+    def __init__(self, client_id, client_secret, base_url=DEFAULT_BASE_URL):
         """
         Initiates CoinMarketCal
+
+        @param client_id - coinmarketcal client id
+        @param client_secret - coinmarketcal client secret
+        @param base_url - URL of the coinmarketcal API (or a stand-in)
         """
+        base_url = base_url.rstrip('/') + '/'
+        self.token_url = base_url + TOKEN_PATH
+        self.event_url = base_url + EVENT_PATH
         self.access_token = self.get_access_token(client_id,
                                                   client_secret)
 
@@ -30,7 +36,7 @@ class CoinMarketCal:
         """
         try:
             r_url = ("{}&client_id={}&client_secret={}"
-                     "".format(TOKEN_URL, client_id, client_secret))
+                     "".format(self.token_url, client_id, client_secret))
             token_req = requests.get(r_url)
             return token_req.json()["access_token"]
         except CoinMarketCalException as e:
@@ -47,7 +53,7 @@ class CoinMarketCal:
         """
         try:
             r_url = ("{}access_token={}&page={}&max=1&coins={}"
-                     "".format(EVENT_URL, self.access_token, page, coin))
+                     "".format(self.event_url, self.access_token, page, coin))
             event_req = requests.get(r_url)
             return event_req.json()
         except CoinMarketCalException as e:
@@ -0,0 +1,151 @@
+from bot_metrics import metrics
+from discord.ext.commands.context import Context
+from discord.ext.commands.errors import CommandError
+from discord.ext.commands.view import StringView
+import time
+
+
+SEARCH_SHORTCUT = "s"
+LOW_PRIORITY_COMMANDS = {
+    "search", "s", "topfive", "rank", "screen", "stats", "profit", "p",
+    "profitb", "cc", "cf", "ccb", "cfb", "getp", "wl", "help", "profile",
+    "updates", "donate", "patreon", "info"
+}
+RATE_LIMITED_MSG = "Slow down, you're sending commands too fast. Try again in a few seconds."
+SHED_MSG = "The bot is busy right now. Try again in a minute."
+
+
+class CommandDispatcher:
+    """Routes incoming messages to bot commands"""
+
+    def __init__(self, bot, prefix_list, default_prefix, rate_limiter=None, outbound=None):
+        self.bot = bot
+        self.prefix_list = prefix_list
+        self.default_prefix = default_prefix
+        self.rate_limiter = rate_limiter
+        self.outbound = outbound
+        self.mention = None
+        self.in_flight = 0
+        self.created_at = time.monotonic()
+        self.answered = False
+
+    def get_backlog(self):
+        """
+        Returns the amount of work the bot has yet to finish
+        """
+        return self.in_flight + metrics.get_gauge("outbound.backlog")
+
+    def get_prefix(self, message):
+        """
+        Returns the command prefix of the server the message was sent in
+
+        @param message - message received
+        @return - custom server prefix if set, otherwise the default prefix
+        """
+        server = message.server
+        if server is None:
+            return self.default_prefix
+        return self.prefix_list.get(server.id, self.default_prefix)
+
+    def is_mention(self, message):
+        """
+        Checks if the message starts by mentioning the bot
+
+        @param message - message received
+        """
+        if self.mention is None:
+            self.mention = "<@{}>".format(self.bot.user.id)
+        return message.content.startswith(self.mention)
+
+    async def _warn(self, message, msg):
+        """
+        Tells the author their command was dropped, unless they were
+        told recently
+
+        @param message - message of the dropped command
+        @param msg - why it was dropped
+        """
+        if self.outbound is not None and self.rate_limiter.should_warn(message):
+            await self.outbound.send(message.channel, msg)
+
+    async def on_message(self, message):
+        """
+        Handles a message the bot received: a mention of the bot gets
+        the server prefix back, anything else is dispatched
+
+        @param message - message received
+        """
+        if message.author.bot:
+            return
+        if self.is_mention(message):
+            await self.outbound.send(message.channel,
+                                     "The prefix for this bot is `{0}`. "
+                                     "Type `{0}help` for a list of commands."
+                                     "".format(self.get_prefix(message)))
+        else:
+            await self.dispatch(message)
+
+    async def dispatch(self, message):
+        """
+        Invokes the command the message is asking for. Messages that
+        don't start with the server prefix are rejected before anything
+        gets parsed, and unknown commands (i.e. "$bitcoin") are routed
+        to the search command with the coin left as its argument.
+        Commands over their rate limit are dropped, and so are low
+        priority commands while the bot is backlogged. The author is
+        told why, but not more often than the rate limiter's
+        warn_interval.
+
+        @param message - message received
+        @return - True if a command was invoked
+        """
+        prefix = self.get_prefix(message)
+        if not message.content.startswith(prefix):
+            return False
+        # bot.say() and the outbound scheduler look these up from the
+        # calling frames
+        _internal_channel = message.channel
+        _internal_author = message.author
+        view = StringView(message.content)
+        view.skip_string(prefix)
+        invoker = view.get_word()
+        if not invoker:
+            return False
+        command = self.bot.commands.get(invoker)
+        if command is None:
+            command = self.bot.commands[SEARCH_SHORTCUT]
+            view.undo()
+            invoker = SEARCH_SHORTCUT
+        if self.rate_limiter is not None:
+            # shed before spending tokens, a dropped command costs nothing
+            if (command.name in LOW_PRIORITY_COMMANDS
+                    and self.rate_limiter.should_shed(self.get_backlog())):
+                await self._warn(message, SHED_MSG)
+                return False
+            if not self.rate_limiter.allow(message):
+                await self._warn(message, RATE_LIMITED_MSG)
+                return False
+        ctx = Context(bot=self.bot,
+                      invoked_with=invoker,
+                      message=message,
+                      view=view,
+                      prefix=prefix)
+        self.bot.dispatch('command', command, ctx)
+        self.in_flight += 1
+        metrics.set_gauge("dispatch.in_flight", self.in_flight)
+        try:
+            await command.invoke(ctx)
+        except CommandError as e:
+            command.dispatch_error(e, ctx)
+        else:
+            self.bot.dispatch('command_completion', command, ctx)
+            if not self.answered:
+                # time to first answer, compare with startup.warm
+                self.answered = True
+                metrics.set_gauge("startup.first_answer",
+                                  round(time.monotonic() - self.created_at, 3))
+        finally:
+            self.in_flight -= 1
+            metrics.set_gauge("dispatch.in_flight", self.in_flight)
+        metrics.incr("dispatch.commands")
+        return True
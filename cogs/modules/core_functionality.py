@@ -1,58 +1,227 @@
 from bot_logger import logger
+from bot_metrics import metrics
 from cogs.modules.alert_functionality import AlertFunctionality
+from cogs.modules.anomaly_scanner import AnomalyScanner
 # from cogs.modules.cal_functionality import CalFunctionality
 from cogs.modules.coin_market_functionality import CoinMarketFunctionality
-from cogs.modules.coin_market import CoinMarket
+from cogs.modules.circuit_breaker import CircuitBreaker, HALF_OPEN, retry_with_backoff
+from cogs.modules.coin_market import CoinMarket, CROSS_CURRENCIES, DEFAULT_BASE_URL, FULL_LISTING_LIMIT
+from cogs.modules.credit_pool import CreditException, listings_cost, quotes_cost
+from cogs.modules.market_snapshot import MarketSnapshot, read_snapshot, write_snapshot
 from cogs.modules.misc_functionality import MiscFunctionality
+from cogs.modules.indicators import IndicatorEngine
+from cogs.modules.outbound_scheduler import INTERACTIVE, OutboundScheduler
+from cogs.modules.portfolio_functionality import PortfolioFunctionality
+from cogs.modules.price_history import PriceHistory
 from cogs.modules.subscriber_functionality import SubscriberFunctionality
-import asyncio
+from cogs.modules.task_scheduler import PeriodicJob, TaskScheduler
+from cogs.modules.watchlist_functionality import WatchlistFunctionality
 import datetime
 import discord
+import functools
 import json
+import math
+import time
 
 
 CMB_ADMIN = "CMB ADMIN"
 MAX_TOP_CURRENCY_DISPLAY = 5
 LIMIT_TOP_CURRENCY = 400
+HOUR = 3600
+DAY = 24 * HOUR
+STATS_COST = 1  # credits of the global metrics request made every refresh
+MIN_REFRESH_INTERVAL = 60  # how often coinmarketcap updates its data
+FETCH_ATTEMPTS = 4
+FULL_REFRESH = "full"
+HOT_REFRESH = "hot"
 
 
 class CoreFunctionalityException(Exception):
     """Handles core related errors"""
 
 
+def estimate_daily_credits(refresh_interval, full_refresh_interval, hot_coin_count):
+    """
+    Estimates the coinmarketcap API credits market refreshes cost a day,
+    counting one quotes credit per hot refresh for watched coins outside
+    the hot ones
+
+    @param refresh_interval - seconds between market refreshes
+    @param full_refresh_interval - seconds between full refreshes
+    @param hot_coin_count - top ranked coins fetched by hot refreshes
+    @return - credits per day
+    """
+    runs = DAY / refresh_interval
+    # a full refresh happens on the first run once it's due
+    full_runs = DAY / (math.ceil(full_refresh_interval / refresh_interval) * refresh_interval)
+    full_cost = listings_cost(FULL_LISTING_LIMIT) + STATS_COST
+    hot_cost = listings_cost(hot_coin_count) + STATS_COST + quotes_cost(1)
+    return math.ceil(full_runs * full_cost + (runs - full_runs) * hot_cost)
+
+
+def shortest_refresh_interval(budget, full_refresh_interval, hot_coin_count):
+    """
+    Works out the shortest market refresh interval a daily credit budget
+    pays for
+
+    @param budget - credits per day
+    @param full_refresh_interval - seconds between full refreshes
+    @param hot_coin_count - top ranked coins fetched by hot refreshes
+    @return - seconds, or None if the full refreshes alone cost more
+    """
+    full_runs = DAY / full_refresh_interval
+    full_cost = listings_cost(FULL_LISTING_LIMIT) + STATS_COST
+    hot_cost = listings_cost(hot_coin_count) + STATS_COST + quotes_cost(1)
+    left = budget - full_runs * full_cost
+    if left <= 0:
+        return None
+    interval = max(MIN_REFRESH_INTERVAL, math.ceil(DAY / (full_runs + left / hot_cost)))
+    while estimate_daily_credits(interval, full_refresh_interval, hot_coin_count) > budget:
+        interval += MIN_REFRESH_INTERVAL
+    return interval
+
+
 class CoreFunctionality:
     """Handles Core functionality"""
 
     def __init__(self, bot):
+        self.created_at = time.monotonic()
         with open('config.json') as config:
             self.config_data = json.load(config)
         self.bot = bot
+        self.snapshot_file = self.config_data.get("snapshot_file", "market_snapshot.bin")
         self.started = False
         self.market_list = None
         self.market_stats = None
+        self.market_fetched_at = None
+        self.market_stale = False
+        self.market_breaker = CircuitBreaker("market",
+                                             self.config_data.get("breaker_threshold", 3),
+                                             self.config_data.get("breaker_reset_timeout", 300))
         self.acronym_list = None
         self.top_five = []
         self.top_five_gains = []
         self.top_five_losses = []
-        self.coin_market = CoinMarket(self.config_data["cmc_api_key"])
+        self.ranked_currencies = []
+        self.indicators = IndicatorEngine(self.config_data.get("indicator_period", 14),
+                                          self.config_data.get("history_resolution", 300))
+        self.anomaly_scanner = AnomalyScanner(self.config_data.get("anomaly_window", 24),
+                                              self.config_data.get("anomaly_z_score", 4),
+                                              self.config_data.get("anomaly_volume_multiple", 5),
+                                              self.config_data.get("anomaly_min_change", 2),
+                                              self.config_data.get("history_resolution", 300))
+        self.anomalies = []
+        self.coin_market = CoinMarket(self.config_data["cmc_api_key"],
+                                      self.config_data.get("cmc_base_url",
+                                                           DEFAULT_BASE_URL),
+                                      self.config_data.get("cmc_daily_credits", 333),
+                                      self.indicators)
         self.server_data = self._check_server_file()
+        refresh_interval = max(MIN_REFRESH_INTERVAL,
+                               int(self.config_data.get("market_refresh_interval", HOUR)))
+        # alert and watched coins are refreshed every run
+        self.history = PriceHistory(self.config_data.get("history_file", "price_history.bin"),
+                                    self.config_data.get("history_resolution", 300),
+                                    self.config_data.get("history_retention_hours", 24) * HOUR,
+                                    sample_interval=refresh_interval)
+        self.outbound = getattr(bot, "outbound", None)
+        if self.outbound is None:
+            self.outbound = bot.outbound = OutboundScheduler(bot,
+                                                             self.config_data.get("outbound_workers", 4))
         self.cmc = CoinMarketFunctionality(bot,
                                            self.coin_market,
-                                           self.server_data)
+                                           self.server_data,
+                                           self.outbound)
+        self.portfolio = PortfolioFunctionality(bot,
+                                                self.coin_market,
+                                                self.config_data.get("portfolio_capacity", 500),
+                                                self.server_data,
+                                                self.outbound)
         self.alert = AlertFunctionality(bot,
                                         self.coin_market,
                                         self.config_data["alert_capacity"],
-                                        self.server_data)
+                                        self.server_data,
+                                        self.outbound,
+                                        self.history,
+                                        self.portfolio)
         self.subscriber = SubscriberFunctionality(bot,
                                                   self.coin_market,
                                                   self.config_data["subscriber_capacity"],
-                                                  self.server_data)
+                                                  self.server_data,
+                                                  self.outbound)
+        self.watchlist = WatchlistFunctionality(bot,
+                                                self.coin_market,
+                                                self.config_data.get("watchlist_capacity", 25),
+                                                self.server_data,
+                                                self.outbound,
+                                                self.config_data.get("digest_concurrency", 5))
         # self.cal = CalFunctionality(bot,
         #                             self.config_data,
-        #                             self.server_data)
-        self.misc = MiscFunctionality(bot, self.server_data)
+        #                             self.server_data,
+        #                             self.outbound)
+        self.misc = MiscFunctionality(bot, self.server_data, self.outbound)
         self._save_server_file(self.server_data, backup=True)
-        self.bot.loop.create_task(self._continuous_updates())
+        self.update_minute = 0
+        self.update_hour = 0
+        self.live_hour = None
+        self.full_refresh_interval = int(self.config_data.get("full_refresh_interval", 6 * HOUR))
+        self.hot_coin_count = int(self.config_data.get("hot_coin_count", 200))
+        self._check_credit_budget(refresh_interval)
+        self.last_full_refresh = None
+        self.refreshed_currencies = None
+        self.scheduler = TaskScheduler(bot.loop)
+        self.scheduler.add_job(PeriodicJob("market",
+                                           self._refresh_market,
+                                           refresh_interval,
+                                           align=True,
+                                           run_immediately=True))
+        self.scheduler.add_job(PeriodicJob("alerts",
+                                           self.alert.alert_user,
+                                           follows="market"))
+        self.scheduler.add_job(PeriodicJob("live_updates",
+                                           self._display_live_data,
+                                           follows="market"))
+        self.scheduler.add_job(PeriodicJob("anomalies",
+                                           self._display_anomalies,
+                                           follows="market"))
+        self.scheduler.add_job(PeriodicJob("digests",
+                                           self._send_digests,
+                                           follows="market"))
+        self.scheduler.add_job(PeriodicJob("presence",
+                                           self._update_game_status,
+                                           HOUR,
+                                           jitter=60,
+                                           run_immediately=True))
+        self._load_snapshot()
+        self.outbound.start()
+        self.scheduler.start()
+
+    def _check_credit_budget(self, refresh_interval):
+        """
+        Warns on startup when the refresh intervals cost more API
+        credits a day than the keys have, since refreshes would then be
+        skipped or turned into hot ones
+
+        @param refresh_interval - seconds between market refreshes
+        """
+        budget = self.coin_market.credits.get_budget()
+        daily_cost = estimate_daily_credits(refresh_interval,
+                                            self.full_refresh_interval,
+                                            self.hot_coin_count)
+        metrics.set_gauge("credits.planned", daily_cost)
+        if daily_cost <= budget:
+            return
+        shortest = shortest_refresh_interval(budget,
+                                             self.full_refresh_interval,
+                                             self.hot_coin_count)
+        if shortest is None:
+            advice = "Raise full_refresh_interval."
+        else:
+            advice = "Raise market_refresh_interval to at least {}.".format(shortest)
+        warning = ("Market refreshes cost about {} coinmarketcap API credits a day, "
+                   "more than the {} available. {}".format(daily_cost, budget, advice))
+        print(warning)
+        logger.warning(warning)
 
     def _check_server_file(self):
         """
@@ -86,32 +255,170 @@ class CoreFunctionality:
             self.cmc.update(server_data=self.server_data)
             self.alert.update(server_data=self.server_data)
             self.subscriber.update(server_data=self.server_data)
+            self.portfolio.update(server_data=self.server_data)
+            self.watchlist.update(server_data=self.server_data)
             self.misc.update(server_data=self.server_data)
             # self.cal.update(server_data=self.server_data)
         except Exception as e:
             print("Failed to update server data. See error.log.")
             logger.error("Exception: {}".format(str(e)))
 
-    async def _update_data(self, minute=0):
+    async def _update_data(self):
+        """
+        Refreshes market data and hands it to every functionality
+        """
         try:
-            await self._update_market()
+            # rounded to the nearest minute, in case the run is slightly early
+            now = datetime.datetime.now() + datetime.timedelta(seconds=30)
+            self.update_minute = (now.hour * 60) + now.minute
+            self.update_hour = now.toordinal() * 24 + now.hour
+            refreshed = await self._update_market()
+            self.cmc.update(stale=self.market_stale)
+            if not refreshed:
+                return False
             self._load_acronyms()
-            self.cmc.update(self.market_list,
-                            self.acronym_list,
-                            self.market_stats,
-                            top_five=self.top_five,
-                            top_five_gains=self.top_five_gains,
-                            top_five_losses=self.top_five_losses)
-            self.alert.update(self.market_list, self.acronym_list)
-            self.subscriber.update(self.market_list, self.acronym_list)
-            # self.cal.update(self.acronym_list)
-            await self._update_game_status()
-            await self.alert.alert_user()
-            if self.started:
-                await self.subscriber.display_live_data(minute)
+            self._hand_out_market_data()
+            self.alert.observe_prices(self.market_list,
+                                      self.market_fetched_at,
+                                      self.refreshed_currencies)
+            await self._record_history()
+            await self._save_snapshot()
+            return True
         except Exception as e:
             print("Failed to update data. See error.log.")
             logger.error("Exception: {}".format(str(e)))
+            return False
+
+    def _hand_out_market_data(self):
+        """
+        Gives the current market data to every functionality
+        """
+        self.cmc.update(self.market_list,
+                        self.acronym_list,
+                        self.market_stats,
+                        top_five=self.top_five,
+                        top_five_gains=self.top_five_gains,
+                        top_five_losses=self.top_five_losses,
+                        ranked_currencies=self.ranked_currencies)
+        self.alert.update(self.market_list,
+                          self.acronym_list,
+                          fetched_at=self.market_fetched_at)
+        self.subscriber.update(self.market_list, self.acronym_list)
+        self.portfolio.update(self.market_list, self.acronym_list)
+        self.watchlist.update(self.market_list, self.acronym_list)
+        # self.cal.update(self.acronym_list)
+        if not self.started:
+            self.started = True
+            metrics.set_gauge("startup.data_ready",
+                              round(time.monotonic() - self.created_at, 3))
+            print('CoinMarketDiscordBot is online.')
+            logger.info('Bot is online.')
+
+    def _load_snapshot(self):
+        """
+        Serves the market data saved by the last run, marked as stale,
+        until the first refresh comes in
+        """
+        metrics.set_gauge("startup.warm", 0)
+        try:
+            with metrics.timer("snapshot.load"):
+                snapshot = read_snapshot(self.snapshot_file)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print("Failed to load market snapshot. See error.log.")
+            logger.error("Exception: {}".format(str(e)))
+            return
+        self.market_list = snapshot.market_list
+        self.market_stats = snapshot.market_stats
+        self.market_fetched_at = snapshot.fetched_at
+        self.acronym_list = snapshot.acronym_list
+        self.top_five = snapshot.top_five
+        self.top_five_gains = snapshot.top_five_gains
+        self.top_five_losses = snapshot.top_five_losses
+        self._rank_currencies(self.market_list)
+        self._compute_cross_prices(self.market_list)
+        self._mark_stale()
+        self.cmc.update(stale=self.market_stale)
+        metrics.set_gauge("startup.warm", 1)
+        self._hand_out_market_data()
+
+    async def _record_history(self):
+        """
+        Adds the refreshed currencies to the price history, the
+        indicators and the anomaly scanner
+        """
+        try:
+            self.history.record(self.market_list,
+                                self.market_fetched_at,
+                                self.refreshed_currencies)
+            self.indicators.update(self.market_list,
+                                   self.market_fetched_at,
+                                   self.refreshed_currencies)
+            self.anomalies = self.anomaly_scanner.scan(self.market_list,
+                                                       self.market_fetched_at,
+                                                       self.refreshed_currencies)
+            await self.bot.loop.run_in_executor(None, self.history.flush)
+        except Exception as e:
+            print("Failed to record price history. See error.log.")
+            logger.error("Exception: {}".format(str(e)))
+
+    async def _save_snapshot(self):
+        """
+        Writes the current market data to the snapshot file, off the
+        event loop
+        """
+        snapshot = MarketSnapshot(self.market_list,
+                                  self.market_stats,
+                                  self.market_fetched_at,
+                                  self.acronym_list,
+                                  list(self.top_five),
+                                  list(self.top_five_gains),
+                                  list(self.top_five_losses))
+        try:
+            with metrics.timer("snapshot.save"):
+                await self.bot.loop.run_in_executor(None,
+                                                    write_snapshot,
+                                                    self.snapshot_file,
+                                                    snapshot)
+        except Exception as e:
+            print("Failed to save market snapshot. See error.log.")
+            logger.error("Exception: {}".format(str(e)))
+
+    async def _refresh_market(self):
+        """
+        Market refresh job. Jobs that follow it only run when new data
+        came in.
+
+        @return - False if the refresh was skipped or failed
+        """
+        return await self._update_data()
+
+    async def _display_live_data(self):
+        """
+        Posts live updates after the first market refresh of every hour
+        """
+        hour = self.update_minute // 60
+        if self.live_hour is None:
+            # no live updates for the refresh done on startup
+            self.live_hour = hour
+        elif hour != self.live_hour:
+            self.live_hour = hour
+            await self.subscriber.display_live_data(hour * 60)
+
+    async def _send_digests(self):
+        """
+        Sends the watchlist digests that came due since the last market
+        refresh
+        """
+        await self.watchlist.send_digests(self.update_hour)
+
+    async def _display_anomalies(self):
+        """
+        Posts the unusual moves found in the last market refresh
+        """
+        anomalies, self.anomalies = self.anomalies, []
+        await self.subscriber.display_anomalies(anomalies)
 
     async def _update_game_status(self):
         """
@@ -124,62 +431,195 @@ class CoreFunctionality:
             print("Failed to update game status. See error.log.")
             logger.error("Exception: {}".format(str(e)))
 
-    async def _continuous_updates(self):
-        await self._update_data()
-        self.started = True
-        print('CoinMarketDiscordBot is online.')
-        logger.info('Bot is online.')
-        while True:
-            time = datetime.datetime.now()
-            if time.minute == 0:
-                minute = (time.hour * 60) + time.minute
-                await self._update_data(minute)
-                await asyncio.sleep(60)
-            else:
-                await asyncio.sleep(20)
+    async def _fetch(self, fetch_func):
+        """
+        Runs a blocking coinmarketcap request off the event loop
+
+        @param fetch_func - CoinMarket method making the request
+        @return - data received
+        """
+        data = await self.bot.loop.run_in_executor(None, fetch_func)
+        if data is None:
+            raise CoreFunctionalityException("No data received from coinmarketcap.")
+        return data
+
+    def _mark_stale(self):
+        """
+        Flags the market data as stale and reports its age
+        """
+        self.market_stale = True
+        if self.market_fetched_at is not None:
+            metrics.set_gauge("market.data_age",
+                              int(time.time() - self.market_fetched_at))
+        metrics.set_gauge("market.stale", 1)
+
+    def _full_refresh_due(self):
+        """
+        Checks if the whole market has to be fetched, rather than only
+        the hot currencies
+        """
+        if self.last_full_refresh is None:
+            return True
+        return time.monotonic() - self.last_full_refresh >= self.full_refresh_interval
+
+    def _get_watched_currencies(self):
+        """
+        Returns the currencies with an alert or subscription
+        """
+        watched = self.alert.get_watched_currencies()
+        watched.update(self.subscriber.get_watched_currencies())
+        return watched
+
+    def _choose_refresh(self):
+        """
+        Picks the biggest refresh the API credit budget allows. Spending
+        is paced over the day, so when refreshes cost more than planned
+        full refreshes turn into hot ones, then runs are skipped. The
+        credits.paced gauge is 1 while pacing holds refreshes back.
+
+        @return - FULL_REFRESH, HOT_REFRESH or None to skip the run
+        """
+        credits = self.coin_market.credits
+        full_cost = listings_cost(FULL_LISTING_LIMIT) + STATS_COST
+        full_put_off = False
+        if self.last_full_refresh is None:
+            # the first refresh fills the market list or replaces the
+            # snapshot it was loaded from, so only the daily limit applies
+            if credits.can_spend(full_cost, paced=False):
+                metrics.set_gauge("credits.paced", 0)
+                return FULL_REFRESH
+            if self.market_list is None:
+                return None
+        elif self._full_refresh_due():
+            # hot refreshes spend the paced allowance as it comes in, so
+            # a full refresh that has waited a whole extra interval goes
+            # ahead of the pace rather than wait for good
+            overdue = (time.monotonic() - self.last_full_refresh
+                       >= 2 * self.full_refresh_interval)
+            if credits.can_spend(full_cost, paced=not overdue):
+                metrics.set_gauge("credits.paced", 0)
+                return FULL_REFRESH
+            full_put_off = True
+        watched = len(self._get_watched_currencies())
+        hot_cost = listings_cost(self.hot_coin_count) + STATS_COST
+        if watched:
+            hot_cost += quotes_cost(watched)
+        if credits.can_spend(hot_cost):
+            metrics.set_gauge("credits.paced", int(full_put_off))
+            return HOT_REFRESH
+        metrics.set_gauge("credits.paced", int(credits.can_spend(hot_cost, paced=False)))
+        return None
+
+    def _get_watched_ids(self, hot_table):
+        """
+        Returns the ids of currencies with an alert or subscription that
+        aren't among the top ranked currencies already fetched
+
+        @param hot_table - MarketTable of the top ranked currencies
+        @return - list of coinmarketcap ids
+        """
+        ids = []
+        for currency in self._get_watched_currencies():
+            if currency not in hot_table and currency in self.market_list:
+                ids.append(self.market_list[currency]['id'])
+        return sorted(ids)
+
+    async def _fetch_hot_currencies(self, attempts):
+        """
+        Fetches the top ranked currencies plus every currency with an
+        alert or subscription, and merges them into the market list
+
+        @return - new MarketTable and the currencies refreshed
+        """
+        fetch_top = functools.partial(self.coin_market.fetch_currency_data,
+                                      limit=self.hot_coin_count)
+        hot_table = await retry_with_backoff(lambda: self._fetch(fetch_top),
+                                             attempts)
+        coins = list(hot_table.values())
+        ids = self._get_watched_ids(hot_table)
+        if ids:
+            fetch_quotes = functools.partial(self.coin_market.fetch_quotes, ids)
+            coins.extend(await retry_with_backoff(lambda: self._fetch(fetch_quotes),
+                                                  attempts))
+        metrics.set_gauge("market.hot_coins", len(coins))
+        return self.market_list.merged(coins), [coin['slug'] for coin in coins]
 
     async def _update_market(self):
         """
-        Loads all the cryptocurrencies that exist in the market
+        Refreshes the cryptocurrencies in the market. The top ranked
+        and watched currencies are refreshed every run, the whole market
+        only every full_refresh_interval, as far as the API credit
+        budget allows. Failed requests are retried
+        with backoff. While coinmarketcap keeps failing, the circuit
+        breaker skips requests and the last good data keeps being
+        served, marked as stale.
 
-        @return - list of crypto-currencies
+        @return - True if the market data was refreshed
         """
+        refresh = self._choose_refresh()
+        if refresh is None:
+            metrics.incr("credits.skipped_refreshes")
+            return False
+        if not self.market_breaker.allow_request():
+            self._mark_stale()
+            return False
+        # a half open breaker only gets a single probe request
+        if self.market_breaker.state == HALF_OPEN:
+            attempts = 1
+        else:
+            attempts = FETCH_ATTEMPTS
         try:
-            retry_count = 0
-            market_stats = self.coin_market.fetch_coinmarket_stats()
-            currency_data = self.coin_market.fetch_currency_data()
-            while market_stats is None or currency_data is None:
-                if retry_count >= 10:
-                    msg = ("Max retry attempts reached. Please make "
-                           "sure you're able to access coinmarketcap "
-                           "through their website, check if the coinmarketapi "
-                           "is down, and check if "
-                           "anything is blocking you from requesting "
-                           "data.")
-                    raise CoreFunctionalityException(msg)
-                logger.warning("Retrying to get data..")
-                if market_stats is None:
-                    market_stats = self.coin_market.fetch_coinmarket_stats()
-                if currency_data is None:
-                    currency_data = self.coin_market.fetch_currency_data()
-                retry_count += 1
-                await asyncio.sleep(5)
-            market_dict = {}
-            for currency in currency_data['data']:
-                market_dict[currency['slug']] = currency
-            await self._get_top_five(currency_data['data'])
-            self.market_stats = market_stats
-            self.market_list = market_dict
+            market_stats = await retry_with_backoff(lambda: self._fetch(self.coin_market.fetch_coinmarket_stats),
+                                                    attempts)
+            with metrics.timer("market.ingest"):
+                if refresh == FULL_REFRESH:
+                    market_table = await retry_with_backoff(lambda: self._fetch(self.coin_market.fetch_currency_data),
+                                                            attempts)
+                    refreshed_currencies = None
+                else:
+                    market_table, refreshed_currencies = await self._fetch_hot_currencies(attempts)
+        except CreditException as e:
+            # says nothing about coinmarketcap's health, so the breaker
+            # neither opens nor closes
+            self.market_breaker.release()
+            self._mark_stale()
+            metrics.incr("credits.skipped_refreshes")
+            logger.warning("Market refresh skipped: {}".format(str(e)))
+            return False
         except Exception as e:
+            self.market_breaker.record_failure()
+            self._mark_stale()
             print("Failed to update market. See error.log.")
             logger.error("Exception: {}".format(str(e)))
+            return False
+        self.market_breaker.record_success()
+        if refresh == FULL_REFRESH:
+            self.last_full_refresh = time.monotonic()
+            metrics.incr("market.refresh.full")
+        else:
+            metrics.incr("market.refresh.hot")
+        await self._get_top_five(market_table)
+        self._compute_cross_prices(market_table)
+        self.market_stats = market_stats
+        self.market_list = market_table
+        self.refreshed_currencies = refreshed_currencies
+        self.market_fetched_at = time.time()
+        self.market_stale = False
+        metrics.set_gauge("market.data_age", 0)
+        metrics.set_gauge("market.stale", 0)
+        return True
 
-    async def _get_top_five(self, currency_data):
+    async def _get_top_five(self, market_table):
         """
         Obtains the top five currencies in the ranking, % gain/loss
+
+        @param market_table - MarketTable of the market
         """
         try:
-            currency_data = currency_data[:LIMIT_TOP_CURRENCY]
+            slugs = market_table.column('slug')
+            percent_change = market_table.column('percent_change_24h')
+            by_rank = self._rank_currencies(market_table)[:LIMIT_TOP_CURRENCY]
+            ranked = [i for i in by_rank if not math.isnan(percent_change[i])]
             if self.top_five:
                 self.top_five.clear()
             if self.top_five_gains:
@@ -187,18 +627,45 @@ class CoreFunctionality:
             if self.top_five_losses:
                 self.top_five_losses.clear()
             for i in range(0, MAX_TOP_CURRENCY_DISPLAY):
-                self.top_five.append(currency_data[i]['slug'])
-            sorted_by_loss = sorted(currency_data, key=lambda c: float(c['quote']['USD']['percent_change_24h']))
+                self.top_five.append(slugs[by_rank[i]])
+            sorted_by_loss = sorted(ranked, key=lambda i: percent_change[i])
             for i in range(0, MAX_TOP_CURRENCY_DISPLAY):
-                self.top_five_losses.append(sorted_by_loss[i]['slug'])
-            sorted_by_gains = sorted(currency_data, key=lambda c: float(c['quote']['USD']['percent_change_24h']),
+                self.top_five_losses.append(slugs[sorted_by_loss[i]])
+            sorted_by_gains = sorted(ranked, key=lambda i: percent_change[i],
                                      reverse=True)
             for i in range(0, MAX_TOP_CURRENCY_DISPLAY):
-                self.top_five_gains.append(sorted_by_gains[i]['slug'])
+                self.top_five_gains.append(slugs[sorted_by_gains[i]])
         except Exception as e:
             print("Failed to get the top five currencies. See error.log.")
             logger.error("Exception: {}".format(str(e)))
 
+    def _compute_cross_prices(self, market_table):
+        """
+        Works out the price of every currency in BTC and ETH, so
+        conversions and BTC alerts don't compute them per lookup
+
+        @param market_table - MarketTable of the market
+        """
+        with metrics.timer("market.cross_prices"):
+            for currency in CROSS_CURRENCIES:
+                if currency in market_table:
+                    market_table.cross_prices(currency)
+
+    def _rank_currencies(self, market_table):
+        """
+        Orders the currencies by rank into ranked_currencies
+
+        @param market_table - MarketTable of the market
+        @return - rows of the table in rank order
+        """
+        slugs = market_table.column('slug')
+        ranks = market_table.column('cmc_rank')
+        # merged hot refreshes can leave the table out of rank order
+        by_rank = sorted(range(len(slugs)),
+                         key=lambda i: math.inf if math.isnan(ranks[i]) else ranks[i])
+        self.ranked_currencies = [slugs[i] for i in by_rank]
+        return by_rank
+
     def _load_acronyms(self):
         """
         Loads all acronyms of existing crypto-coins out there
@@ -210,49 +677,43 @@ class CoreFunctionality:
                 raise Exception("Market list was not loaded.")
             acronym_list = {}
             duplicate_list = {}
-            for currency, data in self.market_list.items():
-                if data['symbol'] in acronym_list:
-                    if data['symbol'] not in duplicate_list:
-                        duplicate_list[data['symbol']] = 1
-                    duplicate_list[data['symbol']] += 1
-                    if data['symbol'] not in acronym_list[data['symbol']]:
-                        acronym_list[data['symbol'] + '1'] = acronym_list[data['symbol']]
-                        acronym_list[data['symbol']] = ("Duplicate acronyms "
-                                                        "found. Possible "
-                                                        "searches are:\n"
-                                                        "{}1 ({})\n".format(data['symbol'],
-                                                                            acronym_list[data['symbol']]))
-                    dupe_key = data['symbol'] + str(duplicate_list[data['symbol']])
+            for currency, symbol in zip(self.market_list.column('slug'),
+                                        self.market_list.column('symbol')):
+                if symbol in acronym_list:
+                    if symbol not in duplicate_list:
+                        duplicate_list[symbol] = 1
+                    duplicate_list[symbol] += 1
+                    if symbol not in acronym_list[symbol]:
+                        acronym_list[symbol + '1'] = acronym_list[symbol]
+                        acronym_list[symbol] = ("Duplicate acronyms "
+                                                "found. Possible "
+                                                "searches are:\n"
+                                                "{}1 ({})\n".format(symbol,
+                                                                    acronym_list[symbol]))
+                    dupe_key = symbol + str(duplicate_list[symbol])
                     acronym_list[dupe_key] = currency
-                    acronym_list[data['symbol']] = (acronym_list[data['symbol']]
-                                                    + "{} ({})\n".format(dupe_key,
-                                                                         currency))
+                    acronym_list[symbol] = (acronym_list[symbol]
+                                            + "{} ({})\n".format(dupe_key,
+                                                                 currency))
                 else:
-                    acronym_list[data['symbol']] = currency
+                    acronym_list[symbol] = currency
             self.acronym_list = acronym_list
         except Exception as e:
             print("Failed to load cryptocurrency acronyms. See error.log.")
             logger.error("Exception: {}".format(str(e)))
 
-    async def _say_msg(self, msg=None, channel=None, emb=None):
+    async def _say_msg(self, msg=None, channel=None, emb=None, priority=INTERACTIVE):
         """
         Bot will say msg if given correct permissions
 
         @param msg - msg to say
         @param channel - channel to send msg to
         @param emb - embedded msg to say
+        @param priority - outbound priority of the msg
+        @return - the sent msg
         """
         try:
-            if channel:
-                if emb:
-                    await self.bot.send_message(channel, embed=emb)
-                else:
-                    await self.bot.send_message(channel, msg)
-            else:
-                if emb:
-                    await self.bot.say(embed=emb)
-                else:
-                    await self.bot.say(msg)
+            return await self.outbound.send(channel, msg, emb, priority)
         except Exception as e:
             pass
 
@@ -319,3 +780,31 @@ class CoreFunctionality:
         except Exception as e:
             print("Failed to toggle {}. See error.log.".format(mode))
             logger.error("Exception: {}".format(str(e)))
+
+    async def display_metrics(self, ctx):
+        """
+        Displays the counters, gauges and timings the bot has recorded
+        """
+        try:
+            try:
+                user_roles = ctx.message.author.roles
+            except Exception as e:
+                await self._say_msg("Command must be used in a server.")
+                return
+            if CMB_ADMIN not in [role.name for role in user_roles]:
+                await self._say_msg("Admin role '{}' is required for "
+                                    "this command.".format(CMB_ADMIN))
+                return
+            if self.market_fetched_at is not None:
+                metrics.set_gauge("market.data_age",
+                                  int(time.time() - self.market_fetched_at))
+            msg = metrics.format()
+            if not msg:
+                msg = "No metrics recorded yet."
+            em = discord.Embed(title="Metrics",
+                               description="```{}```".format(msg[:2000]),
+                               colour=0xFFFFFF)
+            await self._say_msg(emb=em)
+        except Exception as e:
+            print("Failed to display metrics. See error.log.")
+            logger.error("Exception: {}".format(str(e)))
@@ -0,0 +1,153 @@
+from bot_logger import logger
+from bot_metrics import metrics
+import math
+import threading
+import time
+
+
+DAY = 86400
+LISTINGS_PER_CREDIT = 200
+QUOTES_PER_CREDIT = 100
+# share of the daily budget that can be spent ahead of pace
+BURST_SHARE = 0.05
+
+
+class CreditException(Exception):
+    """Handles API credit related errors"""
+
+
+def listings_cost(limit, converts=1):
+    """
+    Returns the credits a listings request costs: one per 200 coins,
+    for every currency converted to
+    """
+    return math.ceil(limit / LISTINGS_PER_CREDIT) * converts
+
+
+def quotes_cost(count, converts=1):
+    """
+    Returns the credits a quotes request costs: one per 100 coins,
+    for every currency converted to
+    """
+    return max(1, math.ceil(count / QUOTES_PER_CREDIT)) * converts
+
+
+class CreditPool:
+    """
+    Keeps count of the coinmarketcap API credits spent by each key
+    today. Requests go to the key with the most credits left, and
+    spending is paced so the budget lasts the whole day. coinmarketcap
+    resets credits at midnight UTC.
+    """
+
+    def __init__(self, api_keys, daily_credits, clock=time.time):
+        """
+        @param api_keys - coinmarketcap API keys
+        @param daily_credits - credits each key may spend per day
+        @param clock - wall clock
+        """
+        self.api_keys = list(api_keys)
+        self.daily_credits = int(daily_credits)
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.day = None
+        self.used = {}
+        self.exhausted = set()
+        self._roll_day()
+        self._report()
+
+    def _roll_day(self):
+        day = int(self.clock() // DAY)
+        if day != self.day:
+            self.day = day
+            self.used = {key: 0 for key in self.api_keys}
+            self.exhausted.clear()
+
+    def get_budget(self):
+        """
+        Returns the credits all keys may spend per day
+        """
+        return self.daily_credits * len(self.api_keys)
+
+    def get_remaining(self):
+        """
+        Returns the credits left today across all keys
+        """
+        with self.lock:
+            self._roll_day()
+            return sum(self._key_remaining(key) for key in self.api_keys)
+
+    def _key_remaining(self, key):
+        if key in self.exhausted:
+            return 0
+        return max(0, self.daily_credits - self.used[key])
+
+    def can_spend(self, cost, paced=True):
+        """
+        Checks if a request can be afforded
+
+        @param cost - credits the request costs
+        @param paced - if True, spending can only run slightly ahead of
+                       an even spread of the budget over the day
+        @return - True if the credits can be spent
+        """
+        with self.lock:
+            self._roll_day()
+            if not any(self._key_remaining(key) >= cost for key in self.api_keys):
+                return False
+            if not paced:
+                return True
+            day_share = (self.clock() % DAY) / DAY
+            allowance = self.get_budget() * min(1, day_share + BURST_SHARE)
+            return sum(self.used.values()) + cost <= allowance
+
+    def acquire(self, cost):
+        """
+        Picks the key to make a request with
+
+        @param cost - credits the request is expected to cost
+        @return - key with the most credits left
+        """
+        with self.lock:
+            self._roll_day()
+            key = max(self.api_keys, key=self._key_remaining)
+            if self._key_remaining(key) < cost:
+                raise CreditException("Out of coinmarketcap API credits for today.")
+            return key
+
+    def record(self, key, credits):
+        """
+        Counts credits spent by a request
+
+        @param key - key the request was made with
+        @param credits - credits the request cost
+        """
+        with self.lock:
+            self._roll_day()
+            self.used[key] = self.used.get(key, 0) + credits
+        metrics.incr("credits.spent", credits)
+        self._report()
+
+    def exhaust(self, key):
+        """
+        Stops using a key for the rest of the day, i.e. after
+        coinmarketcap refused it for going over its limit
+        """
+        with self.lock:
+            self.exhausted.add(key)
+        logger.warning("coinmarketcap API key {} is out of credits "
+                       "for today.".format(self.api_keys.index(key) + 1))
+        self._report()
+
+    def _report(self):
+        """
+        Reports credits used, left and projected for the day
+        """
+        with self.lock:
+            used = sum(self.used.values())
+            day_share = max((self.clock() % DAY) / DAY, 1 / 24)
+            metrics.set_gauge("credits.used_today", used)
+            metrics.set_gauge("credits.remaining",
+                              sum(self._key_remaining(key) for key in self.api_keys))
+            metrics.set_gauge("credits.projected_today", int(used / day_share))
+            metrics.set_gauge("credits.budget", self.get_budget())
@@ -0,0 +1,168 @@
+from bot_metrics import metrics
+import math
+import re
+
+
+NON_ALPHANUMERIC = re.compile(r"[^a-z0-9]+")
+MIN_QUERY_LENGTH = 3
+MAX_CANDIDATES = 400  # terms scored per query
+
+
+def _normalize(text):
+    """
+    Lowercases text and turns anything but letters and digits into
+    single spaces, so 'bitcoin-cash' and 'Bitcoin Cash' match
+
+    @param text - text to normalize
+    @return - normalized text
+    """
+    return NON_ALPHANUMERIC.sub(" ", text.lower()).strip()
+
+
+def _trigrams(text):
+    """
+    Returns the trigrams of normalized text, padded so the start and
+    end of the text count
+
+    @param text - normalized text
+    @return - set of trigrams
+    """
+    padded = "  {} ".format(text)
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class FuzzySearch:
+    """
+    Typo tolerant lookup of coins by slug, name or symbol.
+
+    Every distinct normalized slug, name and symbol of a coin is a term,
+    and each trigram points to the terms containing it. Candidates come
+    from the query's rarest trigrams, since trigrams such as 'oin' are
+    in thousands of terms and say little, and are then scored by the
+    trigrams they share with the query (Dice coefficient). The index is
+    updated coin by coin when the market list is refreshed, so only new,
+    renamed and delisted coins cost anything.
+    """
+
+    def __init__(self, threshold=0.45, max_suggestions=5, max_candidates=MAX_CANDIDATES):
+        """
+        @param threshold - least similarity (0 to 1) a term needs to be
+                           suggested
+        @param max_suggestions - most coins suggested per query
+        @param max_candidates - most terms scored per query, None for all
+        """
+        self.threshold = threshold
+        self.max_suggestions = max_suggestions
+        self.max_candidates = max_candidates
+        self.market_list = None
+        self.entries = {}  # slug -> (name, symbol) it was indexed with
+        self.coin_terms = {}  # slug -> term ids of the coin
+        self.term_slugs = {}  # term id -> slug
+        self.term_trigrams = {}  # term id -> trigrams of the term
+        self.postings = {}  # trigram -> set of term ids
+        self.next_term = 0
+
+    def _add_coin(self, slug, name, symbol):
+        terms = []
+        for text in {_normalize(slug), _normalize(name), _normalize(symbol)}:
+            if not text:
+                continue
+            term = self.next_term
+            self.next_term += 1
+            trigrams = _trigrams(text)
+            self.term_slugs[term] = slug
+            self.term_trigrams[term] = trigrams
+            for trigram in trigrams:
+                postings = self.postings.get(trigram)
+                if postings is None:
+                    postings = self.postings[trigram] = set()
+                postings.add(term)
+            terms.append(term)
+        self.coin_terms[slug] = terms
+        self.entries[slug] = (name, symbol)
+
+    def _remove_coin(self, slug):
+        for term in self.coin_terms.pop(slug):
+            del self.term_slugs[term]
+            for trigram in self.term_trigrams.pop(term):
+                postings = self.postings[trigram]
+                postings.discard(term)
+                if not postings:
+                    del self.postings[trigram]
+        del self.entries[slug]
+
+    def update(self, market_list):
+        """
+        Brings the index up to date with a market list, reindexing only
+        the coins that were added, renamed or delisted
+
+        @param market_list - MarketTable of the latest refresh
+        """
+        if market_list is self.market_list:
+            return
+        self.market_list = market_list
+        with metrics.timer("fuzzy_search.update"):
+            changed = 0
+            seen = set()
+            entries = self.entries
+            for slug, name, symbol in zip(market_list.column('slug'),
+                                          market_list.column('name'),
+                                          market_list.column('symbol')):
+                seen.add(slug)
+                entry = entries.get(slug)
+                if entry is not None:
+                    if entry == (name, symbol):
+                        continue
+                    self._remove_coin(slug)
+                self._add_coin(slug, name, symbol)
+                changed += 1
+            for slug in entries.keys() - seen:
+                self._remove_coin(slug)
+                changed += 1
+        metrics.incr("fuzzy_search.reindexed", changed)
+
+    def suggest(self, query):
+        """
+        Returns the coins that look like a query, biggest market cap
+        first
+
+        @param query - misspelled slug, name or symbol
+        @return - list of slugs, empty if nothing is close enough
+        """
+        text = _normalize(query)
+        if len(text) < MIN_QUERY_LENGTH or self.market_list is None:
+            return []
+        with metrics.timer("fuzzy_search.lookup"):
+            trigrams = _trigrams(text)
+            all_postings = self.postings
+            # the trigram breaks ties, so the capped walk doesn't depend
+            # on the order of the set
+            rarest = sorted((trigram for trigram in trigrams if trigram in all_postings),
+                            key=lambda trigram: (len(all_postings[trigram]), trigram))
+            candidates = set()
+            max_candidates = self.max_candidates
+            for trigram in rarest:
+                terms = all_postings[trigram]
+                if (max_candidates is not None and candidates
+                        and len(candidates) + len(terms) > max_candidates):
+                    break
+                candidates.update(terms)
+            query_size = len(trigrams)
+            threshold = self.threshold
+            term_trigrams = self.term_trigrams
+            term_slugs = self.term_slugs
+            matches = set()
+            for term in candidates:
+                term_grams = term_trigrams[term]
+                shared = len(trigrams & term_grams)
+                if 2 * shared >= threshold * (query_size + len(term_grams)):
+                    matches.add(term_slugs[term])
+            market_caps = self.market_list.column('market_cap')
+            index = self.market_list.index
+
+            def rank(slug):
+                # biggest market cap first, unknown caps last, then by slug
+                cap = market_caps[index[slug]]
+                return (-cap if not math.isnan(cap) else 1.0, slug)
+
+            return sorted(matches, key=rank)[:self.max_suggestions]
@@ -0,0 +1,197 @@
+from bot_metrics import metrics
+from array import array
+import math
+
+
+SMA = "sma"
+EMA = "ema"
+RSI = "rsi"
+VOLATILITY = "volatility"
+INDICATORS = [SMA, EMA, RSI, VOLATILITY]
+PRICE_INDICATORS = {SMA, EMA}  # indicators in USD, converted like prices
+
+
+class IndicatorEngine:
+    """
+    Keeps moving averages, RSI and realized volatility of every coin.
+
+    Each coin keeps a small running state that one new price updates in
+    constant time, so a refresh never goes back over history. Prices are
+    sampled on a grid of `resolution` seconds, so an indicator of period
+    14 with a 5 minute resolution covers 14 five minute samples. Coins
+    outside the hot set are only refreshed now and then, so the periods
+    in between carry their last price forward; otherwise an hourly coin's
+    14 samples would span 14 hours while a hot coin's span 70 minutes.
+
+    - sma: mean of the last `period` prices
+    - ema: exponential moving average with alpha 2 / (period + 1)
+    - rsi: Wilder's relative strength index over `period` changes
+    - volatility: exponentially weighted standard deviation of log
+                  returns, in % per sample
+    """
+
+    def __init__(self, period=14, resolution=300):
+        """
+        @param period - number of samples the indicators cover
+        @param resolution - least seconds between two samples of a coin
+        """
+        self.period = int(period)
+        self.resolution = int(resolution)
+        self.alpha = 2 / (self.period + 1)
+        self.rows = {}
+        self.samples = array('l')
+        self.last_period = array('l')
+        self.last_price = array('d')
+        self.sma_sum = array('d')
+        self.sma_ring = array('d')
+        self.ema = array('d')
+        self.avg_gain = array('d')
+        self.avg_loss = array('d')
+        self.variance = array('d')
+
+    def _add_row(self, coin_id):
+        row = len(self.rows)
+        self.rows[coin_id] = row
+        self.samples.append(0)
+        self.last_period.append(-1)
+        for column in (self.last_price, self.sma_sum, self.ema,
+                       self.avg_gain, self.avg_loss, self.variance):
+            column.append(0.0)
+        self.sma_ring.extend([0.0] * self.period)
+        return row
+
+    def update(self, market_list, timestamp, currencies=None):
+        """
+        Adds the latest prices to the indicators
+
+        @param market_list - MarketTable with the latest prices
+        @param timestamp - time the prices were fetched
+        @param currencies - currencies that were refreshed, all if None
+        """
+        sample_period = int(timestamp // self.resolution)
+        ids = market_list.column('id')
+        prices = market_list.column('price')
+        if currencies is None:
+            indexes = range(len(ids))
+        else:
+            indexes = [market_list.index[currency] for currency in currencies
+                       if currency in market_list.index]
+        with metrics.timer("indicators.update"):
+            for i in indexes:
+                price = prices[i]
+                if math.isnan(price) or math.isnan(ids[i]):
+                    continue
+                coin_id = int(ids[i])
+                row = self.rows.get(coin_id)
+                if row is None:
+                    row = self._add_row(coin_id)
+                elif self.last_period[row] == sample_period:
+                    continue
+                else:
+                    gap = sample_period - self.last_period[row] - 1
+                    if gap > 0:
+                        self._fill(row, gap)
+                self._step(row, price)
+                self.last_period[row] = sample_period
+
+    def _step(self, row, price):
+        """
+        Adds one sample of a coin to its indicators
+        """
+        period = self.period
+        alpha = self.alpha
+        n = self.samples[row]
+        # simple moving average over a ring of the last prices
+        slot = row * period + n % period
+        if n >= period:
+            self.sma_sum[row] -= self.sma_ring[slot]
+        self.sma_ring[slot] = price
+        self.sma_sum[row] += price
+        if n == 0:
+            self.ema[row] = price
+        else:
+            self.ema[row] += alpha * (price - self.ema[row])
+            previous = self.last_price[row]
+            change = price - previous
+            gain = change if change > 0 else 0.0
+            loss = -change if change < 0 else 0.0
+            if n <= period:
+                # the first averages are plain means of the changes
+                self.avg_gain[row] += (gain - self.avg_gain[row]) / n
+                self.avg_loss[row] += (loss - self.avg_loss[row]) / n
+            else:
+                self.avg_gain[row] += (gain - self.avg_gain[row]) / period
+                self.avg_loss[row] += (loss - self.avg_loss[row]) / period
+            if previous > 0 and price > 0:
+                squared_return = math.log(price / previous) ** 2
+                if n == 1:
+                    self.variance[row] = squared_return
+                else:
+                    self.variance[row] += alpha * (squared_return - self.variance[row])
+        self.last_price[row] = price
+        self.samples[row] = n + 1
+
+    def _fill(self, row, steps):
+        """
+        Carries a coin's last price over periods it had no sample in
+
+        @param steps - number of periods to fill
+        """
+        period = self.period
+        price = self.last_price[row]
+        n = self.samples[row]
+        if n <= period:
+            # still warming up, the averages are plain means for now
+            for _ in range(steps):
+                self._step(row, price)
+            return
+        # unchanged prices only move the SMA ring and decay the rest,
+        # so all the steps are taken in one go
+        if steps >= period:
+            start = row * period
+            self.sma_ring[start:start + period] = array('d', [price]) * period
+            self.sma_sum[row] = price * period
+        else:
+            for k in range(steps):
+                slot = row * period + (n + k) % period
+                self.sma_sum[row] += price - self.sma_ring[slot]
+                self.sma_ring[slot] = price
+        keep = (1 - self.alpha) ** steps
+        self.ema[row] = price + (self.ema[row] - price) * keep
+        self.variance[row] *= keep
+        decay = (1 - 1 / period) ** steps
+        self.avg_gain[row] *= decay
+        self.avg_loss[row] *= decay
+        self.samples[row] = n + steps
+
+    def get(self, coin_id, indicator):
+        """
+        Returns an indicator of a coin
+
+        @param coin_id - coinmarketcap id of the coin
+        @param indicator - one of INDICATORS
+        @return - value, or None until enough samples were seen
+        """
+        row = self.rows.get(coin_id)
+        if row is None:
+            return None
+        n = self.samples[row]
+        if indicator == SMA:
+            if n < self.period:
+                return None
+            return self.sma_sum[row] / self.period
+        if indicator == EMA:
+            if n < self.period:
+                return None
+            return self.ema[row]
+        if indicator == RSI:
+            if n <= self.period:
+                return None
+            if self.avg_loss[row] == 0:
+                return 100.0
+            return 100 - 100 / (1 + self.avg_gain[row] / self.avg_loss[row])
+        if indicator == VOLATILITY:
+            if n <= self.period:
+                return None
+            return math.sqrt(self.variance[row]) * 100
+        raise ValueError("Unknown indicator: {}".format(indicator))
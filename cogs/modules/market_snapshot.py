@@ -0,0 +1,123 @@
+from cogs.modules.market_table import (MarketTable, NUMERIC_FIELDS, QUOTE_FIELDS,
+                                       STRING_FIELDS, StringColumn)
+from array import array
+import json
+import mmap
+import os
+import struct
+import sys
+
+
+MAGIC = b"CMBS"
+VERSION = 1
+# magic, version, little endian flag, coin count, fetched at,
+# string table length, metadata length, padding to keep columns aligned
+HEADER = struct.Struct("=4sHHIdIII")
+
+
+class MarketSnapshotException(Exception):
+    """Handles market snapshot related errors"""
+
+
+class MarketSnapshot:
+    """Market data and indexes the bot needs to answer commands"""
+
+    def __init__(self, market_list, market_stats, fetched_at, acronym_list,
+                 top_five, top_five_gains, top_five_losses):
+        self.market_list = market_list
+        self.market_stats = market_stats
+        self.fetched_at = fetched_at
+        self.acronym_list = acronym_list
+        self.top_five = top_five
+        self.top_five_gains = top_five_gains
+        self.top_five_losses = top_five_losses
+
+
+def write_snapshot(path, snapshot):
+    """
+    Writes a snapshot as fixed width columns, so it can be mapped back
+    without parsing. The file is replaced atomically so a crash never leaves half of it.
+
+    @param path - file to write to
+    @param snapshot - MarketSnapshot to write, its market list being a
+                      MarketTable
+    """
+    market_list = snapshot.market_list
+    columns = []
+    for field in NUMERIC_FIELDS + QUOTE_FIELDS:
+        columns.append(array('d', market_list.column(field)))
+    strings = bytearray()
+    for field in STRING_FIELDS:
+        # every string column points into the same string table
+        offsets = array('I', [len(strings)])
+        for value in market_list.column(field):
+            strings += value.encode("utf-8")
+            offsets.append(len(strings))
+        columns.append(offsets)
+    metadata = json.dumps({"market_stats": snapshot.market_stats,
+                           "acronym_list": snapshot.acronym_list,
+                           "top_five": snapshot.top_five,
+                           "top_five_gains": snapshot.top_five_gains,
+                           "top_five_losses": snapshot.top_five_losses}).encode("utf-8")
+    header = HEADER.pack(MAGIC,
+                         VERSION,
+                         sys.byteorder == "little",
+                         len(market_list),
+                         snapshot.fetched_at,
+                         len(strings),
+                         len(metadata),
+                         0)
+    temp_path = path + ".tmp"
+    with open(temp_path, 'wb') as outfile:
+        outfile.write(header)
+        for column in columns:
+            outfile.write(column.tobytes())
+        outfile.write(strings)
+        outfile.write(metadata)
+    os.replace(temp_path, path)
+
+
+def read_snapshot(path):
+    """
+    Memory maps a snapshot written by write_snapshot
+
+    @param path - file to read
+    @return - MarketSnapshot, with a market list backed by the file
+    """
+    with open(path, 'rb') as infile:
+        buffer = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+    (magic, version, little_endian, count, fetched_at,
+     strings_length, metadata_length, _) = HEADER.unpack_from(buffer)
+    if magic != MAGIC or version != VERSION:
+        raise MarketSnapshotException("Unknown snapshot format.")
+    if little_endian != (sys.byteorder == "little"):
+        raise MarketSnapshotException("Snapshot was written with another byte order.")
+    columns_length = (count * 8 * (len(NUMERIC_FIELDS) + len(QUOTE_FIELDS))
+                      + (count + 1) * 4 * len(STRING_FIELDS))
+    metadata_start = HEADER.size + columns_length + strings_length
+    if len(buffer) != metadata_start + metadata_length:
+        raise MarketSnapshotException("Snapshot is truncated.")
+    # the columns are views into the mapped file, nothing is copied
+    view = memoryview(buffer)
+    position = HEADER.size
+    numbers = {}
+    for field in NUMERIC_FIELDS + QUOTE_FIELDS:
+        end = position + count * 8
+        numbers[field] = view[position:end].cast('d')
+        position = end
+    offsets = {}
+    for field in STRING_FIELDS:
+        end = position + (count + 1) * 4
+        offsets[field] = view[position:end].cast('I')
+        position = end
+    string_table = view[position:position + strings_length]
+    strings = {field: StringColumn(offsets[field], string_table)
+               for field in STRING_FIELDS}
+    metadata = json.loads(str(buffer[metadata_start:], "utf-8"))
+    return MarketSnapshot(MarketTable(numbers, strings),
+                          metadata["market_stats"],
+                          fetched_at,
+                          metadata["acronym_list"],
+                          metadata["top_five"],
+                          metadata["top_five_gains"],
+                          metadata["top_five_losses"])
@@ -0,0 +1,289 @@
+from collections.abc import Mapping, Sequence
+from array import array
+from itertools import repeat
+import codecs
+import json
+import math
+import operator
+
+
+NUMERIC_FIELDS = ["id", "cmc_rank", "circulating_supply", "total_supply", "max_supply"]
+QUOTE_FIELDS = ["price", "volume_24h", "market_cap", "percent_change_1h",
+                "percent_change_24h", "percent_change_7d"]
+INT_FIELDS = {"id", "cmc_rank"}
+STRING_FIELDS = ["slug", "name", "symbol", "last_updated"]
+WHITESPACE = " \t\n\r"
+# can't follow a complete JSON value, only a number cut short
+NUMBER_CHARACTERS = "0123456789.eE+-"
+
+
+class MarketTableException(Exception):
+    """Handles market table related errors"""
+
+
+def _to_float(value):
+    if value is None:
+        return math.nan
+    return float(value)
+
+
+class MarketTable(Mapping):
+    """
+    Market list stored as one typed column per field the bot reads,
+    in listing (rank) order. Looking up a slug rebuilds the listing
+    as the dict coinmarketcap returns, limited to those fields, so the
+    rest of the bot can keep using it like the old market dict.
+    """
+
+    def __init__(self, numbers=None, strings=None):
+        """
+        @param numbers - float sequence per numeric field, NaN for None
+        @param strings - str sequence per string field
+        """
+        if numbers is None:
+            numbers = {field: array('d') for field in NUMERIC_FIELDS + QUOTE_FIELDS}
+        if strings is None:
+            strings = {field: [] for field in STRING_FIELDS}
+        self.numbers = numbers
+        self.strings = strings
+        self.status = None
+        self.index = {}
+        self.cross = {}
+        for i, slug in enumerate(strings["slug"]):
+            self.index[slug] = i
+
+    def column(self, field):
+        """
+        Returns every coin's value of a field, in listing order
+
+        @param field - i.e. 'symbol', 'price'
+        """
+        if field in self.strings:
+            return self.strings[field]
+        return self.numbers[field]
+
+    def cross_prices(self, base):
+        """
+        Returns every coin's price in units of another coin, worked out
+        from the USD prices once per table
+
+        @param base - currency to price in (i.e. 'bitcoin')
+        @return - price per coin in listing order, NaN where unknown
+        """
+        prices = self.cross.get(base)
+        if prices is None:
+            base_price = self.numbers["price"][self.index[base]]
+            if not base_price > 0:
+                base_price = math.nan
+            prices = array('d', map(operator.truediv,
+                                    self.numbers["price"],
+                                    repeat(base_price)))
+            self.cross[base] = prices
+        return prices
+
+    def cross_price(self, currency, base):
+        """
+        Returns the price of a coin in units of another coin
+
+        @param currency - currency to price (i.e. 'litecoin')
+        @param base - currency to price in (i.e. 'bitcoin')
+        @return - price, NaN if either price is unknown
+        """
+        if base in self.cross:
+            return self.cross[base][self.index[currency]]
+        base_price = self.numbers["price"][self.index[base]]
+        if not base_price > 0:
+            return math.nan
+        return self.numbers["price"][self.index[currency]] / base_price
+
+    def append(self, coin):
+        """
+        Adds a listing, keeping only the fields the bot reads. A listing
+        whose slug is already in the table replaces the old one.
+
+        @param coin - listing as returned by coinmarketcap
+        """
+        self.cross.clear()
+        quote = coin['quote']['USD']
+        i = self.index.get(coin['slug'])
+        if i is None:
+            self.index[coin['slug']] = len(self.strings["slug"])
+            for field in NUMERIC_FIELDS:
+                self.numbers[field].append(_to_float(coin[field]))
+            for field in QUOTE_FIELDS:
+                self.numbers[field].append(_to_float(quote[field]))
+            for field in STRING_FIELDS:
+                self.strings[field].append(coin[field] or "")
+        else:
+            for field in NUMERIC_FIELDS:
+                self.numbers[field][i] = _to_float(coin[field])
+            for field in QUOTE_FIELDS:
+                self.numbers[field][i] = _to_float(quote[field])
+            for field in STRING_FIELDS:
+                self.strings[field][i] = coin[field] or ""
+
+    def merged(self, coins):
+        """
+        Returns a copy of the table with listings added or replaced.
+        The table itself is left untouched for anyone still reading it.
+
+        @param coins - listings as returned by coinmarketcap
+        @return - new MarketTable
+        """
+        table = MarketTable({field: array('d', column)
+                             for field, column in self.numbers.items()},
+                            {field: list(column)
+                             for field, column in self.strings.items()})
+        for coin in coins:
+            table.append(coin)
+        return table
+
+    def _number(self, field, i):
+        value = self.numbers[field][i]
+        if math.isnan(value):
+            return None
+        if field in INT_FIELDS:
+            return int(value)
+        return value
+
+    def __getitem__(self, slug):
+        i = self.index[slug]
+        data = {field: self._number(field, i) for field in NUMERIC_FIELDS}
+        for field in STRING_FIELDS:
+            data[field] = self.strings[field][i] or None
+        quote = {field: self._number(field, i) for field in QUOTE_FIELDS}
+        quote["last_updated"] = data["last_updated"]
+        data["quote"] = {"USD": quote}
+        return data
+
+    def __contains__(self, slug):
+        return slug in self.index
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self):
+        return len(self.index)
+
+
+class StringColumn(Sequence):
+    """Strings stored back to back in a buffer, found through offsets"""
+
+    def __init__(self, offsets, buffer):
+        """
+        @param offsets - start of every string plus the end of the last
+        @param buffer - bytes holding the utf-8 encoded strings
+        """
+        self.offsets = offsets
+        self.buffer = buffer
+
+    def __getitem__(self, i):
+        return str(self.buffer[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+
+class _JsonStream:
+    """Reads JSON values one at a time from chunks of bytes"""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.position = 0
+        self.finished = False
+
+    def _read_more(self):
+        """
+        Appends the next chunk to what's left of the buffer
+
+        @return - False if the stream has ended
+        """
+        if self.finished:
+            return False
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            self.finished = True
+            text = self.utf8.decode(b"", final=True)
+        else:
+            text = self.utf8.decode(chunk)
+        self.buffer = self.buffer[self.position:] + text
+        self.position = 0
+        return True
+
+    def peek(self):
+        """
+        Skips whitespace and returns the next character
+        """
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in WHITESPACE:
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self._read_more():
+                raise MarketTableException("Unexpected end of listings.")
+
+    def expect(self, character):
+        if self.peek() != character:
+            raise MarketTableException("Expected '{}' in listings.".format(character))
+        self.position += 1
+
+    def value(self):
+        """
+        Decodes the next value, reading more chunks until it's complete
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+                # a number at the end of the buffer, or cut short at its
+                # '.' or exponent, may continue in the next chunk
+                if self.finished or (end < len(self.buffer)
+                                     and self.buffer[end] not in NUMBER_CHARACTERS):
+                    self.position = end
+                    return value
+            except ValueError:
+                if self.finished:
+                    raise
+            self._read_more()
+
+
+def parse_listings(chunks):
+    """
+    Parses a listings response as it arrives, putting each listing in
+    a MarketTable as soon as it's decoded and dropping the decoded dict.
+    The full response is never held in memory.
+
+    @param chunks - iterable of bytes of the response body
+    @return - MarketTable, with the response status in its status
+    """
+    table = MarketTable()
+    stream = _JsonStream(chunks)
+    found_data = False
+    stream.expect("{")
+    while stream.peek() != "}":
+        key = stream.value()
+        stream.expect(":")
+        if key == "data":
+            found_data = True
+            stream.expect("[")
+            if stream.peek() == "]":
+                stream.position += 1
+            else:
+                while True:
+                    table.append(stream.value())
+                    if stream.peek() == "]":
+                        stream.position += 1
+                        break
+                    stream.expect(",")
+        else:
+            value = stream.value()
+            if key == "status":
+                table.status = value
+        if stream.peek() != "}":
+            stream.expect(",")
+    if not found_data:
+        raise MarketTableException("Listings response has no data.")
+    return table
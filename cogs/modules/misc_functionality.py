@@ -1,4 +1,5 @@
 from bot_logger import logger
+from cogs.modules.outbound_scheduler import INTERACTIVE
 import discord
 import json
 import time
@@ -12,8 +13,9 @@ MISC_DISABLED = "MISC_DISABLED"
 class MiscFunctionality:
     """Handles all Misc command functionality"""
 
-    def __init__(self, bot, server_data):
+    def __init__(self, bot, server_data, outbound):
         self.bot = bot
+        self.outbound = outbound
         self.server_data = server_data
         self.start_time = time.time()
 
@@ -35,6 +37,21 @@ class MiscFunctionality:
         except Exception as e:
             return True
 
+    async def _say_msg(self, msg=None, channel=None, emb=None, priority=INTERACTIVE):
+        """
+        Bot will say msg if given correct permissions
+
+        @param msg - msg to say
+        @param channel - channel to send msg to
+        @param emb - embedded msg to say
+        @param priority - outbound priority of the msg
+        @return - the sent msg
+        """
+        try:
+            return await self.outbound.send(channel, msg, emb, priority)
+        except Exception as e:
+            pass
+
     def update(self, server_data=None):
         """
         Updates utilities with new coin market and server data
@@ -49,7 +66,7 @@ class MiscFunctionality:
             if not self._check_permission(ctx):
                 return
             msg = "https://discordbots.org/bot/353373501274456065"
-            await self.bot.say(msg)
+            await self._say_msg(msg)
         except Exception as e:
             print("An error has occured. See error.log.")
             logger.error("Exception: {}".format(str(e)))
@@ -62,7 +79,7 @@ class MiscFunctionality:
             if not self._check_permission(ctx):
                 return
             msg = "https://github.com/kodycode/CoinMarketDiscordBot/wiki/Updates"
-            await self.bot.say(msg)
+            await self._say_msg(msg)
         except Exception as e:
             print("An error has occured. See error.log.")
             logger.error("Exception: {}".format(str(e)))
@@ -79,7 +96,7 @@ class MiscFunctionality:
                    "ETH: 0x13318b2A795940D119b999ECfe827708131fA3f6\n"
                    "LTC: LiChyn9o9VhppANUHDhe6ReFjGoGhLqtZm\n"
                    "```Or via paypal: https://paypal.me/Kodycode")
-            await self.bot.say(msg)
+            await self._say_msg(msg)
         except Exception as e:
             print("An error has occured. See error.log.")
             logger.error("Exception: {}".format(str(e)))
@@ -92,7 +109,7 @@ class MiscFunctionality:
             if not self._check_permission(ctx):
                 return
             msg = ("https://patreon.com/coinmarketbot")
-            await self.bot.say(msg)
+            await self._say_msg(msg)
         except Exception as e:
             print("An error has occured. See error.log.")
             logger.error("Exception: {}".format(str(e)))
@@ -152,7 +169,7 @@ class MiscFunctionality:
             em.set_footer(text="Created with discord.py",
                           icon_url="https://www.python.org/static/"
                                    "opengraph-icon-200x200.png")
-            await self.bot.say(embed=em)
+            await self._say_msg(emb=em)
         except Exception as e:
             print("An error has occured. See error.log.")
             logger.error("Exception: {}".format(str(e)))
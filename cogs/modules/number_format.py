@@ -0,0 +1,208 @@
+from itertools import repeat
+import math
+import operator
+
+
+fiat_currencies = {
+    'AUD': '$', 'BRL': 'R$', 'CAD': '$', 'CHF': 'Fr.',
+    'CLP': '$', 'CNY': '¥', 'CZK': 'Kc', 'DKK': 'kr',
+    'EUR': '€', 'GBP': '£', 'HKD': 'HK$', 'HUF': 'Ft',
+    'IDR': 'Rp ', 'ILS': '₪', 'INR': '₹', 'JPY': '¥‎',
+    'KRW': '₩', 'MXN': '$', 'MYR': 'RM', 'NOK': 'kr',
+    'NZD': '$', 'PHP': '₱', 'PKR': 'Rupees', 'PLN': 'zł',
+    'RUB': '₽', 'SEK': 'kr', 'SGD': 'S$', 'THB': '฿',
+    'TRY': '₺', 'TWD': 'NT$', 'ZAR': 'R ', 'USD': '$'
+}
+
+fiat_suffix = [
+    'CZK', 'DKK', 'HUF',
+    'NOK', 'PKR', 'RUB',
+    'SEK'
+]
+
+
+def format_number(value):
+    """
+    Formats a number with up to 6 decimals, without trailing zeros
+
+    @param value - number to format
+    @return - formatted number (i.e. '8,000.5')
+    """
+    # only a '.' that ended up last is left after trimming the zeros
+    return format(value, ",.6f").rstrip('0').rstrip('.')
+
+
+def format_numbers(values):
+    """
+    Formats a column of numbers like format_number
+
+    @param values - numbers to format
+    @return - iterator of formatted numbers
+    """
+    texts = map(format, values, repeat(",.6f"))
+    return map(str.rstrip, map(str.rstrip, texts, repeat('0')), repeat('.'))
+
+
+def format_short(value):
+    """
+    Formats a number for a narrow column: 2 decimals from 1 up, 4
+    significant digits below 1
+
+    @param value - number to format
+    @return - formatted number (i.e. '8,000.12', '0.00001234'), '0' for
+              anything not above 0
+    """
+    if value >= 1:
+        return format(value, ",.2f")
+    if value > 0:
+        return format(value, ".{}f".format(3 - math.floor(math.log10(value))))
+    return "0"
+
+
+def format_count(value):
+    """
+    Formats a whole number such as a supply
+
+    @param value - number to format, decimals are dropped
+    @return - formatted number (i.e. '21,000,000')
+    """
+    return format(int(float(value)), ",")
+
+
+def _whole_numbers(values):
+    """
+    Drops the decimals of a column of numbers. Missing values (NaN in a
+    MarketTable column), which int() refuses, come out as 0, so the
+    caller has to tell them apart.
+
+    @param values - numbers
+    @return - iterator of ints
+    """
+    # NaN never equals itself
+    return (int(value) if value == value else 0 for value in values)
+
+
+def format_counts(values):
+    """
+    Formats a column of whole numbers
+
+    @param values - numbers to format, decimals are dropped
+    @return - list of formatted numbers
+    """
+    return list(map(format, _whole_numbers(map(float, values)), repeat(",")))
+
+
+class FiatFormatter:
+    """
+    Formats amounts of one fiat. The symbol and whether it goes before
+    or after the number are worked out once, when the formatter is made.
+    """
+
+    def __init__(self, fiat):
+        """
+        @param fiat - uppercase fiat currency (i.e. 'EUR', 'USD')
+        """
+        self.fiat = fiat
+        symbol = fiat_currencies[fiat]
+        if fiat in fiat_suffix:
+            self.prefix = ''
+            self.suffix = ' ' + symbol
+        else:
+            self.prefix = symbol
+            self.suffix = ''
+
+    def _affix(self, texts):
+        """
+        Adds the symbol to a column of formatted numbers
+
+        @param texts - formatted numbers
+        @return - list of formatted amounts
+        """
+        if self.suffix:
+            return list(map(operator.add, texts, repeat(self.suffix)))
+        return list(map(operator.add, repeat(self.prefix), texts))
+
+    def price(self, value):
+        """
+        Formats a price with up to 6 decimals
+
+        @param value - price in this fiat
+        @return - formatted price (i.e. '$8,000.5')
+        """
+        return self.prefix + format_number(value) + self.suffix
+
+    def short_price(self, value):
+        """
+        Formats a price for a narrow column like format_short
+
+        @param value - price in this fiat
+        @return - formatted price (i.e. '$8,000.12', '$0.00001234')
+        """
+        return self.prefix + format_short(value) + self.suffix
+
+    def amount(self, value):
+        """
+        Formats a large amount such as a market cap, without decimals
+
+        @param value - amount in this fiat
+        @return - formatted amount (i.e. '$135,000,000,000')
+        """
+        return self.prefix + format(int(value), ",") + self.suffix
+
+    def quote(self, value):
+        """
+        Formats a price the way CoinMarket.format_price always has:
+        zeros are only trimmed when the symbol comes first, and a whole
+        price loses every '.' of the text, symbol included.
+
+        @param value - price in this fiat
+        @return - formatted price
+        """
+        if self.suffix:
+            return format(float(value), ",.6f") + self.suffix
+        text = (self.prefix + format(float(value), ",.6f")).rstrip('0')
+        if text[-1] == '.':
+            return text.replace('.', '')
+        return text
+
+    def prices(self, values):
+        """
+        Formats a column of prices
+
+        @param values - prices in this fiat
+        @return - list of formatted prices
+        """
+        return self._affix(format_numbers(values))
+
+    def amounts(self, values):
+        """
+        Formats a column of large amounts, missing ones as 0
+
+        @param values - amounts in this fiat
+        @return - list of formatted amounts
+        """
+        return self._affix(map(format, _whole_numbers(values), repeat(",")))
+
+    def quotes(self, values):
+        """
+        Formats a column of prices like CoinMarket.format_price
+
+        @param values - prices in this fiat
+        @return - list of formatted prices
+        """
+        if self.suffix:
+            return self._affix(map(format, map(float, values), repeat(",.6f")))
+        return list(map(self.quote, values))
+
+
+_formatters = {fiat: FiatFormatter(fiat) for fiat in fiat_currencies}
+
+
+def get_formatter(fiat):
+    """
+    Returns the formatter of a fiat
+
+    @param fiat - uppercase fiat currency (i.e. 'EUR', 'USD')
+    @return - FiatFormatter
+    """
+    return _formatters[fiat]
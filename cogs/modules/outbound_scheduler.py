@@ -0,0 +1,214 @@
+from bot_logger import logger
+from bot_metrics import metrics
+from cogs.modules.rate_limiter import TokenBucket
+from discord.errors import Forbidden, HTTPException, NotFound
+from discord.ext.commands.bot import _get_variable
+from collections import deque
+import asyncio
+import random
+import time
+
+
+INTERACTIVE = 0
+ALERT = 1
+BULK = 2
+PRIORITY_NAMES = ["interactive", "alert", "bulk"]
+
+CHANNEL_RATE = 1
+CHANNEL_BURST = 5
+GLOBAL_RATE = 45
+GLOBAL_BURST = 50
+BULK_RESERVE = 10
+MAX_RETRIES = 3
+RETRY_BASE_DELAY = 0.5
+
+
+def _channel_key(destination):
+    """
+    Returns what messages to a channel or user are grouped by
+    """
+    return getattr(destination, "id", destination)
+
+
+class OutboundScheduler:
+    """
+    Sends every message the bot posts. Messages are queued by priority
+    (interactive replies, then alerts, then bulk live updates) and sent
+    while staying within Discord's per channel and global rate limits.
+
+    One worker only ever sends interactive replies and alerts, and bulk
+    messages can't spend the last BULK_RESERVE global tokens, so a
+    broadcast can only delay a reply by the sends already in progress,
+    never by the rest of the broadcast queue. A worker never waits on a
+    channel another worker is sending to; it leaves that channel's
+    messages queued and takes the next one.
+    """
+
+    def __init__(self, bot, workers=4):
+        self.bot = bot
+        self.workers = max(2, int(workers))
+        self.queues = [deque(), deque(), deque()]
+        self.condition = asyncio.Condition()
+        self.channel_buckets = {}
+        self.busy_channels = set()
+        self.global_bucket = TokenBucket(GLOBAL_RATE,
+                                         GLOBAL_BURST,
+                                         time.monotonic())
+        self.tasks = []
+
+    def start(self):
+        """
+        Starts the workers on the bot's event loop
+        """
+        if self.tasks:
+            return
+        self.tasks.append(self.bot.loop.create_task(self._worker(priority_only=True)))
+        for _ in range(self.workers - 1):
+            self.tasks.append(self.bot.loop.create_task(self._worker()))
+
+    def get_backlog(self):
+        """
+        Returns the number of messages waiting to be sent
+        """
+        return sum(len(queue) for queue in self.queues)
+
+    def submit(self, destination=None, content=None, embed=None, priority=INTERACTIVE):
+        """
+        Queues a message and returns a future for the sent message.
+        When no destination is given, the channel of the command
+        currently being processed is used (the same lookup bot.say does).
+
+        @param destination - channel or user to send to
+        @param content - msg to send
+        @param embed - embedded msg to send
+        @param priority - INTERACTIVE, ALERT or BULK
+        @return - future resolving to the sent message
+        """
+        if destination is None:
+            destination = _get_variable('_internal_channel')
+        future = self.bot.loop.create_future()
+        self.queues[priority].append((destination,
+                                      content,
+                                      embed,
+                                      future,
+                                      time.monotonic()))
+        metrics.set_gauge("outbound.backlog", self.get_backlog())
+        self.bot.loop.create_task(self._notify())
+        return future
+
+    async def send(self, destination=None, content=None, embed=None, priority=INTERACTIVE):
+        """
+        Queues a message and waits for it to be sent
+
+        @return - the sent message
+        """
+        return await self.submit(destination, content, embed, priority)
+
+    async def _notify(self):
+        # every worker is woken, since the one picked by notify() could be
+        # the priority worker for a bulk message or busy with its channel
+        async with self.condition:
+            self.condition.notify_all()
+
+    def _next_item(self, priority_only):
+        """
+        Takes the first queued message, highest priority first, whose
+        channel no other worker is sending to. Messages to a busy
+        channel stay queued in order until the channel is free.
+
+        @param priority_only - leave bulk messages to the other workers
+        @return - (priority, queued message), or (None, None)
+        """
+        for priority in (INTERACTIVE, ALERT, BULK):
+            if priority == BULK and priority_only:
+                break
+            queue = self.queues[priority]
+            for position, item in enumerate(queue):
+                if _channel_key(item[0]) not in self.busy_channels:
+                    del queue[position]
+                    return priority, item
+        return None, None
+
+    async def _worker(self, priority_only=False):
+        while True:
+            async with self.condition:
+                priority, item = self._next_item(priority_only)
+                while item is None:
+                    await self.condition.wait()
+                    priority, item = self._next_item(priority_only)
+                metrics.set_gauge("outbound.backlog", self.get_backlog())
+                destination, content, embed, future, queued_at = item
+                if future.cancelled():
+                    continue
+                # claimed before the condition is released, so messages
+                # to the same channel keep their order
+                key = _channel_key(destination)
+                self.busy_channels.add(key)
+            try:
+                metrics.observe("outbound.wait.{}".format(PRIORITY_NAMES[priority]),
+                                time.monotonic() - queued_at)
+                try:
+                    result = await self._send(key, destination, content, embed, priority)
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    if not future.done():
+                        future.set_result(result)
+            finally:
+                async with self.condition:
+                    self.busy_channels.discard(key)
+                    self.condition.notify_all()
+
+    async def _wait_for_tokens(self, key, priority):
+        """
+        Waits until both the channel and the global bucket allow a send
+        """
+        bucket = self.channel_buckets.get(key)
+        if bucket is None:
+            bucket = self.channel_buckets[key] = TokenBucket(CHANNEL_RATE,
+                                                             CHANNEL_BURST,
+                                                             time.monotonic())
+        reserve = BULK_RESERVE if priority == BULK else 0
+        while True:
+            now = time.monotonic()
+            channel_tokens = bucket.refill(now)
+            global_tokens = self.global_bucket.refill(now)
+            if channel_tokens >= 1 and global_tokens >= 1 + reserve:
+                bucket.tokens -= 1
+                self.global_bucket.tokens -= 1
+                return
+            delay = max((1 - channel_tokens) / bucket.rate,
+                        (1 + reserve - global_tokens) / self.global_bucket.rate)
+            await asyncio.sleep(delay)
+
+    async def _send(self, key, destination, content, embed, priority):
+        """
+        Sends a message, retrying rate limited and server errors with
+        exponential backoff and jitter
+        """
+        attempt = 0
+        while True:
+            await self._wait_for_tokens(key, priority)
+            try:
+                if embed:
+                    result = await self.bot.send_message(destination, content, embed=embed)
+                else:
+                    result = await self.bot.send_message(destination, content)
+                metrics.incr("outbound.sent.{}".format(PRIORITY_NAMES[priority]))
+                return result
+            except (Forbidden, NotFound):
+                metrics.incr("outbound.failed")
+                raise
+            except HTTPException as e:
+                status = getattr(e.response, "status", None)
+                if attempt >= MAX_RETRIES or (status != 429 and (status is None or status < 500)):
+                    metrics.incr("outbound.failed")
+                    logger.error("Failed to send message: {}".format(str(e)))
+                    raise
+                if status == 429:
+                    # the channel bucket was spent elsewhere, start it over
+                    self.channel_buckets[key].tokens = 0
+                attempt += 1
+                metrics.incr("outbound.retries")
+                await asyncio.sleep(random.uniform(0, RETRY_BASE_DELAY * 2 ** attempt))
@@ -0,0 +1,364 @@
+from bot_logger import logger
+from bot_metrics import metrics
+from cogs.modules.coin_market import CurrencyException, FiatException
+from cogs.modules.outbound_scheduler import INTERACTIVE
+from discord.errors import Forbidden
+import discord
+import json
+import math
+
+
+CMB_ADMIN = "CMB ADMIN"
+ADMIN_ONLY = "ADMIN_ONLY"
+CMC_DISABLED = "CMC_DISABLED"
+
+
+class PortfolioFunctionality:
+    """Handles Portfolio command functionality"""
+
+    def __init__(self, bot, coin_market, lot_capacity, server_data, outbound):
+        self.bot = bot
+        self.outbound = outbound
+        self.server_data = server_data
+        self.coin_market = coin_market
+        self.lot_capacity = int(lot_capacity)
+        self.market_list = ""
+        self.acronym_list = ""
+        self.portfolio_data = self._check_portfolio_file()
+        self._save_portfolio_file(self.portfolio_data, backup=True)
+
+    def update(self, market_list=None, acronym_list=None, server_data=None):
+        """
+        Updates utilities with new coin market and server data
+        """
+        if server_data:
+            self.server_data = server_data
+        if market_list:
+            self.market_list = market_list
+        if acronym_list:
+            self.acronym_list = acronym_list
+
+    def _check_permission(self, ctx):
+        """
+        Checks if user contains the correct permissions to use these
+        commands
+        """
+        try:
+            user_roles = ctx.message.author.roles
+            server_id = ctx.message.server.id
+            if server_id not in self.server_data:
+                return True
+            elif (ADMIN_ONLY in self.server_data[server_id]
+                  or CMC_DISABLED in self.server_data[server_id]):
+                if CMB_ADMIN not in [role.name for role in user_roles]:
+                    return False
+            return True
+        except Exception:
+            return True
+
+    def _check_portfolio_file(self):
+        """
+        Checks to see if there's a valid portfolios.json file
+        """
+        try:
+            with open('portfolios.json') as portfolios:
+                return json.load(portfolios)
+        except FileNotFoundError:
+            self._save_portfolio_file()
+            return json.loads('{}')
+        except Exception as e:
+            print("An error has occured. See error.log.")
+            logger.error("Exception: {}".format(str(e)))
+
+    def _save_portfolio_file(self, portfolio_data={}, backup=False):
+        """
+        Saves portfolios.json file
+        """
+        if backup:
+            portfolio_filename = "portfolios_backup.json"
+        else:
+            portfolio_filename = "portfolios.json"
+        with open(portfolio_filename, 'w') as outfile:
+            json.dump(portfolio_data,
+                      outfile,
+                      indent=4)
+
+    async def _say_msg(self, msg=None, channel=None, emb=None, priority=INTERACTIVE):
+        """
+        Bot will say msg if given correct permissions
+
+        @param msg - msg to say
+        @param channel - channel to send msg to
+        @param emb - embedded msg to say
+        @param priority - outbound priority of the msg
+        @return - the sent msg
+        """
+        try:
+            return await self.outbound.send(channel, msg, emb, priority)
+        except Exception:
+            pass
+
+    def _find_currency(self, currency):
+        """
+        Resolves an acronym to its currency and checks it exists
+
+        @param currency - cryptocurrency or its acronym
+        @return - cryptocurrency
+        """
+        if currency.upper() in self.acronym_list:
+            currency = self.acronym_list[currency.upper()]
+            if "Duplicate" in currency:
+                raise CurrencyException(currency)
+        if currency not in self.market_list:
+            raise CurrencyException("Currency is invalid: ``{}``".format(currency))
+        return currency
+
+    def value_portfolio(self, user_id, fiat):
+        """
+        Values every holding of a user in one pass over the market list.
+        Fiat rates are looked up once per fiat per valuation, not once
+        per lot.
+
+        @param user_id - user owning the portfolio
+        @param fiat - fiat to value the portfolio in
+        @return - (holdings, total value, total cost), where holdings is
+                  a list of (currency, amount, value, cost) with value
+                  NaN for currencies no longer listed, most valuable
+                  first, or None if the user has no portfolio
+        """
+        portfolio = self.portfolio_data.get(user_id)
+        if not portfolio:
+            return None
+        with metrics.timer("portfolio.valuation"):
+            prices = self.market_list.column('price')
+            index = self.market_list.index
+            usd_rates = {"USD": 1.0}
+
+            def usd_rate(lot_fiat):
+                rate = usd_rates.get(lot_fiat)
+                if rate is None:
+                    rate = usd_rates[lot_fiat] = float(self.coin_market.converter.convert(1.0, "USD", lot_fiat))
+                return rate
+
+            rate = usd_rate(fiat)
+            holdings = []
+            total_value = 0.0
+            total_cost = 0.0
+            for currency, lots in portfolio.items():
+                amount = 0.0
+                usd_cost = 0.0
+                for lot in lots:
+                    amount += lot["amount"]
+                    usd_cost += lot["amount"] * lot["cost"] / usd_rate(lot["fiat"])
+                i = index.get(currency)
+                price = prices[i] if i is not None else math.nan
+                value = amount * price * rate
+                cost = usd_cost * rate
+                holdings.append((currency, amount, value, cost))
+                if not math.isnan(value):
+                    total_value += value
+                    total_cost += cost
+            holdings.sort(key=lambda holding: -holding[2] if not math.isnan(holding[2]) else math.inf)
+        return holdings, total_value, total_cost
+
+    def get_value(self, user_id, fiat):
+        """
+        Returns what a user's portfolio is worth
+
+        @param user_id - user owning the portfolio
+        @param fiat - fiat to value the portfolio in
+        @return - value, or None if the user has no portfolio
+        """
+        valuation = self.value_portfolio(user_id, fiat)
+        if valuation is None:
+            return None
+        return valuation[1]
+
+    def _format_profit(self, value, cost, fiat):
+        """
+        Formats profit and loss in fiat and percent
+
+        @param value - what the holding is worth
+        @param cost - what the holding cost
+        @param fiat - fiat of the value and cost
+        """
+        profit = value - cost
+        sign = "-" if profit < 0 else "+"
+        msg = "{}{}".format(sign, self.coin_market.format_price(abs(profit),
+                                                                 fiat,
+                                                                 convert=False))
+        if cost:
+            msg += " ({}{:.2f}%)".format(sign, abs(profit) / cost * 100)
+        return msg
+
+    async def add_lot(self, ctx, currency, amount, cost, fiat):
+        """
+        Adds a lot of coins bought at a price to the user's portfolio
+
+        @param ctx - context of the command sent
+        @param currency - cryptocurrency that was bought
+        @param amount - amount of coins bought
+        @param cost - price of one coin at the time
+        @param fiat - fiat the coins were bought with
+        """
+        try:
+            if not self._check_permission(ctx):
+                return
+            ucase_fiat = self.coin_market.fiat_check(fiat)
+            currency = self._find_currency(currency)
+            if amount <= 0 or cost < 0:
+                await self._say_msg("Amount has to be above 0 and cost can't "
+                                    "be negative.")
+                return
+            user_id = ctx.message.author.id
+            portfolio = self.portfolio_data.setdefault(user_id, {})
+            if sum(len(lots) for lots in portfolio.values()) >= self.lot_capacity:
+                await self._say_msg("Unable to add lot, user portfolio capacity "
+                                    "of **{}** lots has been reached."
+                                    "".format(self.lot_capacity))
+                return
+            lots = portfolio.setdefault(currency, [])
+            lots.append({"amount": amount, "cost": cost, "fiat": ucase_fiat})
+            self._save_portfolio_file(self.portfolio_data)
+            await self._say_msg("Added **{}** **{}** bought at **{}** each as "
+                                "lot **{}**.".format(amount,
+                                                     currency.title(),
+                                                     self.coin_market.format_price(cost,
+                                                                                   ucase_fiat,
+                                                                                   convert=False),
+                                                     len(lots)))
+        except CurrencyException as e:
+            logger.error("CurrencyException: {}".format(str(e)))
+            await self._say_msg(str(e))
+        except FiatException as e:
+            logger.error("FiatException: {}".format(str(e)))
+            await self._say_msg(str(e))
+        except Exception as e:
+            print("Failed to add lot. See error.log.")
+            logger.error("Exception: {}".format(str(e)))
+
+    async def remove_lot(self, ctx, currency, lot_num):
+        """
+        Removes a lot, or a whole holding, from the user's portfolio
+
+        @param ctx - context of the command sent
+        @param currency - cryptocurrency of the lot
+        @param lot_num - number of the lot, None to remove every lot
+        """
+        try:
+            if not self._check_permission(ctx):
+                return
+            user_id = ctx.message.author.id
+            portfolio = self.portfolio_data.get(user_id, {})
+            if currency.upper() in self.acronym_list:
+                currency = self.acronym_list[currency.upper()]
+            if currency not in portfolio:
+                await self._say_msg("**{}** is not in your portfolio. Use "
+                                    "`$getp` to see your portfolio."
+                                    "".format(currency.title()))
+                return
+            lots = portfolio[currency]
+            if lot_num is None:
+                portfolio.pop(currency)
+                msg = "Removed **{}** from your portfolio.".format(currency.title())
+            elif lot_num.isdigit() and 0 < int(lot_num) <= len(lots):
+                lots.pop(int(lot_num) - 1)
+                if not lots:
+                    portfolio.pop(currency)
+                msg = "Removed lot **{}** of **{}**.".format(lot_num,
+                                                              currency.title())
+            else:
+                await self._say_msg("The lot you've entered does not exist. "
+                                    "Use `$getp` to see your lots.")
+                return
+            if not portfolio:
+                self.portfolio_data.pop(user_id, None)
+            self._save_portfolio_file(self.portfolio_data)
+            await self._say_msg(msg)
+        except Forbidden:
+            pass
+        except Exception as e:
+            print("Failed to remove lot. See error.log.")
+            logger.error("Exception: {}".format(str(e)))
+
+    async def display_portfolio(self, ctx, fiat):
+        """
+        Displays the user's holdings with their profit and loss
+
+        @param ctx - context of the command sent
+        @param fiat - desired fiat currency (i.e. 'EUR', 'USD')
+        """
+        try:
+            if not self._check_permission(ctx):
+                return
+            ucase_fiat = self.coin_market.fiat_check(fiat)
+            user_id = ctx.message.author.id
+            valuation = self.value_portfolio(user_id, ucase_fiat)
+            if valuation is None:
+                await self._say_msg("You don't have a portfolio yet. Add coins "
+                                    "with `$addp`.")
+                return
+            holdings, total_value, total_cost = valuation
+            portfolio = self.portfolio_data[user_id]
+            formatted_data = []
+            result_msg = ""
+            for currency, amount, value, cost in holdings:
+                if math.isnan(value):
+                    msg = ("**{}**: **{}** coin(s), no longer listed\n"
+                           "".format(currency.title(), amount))
+                else:
+                    msg = ("**{}**: **{}** coin(s) worth **{}**\n"
+                           "Profit: **{}**\n"
+                           "".format(currency.title(),
+                                     amount,
+                                     self.coin_market.format_price(value,
+                                                                   ucase_fiat,
+                                                                   convert=False),
+                                     self._format_profit(value, cost, ucase_fiat)))
+                for lot_num, lot in enumerate(portfolio[currency], 1):
+                    msg += ("`{}` {} at {}\n"
+                            "".format(lot_num,
+                                      lot["amount"],
+                                      self.coin_market.format_price(lot["cost"],
+                                                                    lot["fiat"],
+                                                                    convert=False)))
+                msg += "\n"
+                if len(result_msg) + len(msg) < 2000:
+                    result_msg += msg
+                else:
+                    formatted_data.append(result_msg)
+                    result_msg = msg
+            totals = ("Total worth: **{}**\n"
+                      "Total profit: **{}**"
+                      "".format(self.coin_market.format_price(total_value,
+                                                              ucase_fiat,
+                                                              convert=False),
+                                self._format_profit(total_value,
+                                                    total_cost,
+                                                    ucase_fiat)))
+            if len(result_msg) + len(totals) < 2000:
+                result_msg += totals
+            else:
+                formatted_data.append(result_msg)
+                result_msg = totals
+            formatted_data.append(result_msg)
+            color = 0xD14836 if total_value < total_cost else 0x00FF00
+            first_post = True
+            for msg in formatted_data:
+                if first_post:
+                    em = discord.Embed(title="Portfolio",
+                                       description=msg,
+                                       colour=color)
+                    first_post = False
+                else:
+                    em = discord.Embed(description=msg,
+                                       colour=color)
+                await self._say_msg(emb=em)
+        except Forbidden:
+            pass
+        except FiatException as e:
+            logger.error("FiatException: {}".format(str(e)))
+            await self._say_msg(str(e))
+        except Exception as e:
+            print("Failed to display portfolio. See error.log.")
+            logger.error("Exception: {}".format(str(e)))
@@ -0,0 +1,270 @@
+from bot_logger import logger
+from bot_metrics import metrics
+import math
+import mmap
+import struct
+
+
+MAGIC = b"CMBH"
+VERSION = 1
+DAY = 86400
+# magic, version, padding, resolution, capacity, max coins, coin count
+HEADER = struct.Struct("=4sHHIIII")
+COIN_COUNT_OFFSET = 20
+# period stamp (uint32) plus price, volume and market cap (float32)
+BYTES_PER_SLOT = 16
+WINDOW_UNITS = {"m": 60, "h": 3600, "d": DAY}
+
+
+def parse_window(window):
+    """
+    Converts a window such as '15m', '4h' or '1d' to seconds
+
+    @param window - number followed by m, h or d
+    @return - seconds in the window
+    """
+    unit = window[-1:].lower()
+    if unit not in WINDOW_UNITS or not window[:-1].isdigit():
+        raise ValueError("Invalid window: {}".format(window))
+    return int(window[:-1]) * WINDOW_UNITS[unit]
+
+
+class PriceHistory:
+    """
+    Fixed size history of price, 24h volume and market cap per coin,
+    kept in a memory mapped file so it survives restarts.
+
+    Time is cut into periods of `resolution` seconds and every coin has
+    a ring of `retention / resolution` slots, one per period, so a
+    lookup is a single index computation. Each slot is stamped with its
+    period, which tells current slots apart from ones left over from an
+    older lap of the ring or never written.
+
+    A slot takes 16 bytes, so a coin needs 16 * 86400 / resolution bytes
+    per day of retention: 4.5 KiB at a 5 minute resolution (22 MiB for
+    5000 coins), 22.5 KiB at a 1 minute resolution. Pages of coins that
+    are never looked up are never loaded into memory.
+    """
+
+    def __init__(self, path, resolution=300, retention=DAY, max_coins=5000,
+                 sample_interval=None):
+        """
+        @param path - file to keep the history in
+        @param resolution - seconds per slot
+        @param retention - seconds of history to keep
+        @param max_coins - number of coins that can be tracked. Once
+                           the history is full, new coins take the rows
+                           of coins with nothing recorded within the
+                           retention, or are left out if there are none
+        @param sample_interval - seconds between two records of a coin
+                                 (the market refresh interval), the
+                                 resolution if None
+        """
+        self.path = path
+        self.resolution = int(resolution)
+        self.capacity = max(1, int(retention) // self.resolution)
+        self.sample_interval = max(self.resolution, int(sample_interval or self.resolution))
+        # a coin only fills every n-th slot when it is refreshed less often
+        # than the resolution; look back over two refreshes, so a sample
+        # is still found after a skipped refresh
+        self.tolerance = 2 * math.ceil(self.sample_interval / self.resolution)
+        self.max_coins = int(max_coins)
+        self.size = (HEADER.size
+                     + self.max_coins * 4
+                     + self.max_coins * self.capacity * BYTES_PER_SLOT)
+        self.buffer = self._open()
+        view = memoryview(self.buffer)
+        position = HEADER.size
+        self.ids = view[position:position + self.max_coins * 4].cast('i')
+        position += self.max_coins * 4
+        slots = self.max_coins * self.capacity
+        self.periods = view[position:position + slots * 4].cast('I')
+        position += slots * 4
+        self.prices = view[position:position + slots * 4].cast('f')
+        position += slots * 4
+        self.volumes = view[position:position + slots * 4].cast('f')
+        position += slots * 4
+        self.market_caps = view[position:position + slots * 4].cast('f')
+        coin_count = HEADER.unpack_from(self.buffer)[6]
+        self.rows = {self.ids[row]: row for row in range(coin_count)}
+        # latest period recorded per row, tells which rows can be reused
+        self.last_periods = [0] * self.max_coins
+        for row in range(coin_count):
+            start = row * self.capacity
+            self.last_periods[row] = max(self.periods[start:start + self.capacity])
+        self.free_rows = None
+        metrics.set_gauge("history.bytes_per_coin_day",
+                          BYTES_PER_SLOT * DAY // self.resolution)
+
+    def _open(self):
+        """
+        Maps the history file, starting a new one if it is missing or
+        was made with other settings
+        """
+        header = HEADER.pack(MAGIC, VERSION, 0, self.resolution,
+                             self.capacity, self.max_coins, 0)
+        try:
+            with open(self.path, 'r+b') as history:
+                buffer = mmap.mmap(history.fileno(), 0)
+            # everything but the coin count has to match
+            if len(buffer) == self.size and buffer[:COIN_COUNT_OFFSET] == header[:COIN_COUNT_OFFSET]:
+                return buffer
+            buffer.close()
+            logger.warning("Price history settings changed, starting a new history.")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error("Failed to load price history: {}".format(str(e)))
+        with open(self.path, 'wb') as history:
+            history.write(header)
+            # left sparse, untouched slots take no disk space
+            history.truncate(self.size)
+        with open(self.path, 'r+b') as history:
+            return mmap.mmap(history.fileno(), 0)
+
+    def _add_row(self, coin_id, period):
+        row = len(self.rows)
+        if row >= self.max_coins:
+            return self._reclaim_row(coin_id, period)
+        self.ids[row] = coin_id
+        self.rows[coin_id] = row
+        struct.pack_into("=I", self.buffer, COIN_COUNT_OFFSET, len(self.rows))
+        return row
+
+    def _reclaim_row(self, coin_id, period):
+        """
+        Hands a new coin the row of a coin with nothing recorded within
+        the retention, i.e. one that was delisted
+
+        @return - row, or None if every row is in use
+        """
+        if self.free_rows is None:
+            oldest = period - self.capacity
+            self.free_rows = [row for row in range(self.max_coins)
+                              if self.last_periods[row] <= oldest]
+        if not self.free_rows:
+            return None
+        row = self.free_rows.pop()
+        del self.rows[self.ids[row]]
+        start = row * self.capacity
+        for at in range(start, start + self.capacity):
+            self.periods[at] = 0
+        self.ids[row] = coin_id
+        self.rows[coin_id] = row
+        metrics.incr("history.reclaimed_rows")
+        return row
+
+    def record(self, market_list, timestamp, slugs=None):
+        """
+        Records the current price, volume and market cap of coins
+
+        @param market_list - MarketTable to record from
+        @param timestamp - time the data was fetched
+        @param slugs - coins that were refreshed, every coin if None
+        """
+        period = int(timestamp // self.resolution)
+        slot = period % self.capacity
+        ids = market_list.column('id')
+        prices = market_list.column('price')
+        volumes = market_list.column('volume_24h')
+        market_caps = market_list.column('market_cap')
+        if slugs is None:
+            indexes = range(len(ids))
+        else:
+            indexes = [market_list.index[slug] for slug in slugs
+                       if slug in market_list.index]
+        dropped = 0
+        self.free_rows = None
+        with metrics.timer("history.record"):
+            for i in indexes:
+                if math.isnan(ids[i]):
+                    continue
+                coin_id = int(ids[i])
+                row = self.rows.get(coin_id)
+                if row is None:
+                    row = self._add_row(coin_id, period)
+                    if row is None:
+                        dropped += 1
+                        continue
+                at = row * self.capacity + slot
+                self.last_periods[row] = period
+                self.periods[at] = period
+                self.prices[at] = prices[i]
+                self.volumes[at] = volumes[i]
+                self.market_caps[at] = market_caps[i]
+        if dropped:
+            metrics.incr("history.dropped_coins", dropped)
+            logger.warning("Price history is full, {} coins were not recorded. "
+                           "Raise its max_coins.".format(dropped))
+
+    def lookup(self, coin_id, timestamp, tolerance=None):
+        """
+        Returns what a coin was worth at a point in time. When nothing
+        was recorded in that period (i.e. it fell between two refreshes
+        or a refresh was skipped), up to `tolerance` earlier periods are
+        tried.
+
+        @param coin_id - coinmarketcap id of the coin
+        @param timestamp - point in time
+        @param tolerance - number of earlier periods to fall back to,
+                           two sample intervals if None
+        @return - (timestamp, price, volume, market cap) of the period
+                  found, or None
+        """
+        row = self.rows.get(coin_id)
+        if row is None:
+            return None
+        if tolerance is None:
+            tolerance = self.tolerance
+        period = int(timestamp // self.resolution)
+        for earlier in range(tolerance + 1):
+            at = row * self.capacity + (period - earlier) % self.capacity
+            if self.periods[at] == period - earlier:
+                return ((period - earlier) * self.resolution,
+                        self.prices[at],
+                        self.volumes[at],
+                        self.market_caps[at])
+        return None
+
+    def get_change(self, coin_id, window, timestamp):
+        """
+        Returns a coin's percent change over a window, from the slot of
+        `timestamp` and the slot `window` seconds before it
+
+        @param coin_id - coinmarketcap id of the coin
+        @param window - seconds to look back
+        @param timestamp - end of the window, usually the last refresh
+        @return - percent change, or None if either end is missing
+        """
+        current = self.lookup(coin_id, timestamp)
+        past = self.lookup(coin_id, timestamp - window)
+        if current is None or past is None or not past[1]:
+            return None
+        return (current[1] - past[1]) / past[1] * 100
+
+    def shortest_window(self):
+        """
+        @return - shortest window in seconds, a window shorter than the
+                  sample interval mostly falls between two samples
+        """
+        return self.sample_interval
+
+    def longest_window(self):
+        """
+        @return - longest window in seconds the retention can cover
+        """
+        return self.resolution * (self.capacity - 1)
+
+    def covers(self, window):
+        """
+        Checks if a window fits the sample interval and retention
+
+        @param window - seconds to look back
+        """
+        return self.shortest_window() <= window <= self.longest_window()
+
+    def flush(self):
+        """
+        Writes the history to disk
+        """
+        self.buffer.flush()
@@ -0,0 +1,155 @@
+from bot_metrics import metrics
+import time
+
+
+DEFAULT_LIMITS = {
+    "user": {"rate": 0.5, "burst": 5},
+    "channel": {"rate": 1, "burst": 10},
+    "server": {"rate": 2, "burst": 20}
+}
+DEFAULT_SHED_BACKLOG = 50
+DEFAULT_WARN_INTERVAL = 60
+PRUNE_INTERVAL = 1000
+
+
+class TokenBucket:
+    """Refills tokens at a steady rate up to a burst capacity"""
+
+    def __init__(self, rate, capacity, now):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = self.capacity
+        self.updated = now
+
+    def refill(self, now):
+        """
+        Adds the tokens earned since the last refill
+
+        @param now - current monotonic time
+        @return - tokens available
+        """
+        self.tokens = min(self.capacity,
+                          self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return self.tokens
+
+    def consume(self, now, amount=1):
+        """
+        Takes tokens from the bucket if there are enough left
+
+        @param now - current monotonic time
+        @param amount - number of tokens to take
+        @return - True if the tokens were taken
+        """
+        if self.refill(now) < amount:
+            return False
+        self.tokens -= amount
+        return True
+
+
+class RateLimiter:
+    """Limits commands per user, channel and server"""
+
+    def __init__(self, limits=None, shed_backlog=DEFAULT_SHED_BACKLOG,
+                 warn_interval=DEFAULT_WARN_INTERVAL, clock=time.monotonic):
+        """
+        @param limits - rate (tokens per second) and burst of each scope,
+                        any scope or key left out uses its default
+        @param shed_backlog - low priority commands are dropped while the
+                              backlog is larger than this
+        @param warn_interval - least seconds between two warnings to the
+                               same user that a command was dropped
+        @param clock - monotonic clock
+        """
+        self.limits = {scope: dict(limit) for scope, limit in DEFAULT_LIMITS.items()}
+        if limits:
+            for scope, limit in limits.items():
+                self.limits[scope] = dict(DEFAULT_LIMITS.get(scope, {}), **limit)
+        self.shed_backlog = shed_backlog
+        self.clock = clock
+        self.warn_interval = warn_interval
+        self.buckets = {scope: {} for scope in self.limits}
+        self.warned = {}  # user id -> time of the last warning
+        self.checks = 0
+
+    def _get_keys(self, message):
+        """
+        Returns the bucket key of each scope the message belongs to
+        """
+        keys = {"user": message.author.id,
+                "channel": message.channel.id}
+        if message.server is not None:
+            keys["server"] = message.server.id
+        return keys
+
+    def _prune(self, now):
+        """
+        Drops buckets that refilled completely, since they hold no state
+        """
+        for buckets in self.buckets.values():
+            full = [key for key, bucket in buckets.items()
+                    if bucket.refill(now) >= bucket.capacity]
+            for key in full:
+                del buckets[key]
+        expired = [user for user, warned_at in self.warned.items()
+                   if now - warned_at >= self.warn_interval]
+        for user in expired:
+            del self.warned[user]
+
+    def allow(self, message):
+        """
+        Checks if the author, channel and server of the message still
+        have tokens to spend. Tokens are only spent when all of them do.
+
+        @param message - message invoking a command
+        @return - True if the command may run
+        """
+        now = self.clock()
+        self.checks += 1
+        if self.checks % PRUNE_INTERVAL == 0:
+            self._prune(now)
+        taken = []
+        for scope, key in self._get_keys(message).items():
+            buckets = self.buckets[scope]
+            bucket = buckets.get(key)
+            if bucket is None:
+                limit = self.limits[scope]
+                bucket = buckets[key] = TokenBucket(limit["rate"],
+                                                    limit["burst"],
+                                                    now)
+            if bucket.refill(now) < 1:
+                metrics.incr("ratelimit.rejected.{}".format(scope))
+                return False
+            taken.append(bucket)
+        for bucket in taken:
+            bucket.tokens -= 1
+        return True
+
+    def should_shed(self, backlog):
+        """
+        Checks if low priority commands should be dropped
+
+        @param backlog - amount of work waiting to be done
+        @return - True if the backlog is larger than shed_backlog
+        """
+        if backlog > self.shed_backlog:
+            metrics.incr("ratelimit.shed")
+            return True
+        return False
+
+    def should_warn(self, message):
+        """
+        Checks if the author of a dropped command should be told, which
+        happens at most once every warn_interval so the warnings don't
+        add to the load that got the command dropped
+
+        @param message - message of the dropped command
+        @return - True if the author should be warned
+        """
+        now = self.clock()
+        user = message.author.id
+        warned_at = self.warned.get(user)
+        if warned_at is not None and now - warned_at < self.warn_interval:
+            return False
+        self.warned[user] = now
+        return True
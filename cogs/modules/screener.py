@@ -0,0 +1,154 @@
+from bot_metrics import metrics
+from collections import OrderedDict
+from itertools import compress, repeat
+import heapq
+import operator
+
+
+# screener names of the MarketTable columns that can be filtered on
+FIELDS = {
+    "rank": "cmc_rank",
+    "price": "price",
+    "volume": "volume_24h",
+    "mcap": "market_cap",
+    "change1h": "percent_change_1h",
+    "change24h": "percent_change_24h",
+    "change7d": "percent_change_7d",
+    "supply": "circulating_supply",
+}
+# longest operators first, so '>=' isn't read as '>'
+OPERATORS = [(">=", operator.ge), ("<=", operator.le), ("!=", operator.ne),
+             (">", operator.gt), ("<", operator.lt), ("=", operator.eq)]
+ASCENDING_FIELDS = {"cmc_rank"}
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+MAX_CACHED_QUERIES = 256
+
+
+class ScreenerException(Exception):
+    """Handles screener query related errors"""
+
+
+class Screener:
+    """
+    Filters and sorts the whole market with queries such as
+    'change24h>10 volume>5e7 rank<300 sort=volume limit=10'.
+
+    Filters compare whole columns of the MarketTable at once, so the
+    per coin work happens in C rather than in a Python loop over the
+    market. Parsed queries are kept by query string and results are
+    kept until the market list is refreshed.
+    """
+
+    def __init__(self):
+        self.queries = OrderedDict()
+        self.results = {}
+        self.market_list = None
+
+    def parse(self, query):
+        """
+        Parses a screener query
+
+        @param query - space separated filters and options
+        @return - (filters, sort field, descending, limit, fiat), where
+                  filters is a tuple of (field, operator, value)
+        """
+        parsed = self.queries.get(query)
+        if parsed is not None:
+            self.queries.move_to_end(query)
+            return parsed
+        filters = []
+        sort_field = None
+        reverse = False
+        limit = DEFAULT_LIMIT
+        fiat = "USD"
+        for term in query.split():
+            key, separator, value = term.partition("=")
+            key = key.lower()
+            if separator and key == "sort":
+                reverse = value.startswith("-")
+                sort_field = self._field(value.lstrip("-"))
+            elif separator and key == "limit":
+                if not value.isdigit() or not 0 < int(value) <= MAX_LIMIT:
+                    raise ScreenerException("Limit has to be between 1 and "
+                                            "{}.".format(MAX_LIMIT))
+                limit = int(value)
+            elif separator and key == "fiat":
+                fiat = value.upper()
+            else:
+                filters.append(self._parse_filter(term))
+        if not filters and sort_field is None:
+            raise ScreenerException("Enter at least one filter, i.e. "
+                                    "`change24h>10`.")
+        if sort_field is None:
+            sort_field = filters[0][0]
+        # largest first, except for rank
+        descending = (sort_field not in ASCENDING_FIELDS) != reverse
+        parsed = (tuple(filters), sort_field, descending, limit, fiat)
+        self.queries[query] = parsed
+        if len(self.queries) > MAX_CACHED_QUERIES:
+            self.queries.popitem(last=False)
+        return parsed
+
+    def _field(self, name):
+        field = FIELDS.get(name.lower())
+        if field is None:
+            raise ScreenerException("Unknown field `{}`. Fields are: {}"
+                                    "".format(name, ", ".join(FIELDS)))
+        return field
+
+    def _parse_filter(self, term):
+        """
+        Parses a filter such as 'volume>5e7'
+
+        @param term - field, operator and value
+        @return - (field, operator, value)
+        """
+        for symbol, compare in OPERATORS:
+            name, found, value = term.partition(symbol)
+            if found:
+                try:
+                    number = float(value)
+                except ValueError:
+                    raise ScreenerException("Invalid value in `{}`."
+                                            "".format(term))
+                return self._field(name), compare, number
+        raise ScreenerException("Invalid filter `{}`.".format(term))
+
+    def screen(self, market_list, query):
+        """
+        Returns the coins that pass every filter of a query, sorted
+
+        @param market_list - MarketTable to screen
+        @param query - screener query
+        @return - (list of currencies, fiat)
+        """
+        parsed = self.parse(query)
+        if market_list is not self.market_list:
+            self.market_list = market_list
+            self.results.clear()
+        result = self.results.get(parsed)
+        if result is not None:
+            metrics.incr("screener.cached")
+            return result, parsed[4]
+        filters, sort_field, descending, limit, fiat = parsed
+        with metrics.timer("screener.query"):
+            sort_column = market_list.column(sort_field)
+            # NaN never equals itself, which drops coins missing the
+            # sort field
+            mask = map(operator.eq, sort_column, sort_column)
+            for field, compare, value in filters:
+                column = market_list.column(field)
+                mask = map(operator.and_,
+                           mask,
+                           map(compare, column, repeat(value)))
+                if compare is operator.ne:
+                    # the one comparison NaN passes
+                    mask = map(operator.and_, mask, map(operator.eq, column, column))
+            matches = compress(range(len(sort_column)), mask)
+            pick = heapq.nlargest if descending else heapq.nsmallest
+            rows = pick(limit, matches, key=sort_column.__getitem__)
+            slugs = market_list.column('slug')
+            result = [slugs[row] for row in rows]
+        self.results[parsed] = result
+        return result, fiat
@@ -1,21 +1,28 @@
 from bot_logger import logger
+from bot_metrics import metrics
+from cogs.modules.anomaly_scanner import PRICE_SPIKE
 from cogs.modules.coin_market import CoinMarketException, CurrencyException, FiatException
+from cogs.modules.outbound_scheduler import ALERT, BULK, INTERACTIVE
 from collections import defaultdict
 from discord.errors import Forbidden
+import asyncio
 import discord
 import json
+import math
 
 
 CMB_ADMIN = "CMB ADMIN"
 ADMIN_ONLY = "ADMIN_ONLY"
 SUBSCRIBER_DISABLED = "SUBSCRIBER_DISABLED"
+MAX_ANOMALY_DISPLAY = 10
 
 
 class SubscriberFunctionality:
     """Handles Subscriber command Functionality"""
 
-    def __init__(self, bot, coin_market, sub_capacity, server_data):
+    def __init__(self, bot, coin_market, sub_capacity, server_data, outbound):
         self.bot = bot
+        self.outbound = outbound
         self.server_data = server_data
         self.coin_market = coin_market
         self.sub_capacity = int(sub_capacity)
@@ -39,6 +46,17 @@ class SubscriberFunctionality:
             self.acronym_list = acronym_list
             self.cache_data.clear()
 
+    def get_watched_currencies(self):
+        """
+        Returns the currencies subscribed to by any channel
+
+        @return - set of currencies
+        """
+        watched = set()
+        for channel_settings in self.subscriber_data.values():
+            watched.update(channel_settings["currencies"])
+        return watched
+
     def _check_permission(self, ctx):
         """
         Checks if user contains the correct permissions to use these
@@ -84,25 +102,18 @@ class SubscriberFunctionality:
                       outfile,
                       indent=4)
 
-    async def _say_msg(self, msg=None, channel=None, emb=None):
+    async def _say_msg(self, msg=None, channel=None, emb=None, priority=INTERACTIVE):
         """
         Bot will say msg if given correct permissions
 
         @param msg - msg to say
         @param channel - channel to send msg to
         @param emb - embedded msg to say
+        @param priority - outbound priority of the msg
+        @return - the sent msg
         """
         try:
-            if channel:
-                if emb:
-                    await self.bot.send_message(channel, embed=emb)
-                else:
-                    await self.bot.send_message(channel, msg)
-            else:
-                if emb:
-                    await self.bot.say(embed=emb)
-                else:
-                    await self.bot.say(msg)
+            return await self.outbound.send(channel, msg, emb, priority)
         except Exception as e:
             pass
 
@@ -161,6 +172,12 @@ class SubscriberFunctionality:
                                                   limit=10)
                     except Exception as e:
                         pass
+                if channel_settings.get("compact", False):
+                    return (self.coin_market.get_compact_table(self.market_list,
+                                                               None,
+                                                               channel_settings["currencies"],
+                                                               channel_settings["fiat"]),
+                            self.cache_data)
                 return self.coin_market.get_current_multiple_currency(self.market_list,
                                                                       None,
                                                                       channel_settings["currencies"],
@@ -176,6 +193,8 @@ class SubscriberFunctionality:
         try:
             self._check_invalid_sub_currencies()
             subscriber_list = self.subscriber_data.copy()
+            pending = []
+            sent_bytes = 0
             for channel in subscriber_list:
                 first_post = True
                 if channel not in self.cache_channel:
@@ -193,6 +212,11 @@ class SubscriberFunctionality:
                 else:
                     data = None
                 if data:
+                    mode = "compact" if channel_settings.get("compact", False) else "full"
+                    metrics.incr("live_updates.{}.messages".format(mode), len(data))
+                    data_bytes = sum(len(msg.encode()) for msg in data)
+                    metrics.incr("live_updates.{}.bytes".format(mode), data_bytes)
+                    sent_bytes += data_bytes
                     for msg in data:
                         if first_post:
                             em = discord.Embed(title="Live Currency Update",
@@ -202,8 +226,12 @@ class SubscriberFunctionality:
                         else:
                             em = discord.Embed(description=msg,
                                                colour=0xFF9900)
-                        await self._say_msg(channel=channel_obj,
-                                            emb=em)
+                        pending.append(self.outbound.submit(channel_obj,
+                                                            embed=em,
+                                                            priority=BULK))
+            metrics.set_gauge("live_updates.last_messages", len(pending))
+            metrics.set_gauge("live_updates.last_bytes", sent_bytes)
+            await asyncio.gather(*pending, return_exceptions=True)
         except CurrencyException as e:
             print("An error has occured. See error.log.")
             logger.error("CurrencyException: {}".format(str(e)))
@@ -217,6 +245,73 @@ class SubscriberFunctionality:
             print("An error has occured. See error.log.")
             logger.error("Exception: {}".format(str(e)))
 
+    def _format_anomalies(self, anomalies):
+        """
+        Formats the anomalies found, best ranked coins first
+
+        @param anomalies - anomalies found by the AnomalyScanner
+        @return - message listing the anomalies
+        """
+        lines = []
+        # merged hot refreshes can leave the table out of rank order
+        ranks = self.market_list.column('cmc_rank')
+
+        def rank(anomaly):
+            value = ranks[self.market_list.index[anomaly[1]]]
+            return math.inf if math.isnan(value) else value
+
+        ranked = sorted((anomaly for anomaly in anomalies
+                         if anomaly[1] in self.market_list),
+                        key=rank)
+        for kind, currency, score, value in ranked[:MAX_ANOMALY_DISPLAY]:
+            data = self.market_list[currency]
+            name = "**{} ({})**".format(data["name"], data["symbol"])
+            if kind == PRICE_SPIKE:
+                lines.append("{} price {} **{:.2f}%** since the last update "
+                             "({:.1f}x its usual move)".format(name,
+                                                                "up" if value > 0 else "down",
+                                                                abs(value),
+                                                                abs(score)))
+            else:
+                lines.append("{} 24h volume at **{:.1f}x** its recent "
+                             "average".format(name, score))
+        if len(ranked) > MAX_ANOMALY_DISPLAY:
+            lines.append("and {} more".format(len(ranked) - MAX_ANOMALY_DISPLAY))
+        return "\n".join(lines)
+
+    async def display_anomalies(self, anomalies):
+        """
+        Posts the unusual market moves to every channel that turned on
+        anomaly alerts
+
+        @param anomalies - anomalies found by the AnomalyScanner
+        """
+        try:
+            if not anomalies:
+                return
+            msg = self._format_anomalies(anomalies)
+            if not msg:
+                return
+            em = discord.Embed(title="Unusual Market Moves",
+                               description=msg,
+                               colour=0xFF9900)
+            pending = []
+            for channel, channel_settings in self.subscriber_data.items():
+                if not channel_settings.get("anomalies", False):
+                    continue
+                if channel not in self.cache_channel:
+                    self.cache_channel[channel] = self.bot.get_channel(channel)
+                channel_obj = self.cache_channel[channel]
+                if channel_obj is None:
+                    continue
+                pending.append(self.outbound.submit(channel_obj,
+                                                    embed=em,
+                                                    priority=ALERT))
+            await asyncio.gather(*pending, return_exceptions=True)
+        except Exception as e:
+            print("An error has occured. See error.log.")
+            logger.error("Exception: {}".format(str(e)))
+
     async def add_subscriber(self, ctx, fiat):
         """
         Adds channel to the live update subscriber list in subscribers.json
@@ -308,6 +403,58 @@ class SubscriberFunctionality:
             await self._say_msg("Failed to set purge mode. Please make sure this"
                                 " channel is within a valid server.")
 
+    async def toggle_anomalies(self, ctx):
+        """
+        Turns anomaly alerts on/off for the channel
+        """
+        try:
+            if not self._check_permission(ctx):
+                return
+            channel = ctx.message.channel.id
+            subscriber_list = self.subscriber_data
+            self.bot.get_channel(channel).server  # validate channel
+            if channel not in subscriber_list:
+                await self._say_msg("Channel was never subscribed. Subscribe "
+                                    "with `$sub` first.")
+                return
+            channel_settings = subscriber_list[channel]
+            channel_settings["anomalies"] = not channel_settings.get("anomalies", False)
+            self._save_subscriber_file(self.subscriber_data)
+            if channel_settings["anomalies"]:
+                await self._say_msg("Anomaly alerts on. Bot will now post when "
+                                    "any coin's price or volume moves unusually.")
+            else:
+                await self._say_msg("Anomaly alerts off.")
+        except Exception as e:
+            await self._say_msg("Failed to set anomaly alerts. Please make sure "
+                                "this channel is within a valid server.")
+
+    async def toggle_compact(self, ctx):
+        """
+        Turns the compact table on/off for the channel's live updates
+        """
+        try:
+            if not self._check_permission(ctx):
+                return
+            channel = ctx.message.channel.id
+            subscriber_list = self.subscriber_data
+            self.bot.get_channel(channel).server  # validate channel
+            if channel not in subscriber_list:
+                await self._say_msg("Channel was never subscribed. Subscribe "
+                                    "with `$sub` first.")
+                return
+            channel_settings = subscriber_list[channel]
+            channel_settings["compact"] = not channel_settings.get("compact", False)
+            self._save_subscriber_file(self.subscriber_data)
+            if channel_settings["compact"]:
+                await self._say_msg("Compact mode on. Live updates will show "
+                                    "one line per coin.")
+            else:
+                await self._say_msg("Compact mode off.")
+        except Exception as e:
+            await self._say_msg("Failed to set compact mode. Please make sure "
+                                "this channel is within a valid server.")
+
     async def get_sub_currencies(self, ctx):
         """
         Displays the currencies the channel in context is subbed too
@@ -502,14 +649,20 @@ class SubscriberFunctionality:
                 return
             fiat = self.subscriber_data[channel]["fiat"]
             purge_mode = self.subscriber_data[channel]["purge"]
+            anomalies = self.subscriber_data[channel].get("anomalies", False)
+            compact = self.subscriber_data[channel].get("compact", False)
             num_currencies = len(self.subscriber_data[channel]["currencies"])
             msg = ("Fiat: **{}**\n"
                    "Purge Mode: **{}**\n"
+                   "Anomaly Alerts: **{}**\n"
+                   "Compact Mode: **{}**\n"
                    "Update interval: Every **{}** minutes\n"
                    "Number of currencies subscribed to: **{}**\n"
                    "To see what currencies are subscribed, type "
                    "`$getc`".format(fiat,
                                     purge_mode,
+                                    anomalies,
+                                    compact,
                                     interval,
                                     num_currencies))
             em = discord.Embed(title="Subscriber Settings",
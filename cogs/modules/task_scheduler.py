@@ -0,0 +1,187 @@
+from bot_logger import logger
+from bot_metrics import metrics
+import asyncio
+import random
+import time
+
+
+OVERLAP_SKIP = "skip"
+OVERLAP_ALLOW = "allow"
+MISSED_SKIP = "skip"
+MISSED_CATCH_UP = "catch_up"
+MAX_IDLE = 60
+
+
+class PeriodicJob:
+    """A named job the TaskScheduler runs on its own cadence"""
+
+    def __init__(self, name, func, interval=None, jitter=0, overlap=OVERLAP_SKIP,
+                 missed=MISSED_SKIP, align=False, run_immediately=False, follows=None):
+        """
+        @param name - name of the job, used for triggers and metrics
+        @param func - coroutine function to run; a run that returns
+                      False had nothing new, so the jobs following
+                      this one don't run after it
+        @param interval - seconds between runs, None to only run when
+                          triggered or after the job it follows
+        @param jitter - up to this many seconds are randomly added to
+                        each run, without shifting later runs
+        @param overlap - OVERLAP_SKIP to skip a run while the previous
+                         one is still going, OVERLAP_ALLOW to run anyway
+        @param missed - MISSED_SKIP to run once and drop the slots that
+                        passed while the bot was busy, MISSED_CATCH_UP
+                        to run every missed slot back to back (with
+                        OVERLAP_SKIP, runs that come while the job is
+                        going are queued behind it instead of skipped)
+        @param align - if True, runs land on wall clock multiples of the
+                       interval (i.e. at the top of the hour)
+        @param run_immediately - if True, the job also runs on start
+        @param follows - name of a job after which this job runs
+        """
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.overlap = overlap
+        self.missed = missed
+        self.align = align
+        self.run_immediately = run_immediately
+        self.follows = follows
+        self.slot = None
+        self.next_run = None
+        self.running = 0
+        self.queued_runs = 0
+        self.runs = 0
+        self.skipped_runs = 0
+        self.missed_runs = 0
+        self.last_duration = None
+
+
+class TaskScheduler:
+    """
+    Runs periodic jobs against a monotonic clock. Each run is scheduled
+    from the previous slot rather than from when the run finished, so
+    jobs don't drift when a run takes long.
+    """
+
+    def __init__(self, loop, clock=time.monotonic, wall_clock=time.time,
+                 sleep=asyncio.sleep, rand=random.random):
+        """
+        @param loop - event loop to run jobs on
+        @param clock - monotonic clock
+        @param wall_clock - wall clock, only used to align jobs
+        @param sleep - coroutine function used to wait
+        @param rand - random number generator used for jitter
+        """
+        self.loop = loop
+        self.clock = clock
+        self.wall_clock = wall_clock
+        self.sleep = sleep
+        self.rand = rand
+        self.jobs = {}
+        self.task = None
+
+    def add_job(self, job):
+        """
+        Adds a job to the scheduler
+
+        @param job - PeriodicJob to add
+        """
+        if job.name in self.jobs:
+            raise ValueError("Job already exists: {}".format(job.name))
+        self.jobs[job.name] = job
+        if job.interval:
+            now = self.clock()
+            if job.align:
+                job.slot = now + job.interval - self.wall_clock() % job.interval
+            else:
+                job.slot = now + job.interval
+            self._set_next_run(job)
+
+    def start(self):
+        """
+        Starts running jobs on the event loop
+        """
+        if self.task is None:
+            for job in self.jobs.values():
+                if job.run_immediately:
+                    self._start(job)
+            self.task = self.loop.create_task(self._run())
+
+    def trigger(self, name):
+        """
+        Runs a job now, outside of its cadence
+
+        @param name - name of the job to run
+        @return - True if the job was started
+        """
+        return self._start(self.jobs[name])
+
+    def _set_next_run(self, job):
+        job.next_run = job.slot
+        if job.jitter:
+            job.next_run += self.rand() * job.jitter
+
+    def _start(self, job):
+        if job.running and job.overlap == OVERLAP_SKIP:
+            if job.missed == MISSED_CATCH_UP:
+                job.queued_runs += 1
+                return True
+            job.skipped_runs += 1
+            metrics.incr("jobs.{}.skipped".format(job.name))
+            return False
+        job.running += 1
+        self.loop.create_task(self._execute(job))
+        return True
+
+    async def _execute(self, job):
+        start = self.clock()
+        succeeded = False
+        try:
+            if await job.func() is False:
+                metrics.incr("jobs.{}.unchanged".format(job.name))
+            else:
+                succeeded = True
+        except Exception as e:
+            metrics.incr("jobs.{}.errors".format(job.name))
+            logger.error("Job '{}' failed: {}".format(job.name, str(e)))
+        finally:
+            job.running -= 1
+            job.runs += 1
+            job.last_duration = self.clock() - start
+            metrics.observe("jobs.{}".format(job.name), job.last_duration)
+        if succeeded:
+            for follower in self.jobs.values():
+                if follower.follows == job.name:
+                    self._start(follower)
+        if job.queued_runs and not job.running:
+            job.queued_runs -= 1
+            self._start(job)
+
+    def _run_due(self, now):
+        """
+        Starts every job that is due and schedules its next slot
+
+        @return - time of the next run
+        """
+        next_wake = now + MAX_IDLE
+        for job in list(self.jobs.values()):
+            if job.next_run is None:
+                continue
+            if job.next_run <= now:
+                self._start(job)
+                job.slot += job.interval
+                if job.slot <= now and job.missed == MISSED_SKIP:
+                    missed = int((now - job.slot) // job.interval) + 1
+                    job.missed_runs += missed
+                    metrics.incr("jobs.{}.missed".format(job.name), missed)
+                    job.slot += missed * job.interval
+                self._set_next_run(job)
+            next_wake = min(next_wake, job.next_run)
+        return next_wake
+
+    async def _run(self):
+        while True:
+            now = self.clock()
+            next_wake = self._run_due(now)
+            await self.sleep(max(0, next_wake - self.clock()))
@@ -0,0 +1,405 @@
+from bot_logger import logger
+from bot_metrics import metrics
+from cogs.modules.coin_market import CurrencyException, FiatException, SMALL_GREEN_TRIANGLE, SMALL_RED_TRIANGLE
+from cogs.modules.outbound_scheduler import BULK, INTERACTIVE
+from collections import defaultdict
+from discord.errors import Forbidden
+import asyncio
+import discord
+import json
+
+
+CMB_ADMIN = "CMB ADMIN"
+ADMIN_ONLY = "ADMIN_ONLY"
+CMC_DISABLED = "CMC_DISABLED"
+DIGEST_INTERVALS = {"1h": 1, "2h": 2, "3h": 3, "6h": 6, "12h": 12, "24h": 24}
+
+
+class WatchlistFunctionality:
+    """Handles Watchlist command functionality"""
+
+    def __init__(self, bot, coin_market, watch_capacity, server_data, outbound, digest_concurrency=5):
+        self.bot = bot
+        self.outbound = outbound
+        self.server_data = server_data
+        self.coin_market = coin_market
+        self.watch_capacity = int(watch_capacity)
+        self.digest_concurrency = max(1, int(digest_concurrency))
+        self.digest_hours = {}  # interval -> hour its digests were last checked
+        self.market_list = ""
+        self.acronym_list = ""
+        self.cache_data = {}
+        self.watchlist_data = self._check_watchlist_file()
+        self._save_watchlist_file(self.watchlist_data, backup=True)
+
+    def update(self, market_list=None, acronym_list=None, server_data=None):
+        """
+        Updates utilities with new coin market and server data
+        """
+        if server_data:
+            self.server_data = server_data
+        if market_list:
+            self.market_list = market_list
+            self.cache_data.clear()
+        if acronym_list:
+            self.acronym_list = acronym_list
+
+    def _check_permission(self, ctx):
+        """
+        Checks if user contains the correct permissions to use these
+        commands
+        """
+        try:
+            user_roles = ctx.message.author.roles
+            server_id = ctx.message.server.id
+            if server_id not in self.server_data:
+                return True
+            elif (ADMIN_ONLY in self.server_data[server_id]
+                  or CMC_DISABLED in self.server_data[server_id]):
+                if CMB_ADMIN not in [role.name for role in user_roles]:
+                    return False
+            return True
+        except Exception:
+            return True
+
+    def _check_watchlist_file(self):
+        """
+        Checks to see if there's a valid watchlists.json file
+        """
+        try:
+            with open('watchlists.json') as watchlists:
+                return json.load(watchlists)
+        except FileNotFoundError:
+            self._save_watchlist_file()
+            return json.loads('{}')
+        except Exception as e:
+            print("An error has occured. See error.log.")
+            logger.error("Exception: {}".format(str(e)))
+
+    def _save_watchlist_file(self, watchlist_data={}, backup=False):
+        """
+        Saves watchlists.json file
+        """
+        if backup:
+            watchlist_filename = "watchlists_backup.json"
+        else:
+            watchlist_filename = "watchlists.json"
+        with open(watchlist_filename, 'w') as outfile:
+            json.dump(watchlist_data,
+                      outfile,
+                      indent=4)
+
+    async def _say_msg(self, msg=None, channel=None, emb=None, priority=INTERACTIVE):
+        """
+        Bot will say msg if given correct permissions
+
+        @param msg - msg to say
+        @param channel - channel to send msg to
+        @param emb - embedded msg to say
+        @param priority - outbound priority of the msg
+        @return - the sent msg
+        """
+        try:
+            return await self.outbound.send(channel, msg, emb, priority)
+        except Exception:
+            pass
+
+    def _format_coin(self, currency, fiat):
+        """
+        Formats one line of a watchlist
+
+        @param currency - cryptocurrency to format
+        @param fiat - desired fiat currency (i.e. 'EUR', 'USD')
+        @return - formatted line
+        """
+        data = self.market_list[currency]
+        quote = data['quote']['USD']
+        if quote['price'] is None:
+            price = "Unknown"
+        else:
+            price = self.coin_market.format_price(quote['price'], fiat)
+        if quote['percent_change_24h'] is None:
+            change = "Unknown"
+        elif quote['percent_change_24h'] >= 0:
+            change = "{} **{:.2f}%**".format(SMALL_GREEN_TRIANGLE,
+                                              quote['percent_change_24h'])
+        else:
+            change = "{} **{:.2f}%**".format(SMALL_RED_TRIANGLE,
+                                              quote['percent_change_24h'])
+        return "#{} **{} ({})**: **{}** {} (24H)".format(data['cmc_rank'],
+                                                         data['name'],
+                                                         data['symbol'],
+                                                         price,
+                                                         change)
+
+    def _render_watchlist(self, currencies, fiat):
+        """
+        Renders a watchlist from per coin lines that are cached per fiat
+        until the next market refresh, so coins watched by many users
+        are only formatted once
+
+        @param currencies - cryptocurrencies of the watchlist
+        @param fiat - desired fiat currency (i.e. 'EUR', 'USD')
+        @return - list of msgs
+        """
+        if fiat not in self.cache_data:
+            self.cache_data[fiat] = {}
+        cached_lines = self.cache_data[fiat]
+        formatted_data = []
+        result_msg = ""
+        for currency in currencies:
+            line = cached_lines.get(currency)
+            if line is None:
+                if currency in self.market_list:
+                    line = self._format_coin(currency, fiat)
+                else:
+                    line = "**{}** is no longer listed".format(currency.title())
+                cached_lines[currency] = line
+                metrics.incr("watchlist.formatted_lines")
+            if len(result_msg) + len(line) + 1 < 2000:
+                result_msg += "{}\n".format(line)
+            else:
+                formatted_data.append(result_msg)
+                result_msg = "{}\n".format(line)
+        formatted_data.append(result_msg)
+        return formatted_data
+
+    def _find_currency(self, currency):
+        """
+        Resolves an acronym to its currency and checks it exists
+
+        @param currency - cryptocurrency or its acronym
+        @return - cryptocurrency
+        """
+        if currency.upper() in self.acronym_list:
+            currency = self.acronym_list[currency.upper()]
+            if "Duplicate" in currency:
+                raise CurrencyException(currency)
+        if currency not in self.market_list:
+            raise CurrencyException("Currency is invalid: ``{}``".format(currency))
+        return currency
+
+    async def add_currencies(self, ctx, currencies):
+        """
+        Adds currencies to the user's watchlist
+
+        @param ctx - context of the command sent
+        @param currencies - cryptocurrencies to watch
+        """
+        try:
+            if not self._check_permission(ctx):
+                return
+            if not currencies:
+                await self._say_msg("No coins were entered.")
+                return
+            user_id = ctx.message.author.id
+            if user_id not in self.watchlist_data:
+                self.watchlist_data[user_id] = {"currencies": [],
+                                                "fiat": "USD",
+                                                "digest": None}
+            watchlist = self.watchlist_data[user_id]["currencies"]
+            added = []
+            for currency in currencies:
+                currency = self._find_currency(currency)
+                if currency in watchlist or currency in added:
+                    continue
+                if len(watchlist) + len(added) >= self.watch_capacity:
+                    await self._say_msg("Watchlist capacity of **{}** coins has "
+                                        "been reached.".format(self.watch_capacity))
+                    break
+                added.append(currency)
+            if added:
+                watchlist.extend(added)
+                self._save_watchlist_file(self.watchlist_data)
+                await self._say_msg("Now watching **{}**.".format(
+                    "**, **".join(currency.title() for currency in added)))
+            else:
+                await self._say_msg("Already watching these coins.")
+        except CurrencyException as e:
+            logger.error("CurrencyException: {}".format(str(e)))
+            await self._say_msg(str(e))
+        except Exception as e:
+            print("Failed to add to watchlist. See error.log.")
+            logger.error("Exception: {}".format(str(e)))
+
+    async def remove_currency(self, ctx, currency):
+        """
+        Removes a currency from the user's watchlist
+
+        @param ctx - context of the command sent
+        @param currency - cryptocurrency to stop watching
+        """
+        try:
+            if not self._check_permission(ctx):
+                return
+            user_id = ctx.message.author.id
+            if currency.upper() in self.acronym_list:
+                currency = self.acronym_list[currency.upper()]
+            if (user_id not in self.watchlist_data
+                    or currency not in self.watchlist_data[user_id]["currencies"]):
+                await self._say_msg("**{}** is not on your watchlist."
+                                    "".format(currency.title()))
+                return
+            self.watchlist_data[user_id]["currencies"].remove(currency)
+            self._save_watchlist_file(self.watchlist_data)
+            await self._say_msg("Stopped watching **{}**.".format(currency.title()))
+        except Forbidden:
+            pass
+        except Exception as e:
+            print("Failed to remove from watchlist. See error.log.")
+            logger.error("Exception: {}".format(str(e)))
+
+    async def display_watchlist(self, ctx, fiat):
+        """
+        Displays the user's watchlist
+
+        @param ctx - context of the command sent
+        @param fiat - desired fiat currency, the user's digest fiat if
+                      None
+        """
+        try:
+            if not self._check_permission(ctx):
+                return
+            user_id = ctx.message.author.id
+            if (user_id not in self.watchlist_data
+                    or not self.watchlist_data[user_id]["currencies"]):
+                await self._say_msg("Your watchlist is empty. Add coins with "
+                                    "`$watch`.")
+                return
+            settings = self.watchlist_data[user_id]
+            if fiat is None:
+                fiat = settings["fiat"]
+            ucase_fiat = self.coin_market.fiat_check(fiat)
+            first_post = True
+            for msg in self._render_watchlist(settings["currencies"], ucase_fiat):
+                if first_post:
+                    em = discord.Embed(title="Watchlist",
+                                       description=msg,
+                                       colour=0xFF9900)
+                    first_post = False
+                else:
+                    em = discord.Embed(description=msg,
+                                       colour=0xFF9900)
+                await self._say_msg(emb=em)
+        except Forbidden:
+            pass
+        except FiatException as e:
+            logger.error("FiatException: {}".format(str(e)))
+            await self._say_msg(str(e))
+        except Exception as e:
+            print("Failed to display watchlist. See error.log.")
+            logger.error("Exception: {}".format(str(e)))
+
+    async def set_digest(self, ctx, interval, fiat):
+        """
+        Sets how often the user gets the watchlist as a direct message
+
+        @param ctx - context of the command sent
+        @param interval - one of DIGEST_INTERVALS or 'off'
+        @param fiat - desired fiat currency (i.e. 'EUR', 'USD')
+        """
+        try:
+            if not self._check_permission(ctx):
+                return
+            user_id = ctx.message.author.id
+            if user_id not in self.watchlist_data:
+                await self._say_msg("Your watchlist is empty. Add coins with "
+                                    "`$watch`.")
+                return
+            interval = interval.lower()
+            if interval != "off" and interval not in DIGEST_INTERVALS:
+                await self._say_msg("Please enter a valid interval: {} or **off**"
+                                    "".format(", ".join("**{}**".format(rate)
+                                                        for rate in DIGEST_INTERVALS)))
+                return
+            settings = self.watchlist_data[user_id]
+            settings["fiat"] = self.coin_market.fiat_check(fiat)
+            if interval == "off":
+                settings["digest"] = None
+                msg = "Watchlist digests turned off."
+            else:
+                settings["digest"] = interval
+                msg = ("Your watchlist will be sent to you every **{}** in "
+                       "**{}**.".format(interval, settings["fiat"]))
+            self._save_watchlist_file(self.watchlist_data)
+            await self._say_msg(msg)
+        except FiatException as e:
+            logger.error("FiatException: {}".format(str(e)))
+            await self._say_msg(str(e))
+        except Exception as e:
+            print("Failed to set watchlist digest. See error.log.")
+            logger.error("Exception: {}".format(str(e)))
+
+    async def _send_digest(self, semaphore, user_id, embeds):
+        """
+        Direct messages a digest to a user
+
+        @param semaphore - bounds the digests being sent at once
+        @param user_id - user to send to
+        @param embeds - embedded msgs of the digest
+        """
+        async with semaphore:
+            try:
+                user = await self.bot.get_user_info(user_id)
+                for em in embeds:
+                    await self.outbound.send(user, embed=em, priority=BULK)
+                metrics.incr("watchlist.digests_sent")
+            except Exception as e:
+                logger.error("Failed to send watchlist digest: {}".format(str(e)))
+
+    def _due_intervals(self, hour):
+        """
+        Returns the digest intervals with a digest hour since the last
+        check, so a digest hour without a market refresh is sent late
+        rather than skipped. Nothing is due on the first check.
+
+        @param hour - hours since year 1 of the local clock
+        @return - set of intervals
+        """
+        due = set()
+        for interval, hours in DIGEST_INTERVALS.items():
+            last = self.digest_hours.get(interval)
+            if last is not None and hour // hours > last // hours:
+                due.add(interval)
+                if hour % hours:
+                    metrics.incr("watchlist.late_digests")
+            self.digest_hours[interval] = hour
+        return due
+
+    async def send_digests(self, hour):
+        """
+        Sends the watchlist digests that came due since the last call.
+        Users with the same watchlist and fiat share one rendered digest.
+
+        @param hour - hours since year 1 of the local clock
+        """
+        try:
+            due = self._due_intervals(hour)
+            if not due:
+                return
+            recipients = defaultdict(list)
+            for user_id, settings in self.watchlist_data.items():
+                interval = settings.get("digest")
+                if not interval or not settings["currencies"]:
+                    continue
+                if interval in due:
+                    key = (tuple(settings["currencies"]), settings["fiat"])
+                    recipients[key].append(user_id)
+            if not recipients:
+                return
+            semaphore = asyncio.Semaphore(self.digest_concurrency)
+            pending = []
+            for (currencies, fiat), users in recipients.items():
+                embeds = []
+                for msg in self._render_watchlist(currencies, fiat):
+                    title = "Watchlist Digest" if not embeds else discord.Embed.Empty
+                    embeds.append(discord.Embed(title=title,
+                                                description=msg,
+                                                colour=0xFF9900))
+                metrics.incr("watchlist.digests_rendered")
+                for user_id in users:
+                    pending.append(self._send_digest(semaphore, user_id, embeds))
+            await asyncio.gather(*pending, return_exceptions=True)
+        except Exception as e:
+            print("An error has occured. See error.log.")
+            logger.error("Exception: {}".format(str(e)))
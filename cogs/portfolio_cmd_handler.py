@@ -0,0 +1,50 @@
+from discord.ext import commands
+
+
+class PortfolioCommands:
+    """Handles commands for tracking portfolios of crypto holdings"""
+
+    def __init__(self, cmd_function):
+        self.cmd_function = cmd_function
+
+    @commands.command(name='addp', pass_context=True)
+    async def addp(self, ctx, currency: str, currency_amt: float, cost: float, fiat='USD'):
+        """
+        Adds a lot of coins bought at a price to the user's portfolio
+        An example for this command would be:
+        "$addp bitcoin 0.5 8000"
+
+        @param ctx - context of the command sent
+        @param currency - cryptocurrency that was bought
+        @param currency_amt - amount of currency coins
+        @param cost - the price of the cryptocurrency bought at the time
+        @param fiat - fiat the coins were bought with (i.e. 'EUR', 'USD')
+        """
+        await self.cmd_function.portfolio.add_lot(ctx, currency, currency_amt, cost, fiat)
+
+    @commands.command(name='remp', pass_context=True)
+    async def remp(self, ctx, currency: str, lot_num: str=None):
+        """
+        Removes a lot from the user's portfolio, or every lot of the
+        currency if no lot is given
+        Use $getp to see what lot numbers you can remove first.
+        An example for this command would be:
+        "$remp bitcoin 2"
+
+        @param ctx - context of the command sent
+        @param currency - cryptocurrency of the lot
+        @param lot_num - number of the lot to remove
+        """
+        await self.cmd_function.portfolio.remove_lot(ctx, currency, lot_num)
+
+    @commands.command(name='getp', pass_context=True)
+    async def getp(self, ctx, fiat='USD'):
+        """
+        Displays the user's portfolio with the profit of every holding
+        An example for this command would be:
+        "$getp"
+
+        @param ctx - context of the command sent
+        @param fiat - desired fiat currency (i.e. 'EUR', 'USD')
+        """
+        await self.cmd_function.portfolio.display_portfolio(ctx, fiat)
@@ -76,6 +76,29 @@ class SubscriberCommands:
         """
         await self.cmd_function.subscriber.toggle_purge(ctx)
 
+    @commands.command(name='anomalies', pass_context=True)
+    async def anomalies(self, ctx):
+        """
+        Enables the bot to post unusual price or volume moves of any
+        coin in the channel
+        An example for this command would be:
+        "$anomalies"
+
+        @param ctx - context of the command sent
+        """
+        await self.cmd_function.subscriber.toggle_anomalies(ctx)
+
+    @commands.command(name='compact', pass_context=True)
+    async def compact(self, ctx):
+        """
+        Shows live updates as a table with one line per coin
+        An example for this command would be:
+        "$compact"
+
+        @param ctx - context of the command sent
+        """
+        await self.cmd_function.subscriber.toggle_compact(ctx)
+
     @commands.command(name='interval', pass_context=True)
     async def interval(self, ctx, rate: str):
         """
@@ -0,0 +1,58 @@
+from discord.ext import commands
+
+
+class WatchlistCommands:
+    """Handles commands for personal watchlists of coins"""
+
+    def __init__(self, cmd_function):
+        self.cmd_function = cmd_function
+
+    @commands.command(name='watch', pass_context=True)
+    async def watch(self, ctx, *currencies):
+        """
+        Adds coins to the user's watchlist
+        An example for this command would be:
+        "$watch bitcoin eth ltc"
+
+        @param ctx - context of the command sent
+        @param currencies - cryptocurrencies to watch
+        """
+        await self.cmd_function.watchlist.add_currencies(ctx, currencies)
+
+    @commands.command(name='unwatch', pass_context=True)
+    async def unwatch(self, ctx, currency: str):
+        """
+        Removes a coin from the user's watchlist
+        An example for this command would be:
+        "$unwatch bitcoin"
+
+        @param ctx - context of the command sent
+        @param currency - cryptocurrency to stop watching
+        """
+        await self.cmd_function.watchlist.remove_currency(ctx, currency)
+
+    @commands.command(name='wl', pass_context=True)
+    async def wl(self, ctx, fiat: str=None):
+        """
+        Displays the user's watchlist
+        An example for this command would be:
+        "$wl eur"
+
+        @param ctx - context of the command sent
+        @param fiat - desired fiat currency (i.e. 'EUR', 'USD')
+        """
+        await self.cmd_function.watchlist.display_watchlist(ctx, fiat)
+
+    @commands.command(name='wldigest', pass_context=True)
+    async def wldigest(self, ctx, interval: str, fiat='USD'):
+        """
+        Direct messages the user's watchlist to them every interval
+        (1h, 2h, 3h, 6h, 12h or 24h), or turns it off with 'off'
+        An example for this command would be:
+        "$wldigest 6h"
+
+        @param ctx - context of the command sent
+        @param interval - how often to send the watchlist
+        @param fiat - desired fiat currency (i.e. 'EUR', 'USD')
+        """
+        await self.cmd_function.watchlist.set_digest(ctx, interval, fiat)
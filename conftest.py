@@ -0,0 +1 @@
+# Lets the tests under tests/ import the bot's modules from the repo root
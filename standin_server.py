@@ -0,0 +1,330 @@
+"""
+Local stand-in for the coinmarketcap and coinmarketcal APIs, used to
+run the bot without network access.
+
+Serves:
+    /v1/cryptocurrency/listings/latest
+    /v1/cryptocurrency/quotes/latest
+    /v1/global-metrics/quotes/latest
+    /oauth/v2/token
+    /v1/events
+
+Point the bot at it by adding the following to config.json:
+    "cmc_base_url": "http://127.0.0.1:8080/v1/",
+    "coinmarketcal_base_url": "http://127.0.0.1:8080/"
+
+Faults can be changed while it runs, i.e.:
+    curl "http://127.0.0.1:8080/__faults?latency=2&error_rate=0.3"
+"""
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, urlparse
+import argparse
+import datetime
+import json
+import random
+import threading
+import time
+
+
+KNOWN_COINS = [
+    ("Bitcoin", "BTC", "bitcoin", 8000.0, 21000000),
+    ("Ethereum", "ETH", "ethereum", 250.0, None),
+    ("XRP", "XRP", "ripple", 0.3, 100000000000),
+    ("Litecoin", "LTC", "litecoin", 60.0, 84000000),
+    ("Tether", "USDT", "tether", 1.0, None)
+]
+
+
+class StandInData:
+    """Holds the listings served by the stand-in"""
+
+    def __init__(self, size, seed=0, drift=0.0, fixture=None):
+        """
+        @param size - number of synthetic coins to list
+        @param seed - seed of the synthetic data
+        @param drift - standard deviation of the price change applied
+                       to every coin between listing requests
+        @param fixture - path to a recorded listings response to serve
+                         instead of synthetic data
+        """
+        self.random = random.Random(seed)
+        self.drift = drift
+        self.lock = threading.Lock()
+        if fixture:
+            with open(fixture) as recorded:
+                self.listings = json.load(recorded)["data"]
+        else:
+            self.listings = [self._make_coin(rank) for rank in range(1, size + 1)]
+
+    def _make_coin(self, rank):
+        if rank <= len(KNOWN_COINS):
+            name, symbol, slug, price, max_supply = KNOWN_COINS[rank - 1]
+        else:
+            name = "Coin {}".format(rank)
+            # a few symbols repeat, like they do on coinmarketcap
+            symbol = "C{}".format(rank % 9000)
+            slug = "coin-{}".format(rank)
+            price = 10 ** self.random.uniform(-6, 3)
+            max_supply = self.random.choice([None, 10 ** self.random.randint(6, 11)])
+        supply = 10 ** self.random.uniform(6, 11) / rank ** 0.5
+        if max_supply:
+            supply = min(supply, max_supply)
+        return {
+            "id": rank,
+            "name": name,
+            "symbol": symbol,
+            "slug": slug,
+            "cmc_rank": rank,
+            "num_market_pairs": self.random.randint(1, 500),
+            "circulating_supply": supply,
+            "total_supply": supply,
+            "max_supply": max_supply,
+            "last_updated": None,
+            "date_added": "2013-04-28T00:00:00.000Z",
+            "tags": [],
+            "platform": None,
+            "quote": {
+                "USD": {
+                    "price": price,
+                    "volume_24h": price * supply * self.random.uniform(0.001, 0.2),
+                    "percent_change_1h": round(self.random.gauss(0, 1), 8),
+                    "percent_change_24h": round(self.random.gauss(0, 5), 8),
+                    "percent_change_7d": round(self.random.gauss(0, 12), 8),
+                    "market_cap": price * supply,
+                    "last_updated": None
+                }
+            }
+        }
+
+    def _timestamp(self):
+        return datetime.datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+    def get_listings(self, start, limit):
+        """
+        Returns a listings response, moving prices first if drift is set
+        """
+        with self.lock:
+            now = self._timestamp()
+            for coin in self.listings:
+                quote = coin["quote"]["USD"]
+                if self.drift:
+                    change = self.random.gauss(0, self.drift)
+                    quote["price"] *= 1 + change
+                    quote["market_cap"] = quote["price"] * coin["circulating_supply"]
+                    quote["percent_change_1h"] = round(change * 100, 8)
+                coin["last_updated"] = quote["last_updated"] = now
+            data = self.listings[start - 1:start - 1 + limit]
+            return {"status": {"timestamp": now, "error_code": 0,
+                               "credit_count": 1 + len(data) // 200},
+                    "data": data}
+
+    def get_quotes(self, ids):
+        """
+        Returns a quotes response for the given ids
+        """
+        with self.lock:
+            by_id = {coin["id"]: coin for coin in self.listings}
+            data = {str(i): by_id[i] for i in ids if i in by_id}
+            return {"status": {"timestamp": self._timestamp(), "error_code": 0,
+                               "credit_count": 1 + len(data) // 100},
+                    "data": data}
+
+    def get_stats(self):
+        """
+        Returns a global metrics response
+        """
+        with self.lock:
+            total_market_cap = sum(coin["quote"]["USD"]["market_cap"] or 0
+                                   for coin in self.listings)
+            total_volume = sum(coin["quote"]["USD"]["volume_24h"] or 0
+                               for coin in self.listings)
+            return {"status": {"timestamp": self._timestamp(), "error_code": 0,
+                               "credit_count": 1},
+                    "data": {
+                        "btc_dominance": 55.5,
+                        "eth_dominance": 9.5,
+                        "active_cryptocurrencies": len(self.listings),
+                        "active_exchanges": 250,
+                        "last_updated": self._timestamp(),
+                        "quote": {"USD": {"total_market_cap": total_market_cap,
+                                          "total_volume_24h": total_volume,
+                                          "last_updated": self._timestamp()}}}}
+
+    def get_events(self, coin, page):
+        """
+        Returns a coinmarketcal events response
+        """
+        return [{
+            "title": "Stand-in event {}".format(page),
+            "coins": [coin],
+            "date_event": "2030-01-01T00:00:00+00:00",
+            "created_date": "2020-01-01T00:00:00+00:00",
+            "description": "Event served by the stand-in server.",
+            "proof": "http://127.0.0.1/proof.png",
+            "source": "http://127.0.0.1/",
+            "is_hot": page == 1,
+            "vote_count": 10,
+            "percentage": 90,
+            "twitter_account": None
+        }]
+
+
+class Faults:
+    """Failures the stand-in injects into its responses"""
+
+    def __init__(self, latency=0.0, error_rate=0.0, rate_limit_rate=0.0,
+                 malformed_rate=0.0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.malformed_rate = malformed_rate
+
+    def update(self, params):
+        for name in ("latency", "error_rate", "rate_limit_rate", "malformed_rate"):
+            if name in params:
+                setattr(self, name, float(params[name][0]))
+
+    def as_dict(self):
+        return {"latency": self.latency,
+                "error_rate": self.error_rate,
+                "rate_limit_rate": self.rate_limit_rate,
+                "malformed_rate": self.malformed_rate}
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Handles requests to the stand-in"""
+
+    data = None
+    faults = None
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _inject_fault(self):
+        """
+        Applies the configured faults
+
+        @return - True if an error response was sent
+        """
+        if self.faults.latency:
+            time.sleep(self.faults.latency)
+        roll = random.random()
+        if roll < self.faults.rate_limit_rate:
+            self._send_json(429,
+                            {"status": {"error_code": 1008,
+                                        "error_message": "You've exceeded your "
+                                                         "API Key's HTTP request "
+                                                         "rate limit."}},
+                            {"Retry-After": "60"})
+            return True
+        if roll < self.faults.rate_limit_rate + self.faults.error_rate:
+            self._send_json(500, {"status": {"error_code": 500,
+                                             "error_message": "Injected error"}})
+            return True
+        if roll < (self.faults.rate_limit_rate + self.faults.error_rate
+                   + self.faults.malformed_rate):
+            # a body cut off halfway, as sent by a dropped connection
+            body = b'{"status": {"error_code": 0}, "data": [{"id": 1, "na'
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return True
+        return False
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        if url.path == "/__faults":
+            self.faults.update(params)
+            self._send_json(200, self.faults.as_dict())
+            return
+        if self._inject_fault():
+            return
+        if url.path == "/v1/cryptocurrency/listings/latest":
+            start = int(params.get("start", ["1"])[0])
+            limit = int(params.get("limit", ["100"])[0])
+            self._send_json(200, self.data.get_listings(start, limit))
+        elif url.path == "/v1/cryptocurrency/quotes/latest":
+            ids = params.get("id", [""])[0]
+            self._send_json(200, self.data.get_quotes([int(i) for i in ids.split(",") if i]))
+        elif url.path == "/v1/global-metrics/quotes/latest":
+            self._send_json(200, self.data.get_stats())
+        elif url.path == "/oauth/v2/token":
+            self._send_json(200, {"access_token": "stand-in-token",
+                                  "expires_in": 3600})
+        elif url.path == "/v1/events":
+            coin = params.get("coins", [""])[0]
+            page = int(params.get("page", ["1"])[0])
+            self._send_json(200, self.data.get_events(coin, page))
+        else:
+            self._send_json(404, {"status": {"error_code": 404,
+                                             "error_message": "Not found"}})
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def make_server(host="127.0.0.1", port=8080, size=5000, seed=0, drift=0.0,
+                fixture=None, latency=0.0, error_rate=0.0, rate_limit_rate=0.0,
+                malformed_rate=0.0):
+    """
+    Creates the stand-in server, call serve_forever() on it to run it
+
+    @return - the server
+    """
+    handler = type("Handler", (StandInHandler,), {
+        "data": StandInData(size, seed, drift, fixture),
+        "faults": Faults(latency, error_rate, rate_limit_rate, malformed_rate)
+    })
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the "
+                                                 "coinmarketcap and "
+                                                 "coinmarketcal APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--size", type=int, default=5000,
+                        help="number of synthetic coins (i.e. 5000 to 20000)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--drift", type=float, default=0.0,
+                        help="std deviation of price moves between requests")
+    parser.add_argument("--fixture",
+                        help="recorded listings response to serve")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="seconds added to every response")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="fraction of requests answered with a 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0,
+                        help="fraction of requests answered with a 429")
+    parser.add_argument("--malformed-rate", type=float, default=0.0,
+                        help="fraction of requests answered with a cut off body")
+    args = parser.parse_args()
+    server = make_server(args.host, args.port, args.size, args.seed,
+                         args.drift, args.fixture, args.latency,
+                         args.error_rate, args.rate_limit_rate,
+                         args.malformed_rate)
+    print("Stand-in server running on http://{}:{}/".format(args.host, args.port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+from bot_metrics import metrics
+from cogs.modules.alert_functionality import AlertFunctionality
+from cogs.modules.market_table import MarketTable
+import asyncio
+
+
+class FakeCoinMarket:
+    def format_price(self, price, fiat, symbol=True, convert=True):
+        return str(price)
+
+
+class FakeOutbound:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, destination=None, content=None, embed=None, priority=0):
+        self.sent.append((destination, embed.description))
+
+
+class FakeBot:
+    def get_channel(self, channel_id):
+        return channel_id
+
+
+def make_market(price):
+    market = MarketTable()
+    market.append({"id": 1, "cmc_rank": 1, "slug": "bitcoin", "name": "Bitcoin",
+                   "symbol": "BTC", "circulating_supply": 1, "total_supply": 1,
+                   "max_supply": None, "last_updated": "",
+                   "quote": {"USD": {"price": price, "volume_24h": 1.0,
+                                     "market_cap": 1.0, "percent_change_1h": 0,
+                                     "percent_change_24h": 0,
+                                     "percent_change_7d": 0}}})
+    return market
+
+
+def make_alerts(created):
+    alerts = AlertFunctionality.__new__(AlertFunctionality)
+    alerts.bot = FakeBot()
+    alerts.outbound = FakeOutbound()
+    alerts.coin_market = FakeCoinMarket()
+    alerts.history = None
+    alerts.portfolio = None
+    alerts.window_changes = {}
+    alerts.price_ranges = {}
+    alerts.supported_operators = ["<", ">", "<=", ">="]
+    alerts.market_list = make_market(7100.0)
+    alerts.fetched_at = created
+    alerts.alert_data = {"u": {"1": {"currency": "bitcoin", "channel": "c",
+                                     "operation": "<", "price": "7000",
+                                     "fiat": "USD", "created": created}}}
+    return alerts
+
+
+def refresh(alerts, price, fetched_at):
+    alerts.update(make_market(price), fetched_at=fetched_at)
+    alerts.observe_prices(alerts.market_list, fetched_at)
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def test_crossing_between_checks_triggers(tmpdir, monkeypatch):
+    monkeypatch.chdir(tmpdir)
+    alerts = make_alerts(100)
+    crossings = metrics.counters.get("alerts.crossing_triggers", 0)
+    # the price dips below 7000, but the alert check after that refresh
+    # is skipped, and it is back above 7000 by the next one
+    refresh(alerts, 6900.0, 200)
+    refresh(alerts, 7100.0, 300)
+    run(alerts.alert_user())
+    assert len(alerts.outbound.sent) == 1
+    assert alerts.alert_data["u"] == {}
+    assert metrics.counters["alerts.crossing_triggers"] == crossings + 1
+
+
+def test_no_crossing_no_trigger(tmpdir, monkeypatch):
+    monkeypatch.chdir(tmpdir)
+    alerts = make_alerts(100)
+    refresh(alerts, 7050.0, 200)
+    refresh(alerts, 7100.0, 300)
+    run(alerts.alert_user())
+    assert alerts.outbound.sent == []
+    assert "1" in alerts.alert_data["u"]
+
+
+def test_prices_before_the_alert_was_created_are_ignored(tmpdir, monkeypatch):
+    monkeypatch.chdir(tmpdir)
+    alerts = make_alerts(300)
+    refresh(alerts, 6900.0, 200)
+    refresh(alerts, 7100.0, 300)
+    run(alerts.alert_user())
+    assert alerts.outbound.sent == []
+    # the ranges start over after every check
+    refresh(alerts, 6900.0, 400)
+    refresh(alerts, 7100.0, 500)
+    run(alerts.alert_user())
+    assert len(alerts.outbound.sent) == 1
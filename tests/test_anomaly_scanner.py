@@ -0,0 +1,78 @@
+from cogs.modules.anomaly_scanner import PRICE_SPIKE, VOLUME_SPIKE, AnomalyScanner
+from cogs.modules.market_table import NUMERIC_FIELDS, QUOTE_FIELDS, STRING_FIELDS, MarketTable
+from cogs.modules.subscriber_functionality import SubscriberFunctionality
+from array import array
+import math
+import random
+
+
+class Table:
+    """The parts of MarketTable AnomalyScanner reads"""
+
+    def __init__(self, price, volume=1000.0):
+        self.columns = {"slug": ["coin"], "price": [price], "volume_24h": [volume]}
+        self.index = {"coin": 0}
+
+    def column(self, field):
+        return self.columns[field]
+
+
+def warm_up(scanner, steps, seed=1):
+    """Feeds a random walk with 0.5% moves per period, one sample each"""
+    rng = random.Random(seed)
+    price = 100.0
+    for step in range(steps):
+        price *= math.exp(rng.gauss(0, 0.005))
+        assert scanner.scan(Table(price), step * 300) == []
+    return price
+
+
+def test_ordinary_move_over_a_gap_is_not_a_spike():
+    scanner = AnomalyScanner(window=24, z_score=4, min_change=1)
+    price = warm_up(scanner, 48)
+    # an hour without a sample, then a move of two standard deviations
+    # for an hour: about 3.5% rather than 1%
+    price *= math.exp(2 * 0.005 * math.sqrt(12))
+    assert scanner.scan(Table(price), (47 + 12) * 300) == []
+
+
+def test_spike_after_a_gap_is_found():
+    scanner = AnomalyScanner(window=24, z_score=4, min_change=1)
+    price = warm_up(scanner, 48)
+    price *= 1.15
+    found = scanner.scan(Table(price), (47 + 12) * 300)
+    assert [(kind, slug) for kind, slug, _, _ in found] == [(PRICE_SPIKE, "coin")]
+
+
+def test_volume_spike():
+    scanner = AnomalyScanner(window=4, volume_multiple=5)
+    for step in range(5):
+        scanner.scan(Table(100.0), step * 300)
+    found = scanner.scan(Table(100.0, volume=6000.0), 5 * 300)
+    assert [kind for kind, _, _, _ in found] == [VOLUME_SPIKE]
+
+
+def make_table(coins):
+    """MarketTable of (slug, cmc_rank) in table order"""
+    numbers = {field: array('d', [math.nan] * len(coins))
+               for field in NUMERIC_FIELDS + QUOTE_FIELDS}
+    strings = {field: [""] * len(coins) for field in STRING_FIELDS}
+    for i, (slug, rank) in enumerate(coins):
+        numbers["id"][i] = i + 1
+        numbers["cmc_rank"][i] = rank
+        strings["slug"][i] = slug
+        strings["name"][i] = slug.title()
+        strings["symbol"][i] = slug[:3].upper()
+    return MarketTable(numbers, strings)
+
+
+def test_anomalies_are_listed_by_rank():
+    subscriber = SubscriberFunctionality.__new__(SubscriberFunctionality)
+    # a merged hot refresh leaves the table out of rank order
+    subscriber.market_list = make_table([("dogecoin", 9), ("bitcoin", 1),
+                                         ("delisted", math.nan), ("ethereum", 2)])
+    anomalies = [(VOLUME_SPIKE, slug, 6.0, 1.0)
+                 for slug in ("delisted", "dogecoin", "ethereum", "bitcoin")]
+    lines = subscriber._format_anomalies(anomalies).split("\n")
+    assert [line.split(" ")[0] for line in lines] == ["**Bitcoin", "**Ethereum",
+                                                      "**Dogecoin", "**Delisted"]
@@ -0,0 +1,102 @@
+from cogs.modules.coin_market import COMPACT_ROW, CoinMarket
+from cogs.modules.market_table import MarketTable
+import pytest
+
+RATES = {"USD": 1.0, "EUR": 0.86, "SEK": 9.3}
+
+
+class FakeConverter:
+    def __init__(self):
+        self.calls = 0
+
+    def convert(self, amount, currency, new_currency):
+        self.calls += 1
+        return float(amount) / RATES[currency] * RATES[new_currency]
+
+
+def make_coin(rank, slug, price, market_cap=1.5e9, max_supply=21000000):
+    return {"id": rank, "cmc_rank": rank, "slug": slug, "name": slug.title(),
+            "symbol": slug[:3].upper(), "circulating_supply": 17000000.5,
+            "total_supply": 17000000.5, "max_supply": max_supply,
+            "last_updated": "2018-08-09T21:56:28.000Z",
+            "quote": {"USD": {"price": price, "volume_24h": 4.5e8,
+                              "market_cap": market_cap,
+                              "percent_change_1h": -0.5,
+                              "percent_change_24h": 2.25,
+                              "percent_change_7d": None}}}
+
+
+def make_market(coins):
+    market = MarketTable()
+    for coin in coins:
+        market.append(coin)
+    return market
+
+
+COINS = [make_coin(1, "bitcoin", 8000.123456),
+         make_coin(2, "ethereum", 300.5, max_supply=None),
+         make_coin(3, "tiny", 0.00001234, market_cap=None),
+         make_coin(4, "no-price", None)]
+
+
+def make_coin_market():
+    coin_market = CoinMarket.__new__(CoinMarket)
+    coin_market.converter = FakeConverter()
+    coin_market.indicators = None
+    coin_market.formatted_columns = {}
+    coin_market.compact_rows = {}
+    coin_market.formatted_market = None
+    return coin_market
+
+
+@pytest.mark.parametrize("fiat", sorted(RATES))
+def test_table_rows_match_single_coin_formatting(fiat):
+    coin_market = make_coin_market()
+    market = make_market(COINS)
+    for slug in market:
+        data = market[slug]
+        assert (coin_market._format_table_row(market, data, fiat)
+                == coin_market._format_currency_data(data, fiat, False)[0])
+    text = coin_market._format_table_row(market, market["no-price"], fiat)
+    assert "Price ({}): Unknown".format(fiat) in text
+    assert "Max Supply: Unknown" in coin_market._format_table_row(market, market["ethereum"], fiat)
+
+
+def test_columns_are_formatted_once_per_refresh_and_fiat():
+    coin_market = make_coin_market()
+    market = make_market(COINS)
+    coin_market.get_current_multiple_currency(market, None, ["bitcoin"], "EUR")
+    calls = coin_market.converter.calls
+    columns = coin_market.formatted_columns["EUR"]
+    coin_market.get_current_multiple_currency(market, None, ["ethereum", "tiny"], "EUR")
+    assert coin_market.converter.calls == calls
+    assert coin_market.formatted_columns["EUR"] is columns
+    coin_market.get_current_multiple_currency(market, None, ["bitcoin"], "SEK")
+    assert sorted(coin_market.formatted_columns) == ["EUR", "SEK"]
+    # a refresh hands out a new market list
+    coin_market.get_current_multiple_currency(make_market(COINS), None, ["bitcoin"], "EUR")
+    assert list(coin_market.formatted_columns) == ["EUR"]
+    assert coin_market.formatted_columns["EUR"] is not columns
+
+
+def test_compact_rows_use_the_fiat_formatter():
+    coin_market = make_coin_market()
+    market = make_market(COINS)
+    table = coin_market.get_compact_table(market, None, list(market), "SEK")[0]
+    lines = table.strip("`").split("\n")
+    assert lines[1] == COMPACT_ROW.format("#1", "BIT", "74,401.15 kr", "-0.50", "+2.25", "?")
+    assert lines[3].split()[2:4] == ["0.0001148", "kr"]
+    assert lines[4].split()[2] == "?"
+    usd = coin_market.get_compact_table(market, None, ["bitcoin"], "USD")[0]
+    assert "$8,000.12" in usd
+
+
+def test_compact_rows_are_formatted_once_per_refresh():
+    coin_market = make_coin_market()
+    market = make_market(COINS)
+    first = coin_market.get_compact_table(market, None, ["bitcoin", "tiny"], "EUR")
+    calls = coin_market.converter.calls
+    assert coin_market.get_compact_table(market, None, ["bitcoin", "tiny"], "EUR") == first
+    assert coin_market.converter.calls == calls
+    coin_market.get_compact_table(make_market(COINS), None, ["bitcoin", "tiny"], "EUR")
+    assert coin_market.converter.calls == calls + 2
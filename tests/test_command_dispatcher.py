@@ -0,0 +1,118 @@
+from cogs.modules.command_dispatcher import RATE_LIMITED_MSG, SHED_MSG, CommandDispatcher
+from cogs.modules.rate_limiter import RateLimiter
+import asyncio
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Obj:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class Command:
+    def __init__(self, name):
+        self.name = name
+        self.calls = []
+
+    async def invoke(self, ctx):
+        self.calls.append(ctx.view.read_rest().strip())
+
+
+class Bot:
+    def __init__(self):
+        self.user = Obj(id="99")
+        self.commands = {name: Command(name) for name in ("s", "stats", "addc")}
+
+    def dispatch(self, event, *args):
+        pass
+
+
+class Outbound:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, destination=None, content=None, embed=None, priority=0):
+        self.sent.append((destination, content))
+
+
+def make_message(content, user="u", bot=False):
+    return Obj(content=content,
+               author=Obj(id=user, bot=bot),
+               channel=Obj(id="c"),
+               server=Obj(id="s"))
+
+
+def make_dispatcher(rate_limiter=None):
+    return CommandDispatcher(Bot(), {}, "$", rate_limiter, Outbound())
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def test_unknown_command_searches_for_the_coin():
+    dispatcher = make_dispatcher()
+    run(dispatcher.on_message(make_message("$bitcoin eth")))
+    assert dispatcher.bot.commands["s"].calls == ["bitcoin eth"]
+
+
+def test_mention_gets_the_prefix():
+    dispatcher = make_dispatcher()
+    dispatcher.prefix_list["s"] = "!"
+    run(dispatcher.on_message(make_message("<@99> hi")))
+    assert "`!`" in dispatcher.outbound.sent[0][1]
+
+
+def test_bots_are_ignored():
+    dispatcher = make_dispatcher()
+    run(dispatcher.on_message(make_message("$stats", bot=True)))
+    run(dispatcher.on_message(make_message("<@99>", bot=True)))
+    assert dispatcher.bot.commands["stats"].calls == []
+    assert dispatcher.outbound.sent == []
+
+
+def test_shed_command_spends_no_tokens():
+    limiter = RateLimiter({"user": {"rate": 0, "burst": 1}}, shed_backlog=0, clock=Clock())
+    dispatcher = make_dispatcher(limiter)
+    dispatcher.in_flight = 1
+    # the low priority search is shed, the token is left for addc
+    run(dispatcher.on_message(make_message("$btc")))
+    dispatcher.in_flight = 0
+    run(dispatcher.on_message(make_message("$addc btc")))
+    assert dispatcher.bot.commands["s"].calls == []
+    assert dispatcher.bot.commands["addc"].calls == ["btc"]
+
+
+def test_dropped_commands_are_answered_once_per_interval():
+    clock = Clock()
+    limiter = RateLimiter({"user": {"rate": 0, "burst": 1}}, warn_interval=60, clock=clock)
+    dispatcher = make_dispatcher(limiter)
+    for _ in range(4):
+        run(dispatcher.on_message(make_message("$stats")))
+    assert dispatcher.outbound.sent == [(dispatcher.outbound.sent[0][0], RATE_LIMITED_MSG)]
+    # another user is told too
+    run(dispatcher.on_message(make_message("$stats", user="v")))
+    run(dispatcher.on_message(make_message("$stats", user="v")))
+    assert len(dispatcher.outbound.sent) == 2
+    clock.now = 60
+    run(dispatcher.on_message(make_message("$stats")))
+    assert len(dispatcher.outbound.sent) == 3
+
+
+def test_shed_commands_are_answered():
+    limiter = RateLimiter(shed_backlog=0, clock=Clock())
+    dispatcher = make_dispatcher(limiter)
+    dispatcher.in_flight = 1
+    run(dispatcher.on_message(make_message("$stats")))
+    assert dispatcher.outbound.sent[0][1] == SHED_MSG
@@ -0,0 +1,102 @@
+from bot_metrics import metrics
+from cogs.modules import core_functionality
+from cogs.modules.coin_market import FULL_LISTING_LIMIT
+from cogs.modules.core_functionality import (DAY, FULL_REFRESH, HOT_REFRESH, CoreFunctionality,
+                                             estimate_daily_credits,
+                                             shortest_refresh_interval)
+from cogs.modules.credit_pool import CreditPool, listings_cost
+import json
+import os
+import time
+
+
+TEMPLATE = os.path.join(os.path.dirname(__file__), "..", "config_template.json")
+
+
+class Obj:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+def test_template_defaults_fit_the_budget():
+    with open(TEMPLATE) as template:
+        config = json.load(template)
+    cost = estimate_daily_credits(config["market_refresh_interval"],
+                                  config["full_refresh_interval"],
+                                  config["hot_coin_count"])
+    assert cost <= config["cmc_daily_credits"]
+
+
+def test_estimate_counts_full_and_hot_refreshes():
+    # 288 runs a day, 24 of them full at 26 credits, the rest hot at 3
+    full_cost = listings_cost(FULL_LISTING_LIMIT) + 1
+    assert estimate_daily_credits(300, 3600, 200) == 24 * full_cost + 264 * 3
+
+
+def test_shortest_interval_is_affordable():
+    interval = shortest_refresh_interval(333, 21600, 200)
+    assert estimate_daily_credits(interval, 21600, 200) <= 333
+    assert estimate_daily_credits(interval - 60, 21600, 200) > 333
+
+
+def test_no_interval_when_full_refreshes_cost_too_much():
+    assert shortest_refresh_interval(333, 3600, 200) is None
+
+
+def make_core(clock, market_list):
+    core = CoreFunctionality.__new__(CoreFunctionality)
+    core.coin_market = Obj(credits=CreditPool(["key"], 333, clock=lambda: clock))
+    core.market_list = market_list
+    core.last_full_refresh = None
+    core.full_refresh_interval = 21600
+    core.hot_coin_count = 200
+    core._get_watched_currencies = lambda: set()
+    return core
+
+
+def test_first_refresh_on_warm_snapshot_is_full():
+    # ten minutes into the day the paced allowance is below a full refresh
+    core = make_core(DAY * 100 + 600, market_list={"bitcoin": {}})
+    assert core._choose_refresh() == FULL_REFRESH
+
+
+def test_later_refresh_is_paced():
+    core = make_core(DAY * 100 + 600, market_list={"bitcoin": {}})
+    core.last_full_refresh = 0
+    assert core._choose_refresh() == HOT_REFRESH
+
+
+def test_hot_refreshes_do_not_starve_full_ones(monkeypatch):
+    # 900 credits pay for a hot refresh every 5 minutes, but not for
+    # those plus a full refresh every hour
+    now = DAY * 100
+    monkeypatch.setattr(core_functionality, "time", Obj(monotonic=lambda: now))
+    core = make_core(now, market_list={"bitcoin": {}})
+    core.coin_market.credits = credits = CreditPool(["key"], 900, clock=lambda: now)
+    core.full_refresh_interval = 3600
+    core._get_watched_currencies = lambda: {"bitcoin"}
+    core.last_full_refresh = now
+    full_refreshes = []
+    for run in range(1, 288):
+        now = DAY * 100 + run * 300
+        refresh = core._choose_refresh()
+        if refresh == FULL_REFRESH:
+            credits.record("key", 26)
+            core.last_full_refresh = now
+            full_refreshes.append(now)
+        elif refresh == HOT_REFRESH:
+            credits.record("key", 3)
+    gaps = [b - a for a, b in zip(full_refreshes, full_refreshes[1:])]
+    assert len(full_refreshes) >= 10
+    assert max(gaps) <= 2 * 3600 + 300
+    assert sum(credits.used.values()) <= 900
+
+
+def test_paced_gauge():
+    core = make_core(DAY * 100 + 600, market_list={"bitcoin": {}})
+    core.last_full_refresh = time.monotonic()
+    assert core._choose_refresh() == HOT_REFRESH
+    assert metrics.get_gauge("credits.paced") == 0
+    core.coin_market.credits.record("key", 19)
+    assert core._choose_refresh() is None
+    assert metrics.get_gauge("credits.paced") == 1
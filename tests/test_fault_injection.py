@@ -0,0 +1,174 @@
+from cogs.modules import coin_market, core_functionality
+from cogs.modules.circuit_breaker import (CLOSED, HALF_OPEN, OPEN, CircuitBreaker,
+                                          retry_with_backoff)
+from cogs.modules.coin_market import CoinMarket
+from cogs.modules.core_functionality import FULL_REFRESH, CoreFunctionality
+from cogs.modules.credit_pool import CreditException
+from standin_server import make_server
+import asyncio
+import functools
+import pytest
+import threading
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Obj:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+async def no_sleep(delay):
+    pass
+
+
+@pytest.fixture(scope="module")
+def server():
+    server = make_server(port=0, size=20)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def faults(server):
+    faults = server.RequestHandlerClass.faults
+    yield faults
+    faults.update({name: ["0"] for name in faults.as_dict()})
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture
+def core(server, loop, monkeypatch):
+    """
+    A CoreFunctionality with only what _update_market needs, fetching
+    the whole market from the stand-in on every refresh
+    """
+    monkeypatch.setattr(core_functionality, "retry_with_backoff",
+                        functools.partial(retry_with_backoff, sleep=no_sleep))
+    monkeypatch.setattr(core_functionality, "FETCH_ATTEMPTS", 2)
+    monkeypatch.setattr(coin_market, "REQUEST_TIMEOUT", 0.2)
+    core = CoreFunctionality.__new__(CoreFunctionality)
+    core.bot = Obj(loop=loop)
+    core.coin_market = CoinMarket("key",
+                                  "http://127.0.0.1:{}/v1/".format(server.server_port),
+                                  daily_credits=100000)
+    core.clock = Clock()
+    core.market_breaker = CircuitBreaker("market", 3, 60, clock=core.clock)
+    core.market_list = None
+    core.market_stats = None
+    core.market_fetched_at = None
+    core.market_stale = False
+    core.last_full_refresh = None
+    core.full_refresh_interval = 0
+    core.hot_coin_count = 200
+    core.top_five = []
+    core.top_five_gains = []
+    core.top_five_losses = []
+    core.refresh = lambda: loop.run_until_complete(core._update_market())
+    return core
+
+
+def test_healthy_refresh(core, faults):
+    assert core.refresh()
+    assert len(core.market_list) == 20
+    assert core.market_breaker.state == CLOSED
+    assert not core.market_stale
+
+
+@pytest.mark.parametrize("fault", [{"error_rate": ["1"]},
+                                   {"rate_limit_rate": ["1"]},
+                                   {"malformed_rate": ["1"]},
+                                   {"latency": ["0.5"]}],
+                         ids=["5xx", "429", "malformed", "timeout"])
+def test_faults_open_the_breaker(core, faults, fault):
+    assert core.refresh()
+    faults.update(fault)
+    for _ in range(3):
+        assert not core.refresh()
+    assert core.market_breaker.state == OPEN
+    assert core.market_stale
+    # the last good data keeps being served
+    assert len(core.market_list) == 20
+
+
+def test_breaker_goes_half_open_and_closes(core, faults):
+    faults.update({"error_rate": ["1"]})
+    for _ in range(3):
+        core.refresh()
+    assert core.market_breaker.state == OPEN
+    faults.update({"error_rate": ["0"]})
+    # refused without a request until the reset timeout passes
+    assert not core.refresh()
+    assert core.market_breaker.state == OPEN
+    core.clock.now = 61
+    assert core.refresh()
+    assert core.market_breaker.state == CLOSED
+    assert not core.market_stale
+
+
+def test_failed_probe_opens_the_breaker_again(core, faults):
+    faults.update({"error_rate": ["1"]})
+    for _ in range(3):
+        core.refresh()
+    core.clock.now = 61
+    assert not core.refresh()
+    assert core.market_breaker.state == OPEN
+    assert core.market_breaker.opened_at == 61
+
+
+def test_rate_limit_does_not_exhaust_key(core, faults):
+    faults.update({"rate_limit_rate": ["1"]})
+    assert not core.refresh()
+    assert core.coin_market.credits.get_remaining() == 100000
+
+
+def test_out_of_credits_is_not_a_breaker_failure(core, faults):
+    core._choose_refresh = lambda: FULL_REFRESH
+    core.coin_market.credits.exhaust("key")
+    for _ in range(5):
+        assert not core.refresh()
+    assert core.market_breaker.state == CLOSED
+    assert core.market_breaker.failures == 0
+
+
+def test_out_of_credits_gives_back_the_probe(core, faults):
+    faults.update({"error_rate": ["1"]})
+    for _ in range(3):
+        core.refresh()
+    faults.update({"error_rate": ["0"]})
+    core.clock.now = 61
+    core._choose_refresh = lambda: FULL_REFRESH
+    core.coin_market.credits.exhaust("key")
+    assert not core.refresh()
+    assert core.market_breaker.state == HALF_OPEN
+    # a later refresh can still probe
+    core.coin_market.credits.exhausted.clear()
+    assert core.refresh()
+    assert core.market_breaker.state == CLOSED
+
+
+def test_credit_exception_is_not_retried(loop):
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        raise CreditException("Out of coinmarketcap API credits for today.")
+
+    with pytest.raises(CreditException):
+        loop.run_until_complete(retry_with_backoff(fetch, 4, sleep=no_sleep))
+    assert len(calls) == 1
@@ -0,0 +1,63 @@
+from cogs.modules.fuzzy_search import FuzzySearch
+from cogs.modules.market_table import MarketTable
+
+
+def make_market(coins):
+    market = MarketTable()
+    for rank, (slug, name, symbol) in enumerate(coins, 1):
+        market.append({"id": rank, "cmc_rank": rank, "slug": slug, "name": name,
+                       "symbol": symbol, "circulating_supply": 1, "total_supply": 1,
+                       "max_supply": None, "last_updated": "",
+                       "quote": {"USD": {"price": 1.0, "volume_24h": 1.0,
+                                         "market_cap": 1e12 / rank,
+                                         "percent_change_1h": 0,
+                                         "percent_change_24h": 0,
+                                         "percent_change_7d": 0}}})
+    return market
+
+
+COINS = [("bitcoin", "Bitcoin", "BTC"), ("ethereum", "Ethereum", "ETH"),
+         ("litecoin", "Litecoin", "LTC"), ("bitcoin-cash", "Bitcoin Cash", "BCH"),
+         ("ethereum-classic", "Ethereum Classic", "ETC")]
+
+
+def test_typos_are_suggested_by_market_cap():
+    search = FuzzySearch()
+    search.update(make_market(COINS))
+    assert search.suggest("etherium")[0] == "ethereum"
+    assert search.suggest("bitcoin cach") == ["bitcoin", "bitcoin-cash"]
+    assert search.suggest("hello") == []
+    assert search.suggest("et") == []
+
+
+def test_capped_search_scores_the_rarest_trigrams_only():
+    market = make_market(COINS)
+    capped = FuzzySearch(max_candidates=1)
+    capped.update(market)
+    uncapped = FuzzySearch(max_candidates=None)
+    uncapped.update(market)
+    # 'n c', ' ca' and 'cas' are only in 'bitcoin cash', 'bitcoin' shares
+    # nothing but common trigrams with the query
+    assert capped.suggest("bitcoin cas") == ["bitcoin-cash"]
+    assert uncapped.suggest("bitcoin cas") == ["bitcoin", "bitcoin-cash"]
+
+
+def test_equal_market_caps_are_ordered_by_slug():
+    market = make_market([("bitcoin-gold", "Bitcoin Gold", "BTG"),
+                          ("bitcoin-cash", "Bitcoin Cash", "BCH"),
+                          ("bitcoin-sv", "Bitcoin SV", "BSV")])
+    for i in range(len(market)):
+        market.column("market_cap")[i] = 1e9
+    search = FuzzySearch()
+    search.update(market)
+    assert search.suggest("bitcoin") == ["bitcoin-cash", "bitcoin-gold", "bitcoin-sv"]
+
+
+def test_new_and_delisted_coins_are_reindexed():
+    search = FuzzySearch()
+    search.update(make_market(COINS))
+    search.update(make_market([("bitcoin", "Bitcoin", "BTC"),
+                               ("polygon", "Polygon", "MATIC")]))
+    assert "litecoin" not in search.suggest("litcoin")
+    assert search.suggest("polgon") == ["polygon"]
+    assert set(search.entries) == {"bitcoin", "polygon"}
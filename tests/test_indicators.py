@@ -0,0 +1,64 @@
+from cogs.modules.indicators import EMA, INDICATORS, RSI, SMA, VOLATILITY, IndicatorEngine
+import math
+import pytest
+
+
+class Table:
+    """The parts of MarketTable IndicatorEngine reads"""
+
+    def __init__(self, prices):
+        self.columns = {"id": [float(coin_id) for coin_id in prices],
+                        "price": list(prices.values())}
+        self.index = {"coin-{}".format(coin_id): i for i, coin_id in enumerate(prices)}
+
+    def column(self, field):
+        return self.columns[field]
+
+
+def prices_at(step):
+    return 100 + 10 * math.sin(step / 3) + step * 0.5
+
+
+def test_sparse_coin_matches_coin_sampled_every_period():
+    # coin 1 is refreshed every period, coin 2 only every 12th, with its
+    # price held in between: both must end up with the same indicators
+    engine = IndicatorEngine(period=14, resolution=300)
+    price = None
+    for step in range(100):
+        if step % 12 == 0:
+            price = prices_at(step)
+        engine.update(Table({1: price}), step * 300)
+        if step % 12 == 0:
+            engine.update(Table({2: price}), step * 300, ["coin-2"])
+    engine.update(Table({1: 150.0, 2: 150.0}), 100 * 300)
+    for indicator in INDICATORS:
+        assert engine.get(2, indicator) == pytest.approx(engine.get(1, indicator))
+
+
+def test_long_gap_skips_ahead_like_stepping():
+    stepped = IndicatorEngine(period=5, resolution=60)
+    skipped = IndicatorEngine(period=5, resolution=60)
+    for step in range(10):
+        price = prices_at(step)
+        stepped.update(Table({1: price}), step * 60)
+        skipped.update(Table({1: price}), step * 60)
+    last = prices_at(9)
+    for step in range(10, 60):
+        stepped.update(Table({1: last}), step * 60)
+    stepped.update(Table({1: 120.0}), 60 * 60)
+    skipped.update(Table({1: 120.0}), 60 * 60)
+    assert skipped.samples[0] == stepped.samples[0]
+    for indicator in INDICATORS:
+        assert skipped.get(1, indicator) == pytest.approx(stepped.get(1, indicator))
+
+
+def test_one_sample_per_period():
+    engine = IndicatorEngine(period=2, resolution=300)
+    engine.update(Table({1: 10.0}), 0)
+    engine.update(Table({1: 20.0}), 299)
+    assert engine.get(1, SMA) is None
+    engine.update(Table({1: 30.0}), 300)
+    assert engine.get(1, SMA) == 20.0
+    assert engine.get(1, EMA) is not None
+    assert engine.get(1, RSI) is None
+    assert engine.get(1, VOLATILITY) is None
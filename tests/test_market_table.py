@@ -0,0 +1,95 @@
+from cogs.modules.market_table import MarketTable, MarketTableException, parse_listings
+import json
+import pytest
+import random
+
+
+def make_coin(rank, name, symbol, slug, price, max_supply=None):
+    return {"id": rank, "name": name, "symbol": symbol, "slug": slug, "cmc_rank": rank,
+            "circulating_supply": 18000000.25, "total_supply": 18000000.25,
+            "max_supply": max_supply, "last_updated": "2018-08-09T21:56:28.000Z",
+            "tags": ["mineable"], "platform": None,
+            "quote": {"USD": {"price": price, "volume_24h": 4.5e9,
+                              "percent_change_1h": -0.5, "percent_change_24h": 12,
+                              "percent_change_7d": None, "market_cap": 1.23e-4,
+                              "last_updated": "2018-08-09T21:56:28.000Z"}}}
+
+
+LISTINGS = [
+    make_coin(1, "Bitcoin", "BTC", "bitcoin", 8000.5, 21000000),
+    make_coin(2, 'Say "Coin" \\ Co', "Q\\", "quote-coin", 1.5e-05),
+    make_coin(3, "Café Ñandú 🚀", "ÇÅ€", "cafe", None),
+    make_coin(4, "Line\nTab\t", "LT", "line-tab", 12345678901234.0)
+]
+RESPONSE = {"status": {"timestamp": "2018-08-09T21:57:27.000Z", "error_code": 0,
+                       "error_message": None, "credit_count": 1},
+            "data": LISTINGS,
+            "credit_rate": 1.5e3}
+PAYLOADS = {
+    # \\u escapes, including a surrogate pair
+    "escaped": json.dumps(RESPONSE).encode(),
+    # multi-byte utf-8 that can be cut in the middle of a character
+    "utf-8": json.dumps(RESPONSE, ensure_ascii=False, indent=1).encode("utf-8")
+}
+
+
+def expected_rows():
+    table = MarketTable()
+    for coin in LISTINGS:
+        table.append(coin)
+    return [table[slug] for slug in table]
+
+
+def parse(chunks):
+    table = parse_listings(chunks)
+    assert table.status == RESPONSE["status"]
+    return [table[slug] for slug in table]
+
+
+@pytest.mark.parametrize("name", sorted(PAYLOADS))
+def test_every_split_offset(name):
+    payload = PAYLOADS[name]
+    expected = expected_rows()
+    for offset in range(len(payload) + 1):
+        assert parse([payload[:offset], payload[offset:]]) == expected, offset
+
+
+@pytest.mark.parametrize("name", sorted(PAYLOADS))
+def test_random_chunk_sizes(name):
+    payload = PAYLOADS[name]
+    expected = expected_rows()
+    rand = random.Random(1)
+    for _ in range(200):
+        chunks = []
+        position = 0
+        while position < len(payload):
+            size = rand.randint(1, 40)
+            chunks.append(payload[position:position + size])
+            position += size
+        assert parse(chunks) == expected
+
+
+def test_one_byte_chunks():
+    payload = PAYLOADS["utf-8"]
+    rows = parse(payload[i:i + 1] for i in range(len(payload)))
+    assert rows == expected_rows()
+    assert rows[1]["name"] == 'Say "Coin" \\ Co'
+    assert rows[2]["name"] == "Café Ñandú 🚀"
+
+
+def test_empty_data():
+    table = parse_listings([b'{"status": {"error_code": 0}, "data": []}'])
+    assert len(table) == 0
+    assert table.status == {"error_code": 0}
+
+
+def test_missing_data_raises():
+    with pytest.raises(MarketTableException):
+        parse_listings([b'{"status": {"error_code": 1002}}'])
+
+
+def test_truncated_response_raises():
+    payload = PAYLOADS["escaped"]
+    for offset in (1, len(payload) // 2, len(payload) - 1):
+        with pytest.raises((MarketTableException, ValueError)):
+            parse_listings([payload[:offset]])
@@ -0,0 +1,128 @@
+from cogs.modules.number_format import (fiat_currencies, fiat_suffix, format_count,
+                                        format_counts, format_number, format_numbers,
+                                        format_short, get_formatter)
+import pytest
+import random
+
+FIATS = sorted(fiat_currencies)
+random.seed(1)
+VALUES = [0, 0.0, 1, 1.0, 8000, 8000.0, 0.1, 100.5, 1e-7, 5e-7, 4e-7, 0.999999,
+          0.9999995, 123456789.123456, 2.3e11, 1e15, 2.0 ** 53, 1e20, -3.5, -1e-7]
+VALUES += [random.random() * 10 ** random.randint(-9, 12) for _ in range(200)]
+
+
+# the formatting CoinMarket did inline before the formatters existed
+
+def baseline_format_price(price, fiat):
+    if fiat in fiat_suffix:
+        formatted_fiat = "{:,.6f} {}".format(float(price), fiat_currencies[fiat])
+    else:
+        formatted_fiat = "{}{:,.6f}".format(fiat_currencies[fiat], float(price))
+    formatted_fiat = formatted_fiat.rstrip('0')
+    if formatted_fiat.endswith('.'):
+        formatted_fiat = formatted_fiat.replace('.', '')
+    return formatted_fiat
+
+
+def baseline_price(price, fiat):
+    converted_price = "{:,.6f}".format(price).rstrip('0')
+    if converted_price.endswith('.'):
+        converted_price = converted_price.replace('.', '')
+    if fiat in fiat_suffix:
+        return '{} {}'.format(converted_price, fiat_currencies[fiat])
+    return '{}{}'.format(fiat_currencies[fiat], converted_price)
+
+
+def baseline_amount(amount, fiat):
+    if fiat in fiat_suffix:
+        return '{:,} {}'.format(int(amount), fiat_currencies[fiat])
+    return '{}{:,}'.format(fiat_currencies[fiat], int(amount))
+
+
+def baseline_count(value):
+    return '{:,}'.format(int(float(value)))
+
+
+@pytest.mark.parametrize("fiat", FIATS)
+def test_price_matches_baseline(fiat):
+    formatter = get_formatter(fiat)
+    for value in VALUES:
+        assert formatter.price(value) == baseline_price(value, fiat)
+
+
+@pytest.mark.parametrize("fiat", FIATS)
+def test_quote_matches_format_price(fiat):
+    formatter = get_formatter(fiat)
+    for value in VALUES:
+        assert formatter.quote(value) == baseline_format_price(value, fiat)
+
+
+@pytest.mark.parametrize("fiat", FIATS)
+def test_amount_matches_baseline(fiat):
+    formatter = get_formatter(fiat)
+    for value in VALUES:
+        assert formatter.amount(value) == baseline_amount(value, fiat)
+
+
+def test_count_matches_baseline():
+    for value in VALUES + ["21000000", "1.5e9", 18446744073709551615]:
+        assert format_count(value) == baseline_count(value)
+
+
+def test_edge_values():
+    usd = get_formatter("USD")
+    assert usd.price(1e-7) == "$0"
+    assert usd.price(8000.0) == "$8,000"
+    assert usd.quote(1e-7) == "$0"
+    assert usd.amount(1e15) == "$1,000,000,000,000,000"
+    sek = get_formatter("SEK")
+    assert sek.price(0.5) == "0.5 kr"
+    assert sek.quote(0.5) == "0.500000 kr"
+    # a whole price drops the '.' of the symbol too, as format_price did
+    chf = get_formatter("CHF")
+    assert chf.price(8000.0) == "Fr.8,000"
+    assert chf.quote(8000.0) == "Fr8,000"
+    assert chf.quote(8000.5) == "Fr.8,000.5"
+
+
+@pytest.mark.parametrize("fiat", ["USD", "SEK", "CHF"])
+def test_none_fails_like_baseline(fiat):
+    formatter = get_formatter(fiat)
+    for method, baseline in ((formatter.price, baseline_price),
+                             (formatter.quote, baseline_format_price),
+                             (formatter.amount, baseline_amount)):
+        with pytest.raises(TypeError):
+            baseline(None, fiat)
+        with pytest.raises(TypeError):
+            method(None)
+    with pytest.raises(TypeError):
+        format_count(None)
+
+
+@pytest.mark.parametrize("fiat", FIATS)
+def test_columns_match_single_values(fiat):
+    formatter = get_formatter(fiat)
+    assert formatter.prices(VALUES) == list(map(formatter.price, VALUES))
+    assert formatter.amounts(VALUES) == list(map(formatter.amount, VALUES))
+    assert formatter.quotes(VALUES) == list(map(formatter.quote, VALUES))
+    assert list(format_numbers(VALUES)) == list(map(format_number, VALUES))
+    assert format_counts(VALUES) == list(map(format_count, VALUES))
+
+
+def test_missing_values_in_columns():
+    nan = float("nan")
+    usd = get_formatter("USD")
+    # a MarketTable column keeps missing values as NaN, which int() refuses
+    assert usd.amounts([1e9, nan]) == ["$1,000,000,000", "$0"]
+    assert format_counts([nan, "21000000"]) == ["0", "21,000,000"]
+    assert usd.prices([nan]) == ["$nan"]
+
+
+def test_short_prices():
+    assert format_short(8000.126) == "8,000.13"
+    assert format_short(1) == "1.00"
+    assert format_short(0.5) == "0.5000"
+    assert format_short(0.00001234) == "0.00001234"
+    assert format_short(0) == format_short(-1) == "0"
+    assert get_formatter("USD").short_price(0.5) == "$0.5000"
+    assert get_formatter("SEK").short_price(12.5) == "12.50 kr"
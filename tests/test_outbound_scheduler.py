@@ -0,0 +1,103 @@
+from cogs.modules.outbound_scheduler import ALERT, BULK, INTERACTIVE, OutboundScheduler
+import asyncio
+
+
+class Channel:
+    def __init__(self, channel_id):
+        self.id = channel_id
+
+
+class FakeBot:
+    """Records sends; sends to slow channels take `delay` seconds"""
+
+    def __init__(self, loop, slow=(), delay=0.2):
+        self.loop = loop
+        self.slow = set(slow)
+        self.delay = delay
+        self.sent = []
+
+    async def send_message(self, destination, content=None, embed=None):
+        if destination.id in self.slow:
+            await asyncio.sleep(self.delay)
+        self.sent.append((destination.id, content, self.loop.time()))
+        return content
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro(loop))
+    finally:
+        loop.close()
+
+
+async def stop(scheduler):
+    for task in scheduler.tasks:
+        task.cancel()
+    await asyncio.gather(*scheduler.tasks, return_exceptions=True)
+
+
+def test_reply_is_not_held_up_by_busy_channel():
+    async def scenario(loop):
+        bot = FakeBot(loop, slow={"a"})
+        scheduler = OutboundScheduler(bot, workers=2)
+        scheduler.start()
+        bulk = scheduler.submit(Channel("a"), "bulk", priority=BULK)
+        await asyncio.sleep(0.01)
+        # both workers would otherwise end up waiting for channel "a"
+        busy = scheduler.submit(Channel("a"), "reply a", priority=INTERACTIVE)
+        free = scheduler.submit(Channel("b"), "reply b", priority=INTERACTIVE)
+        await free
+        assert not bulk.done()
+        await asyncio.gather(bulk, busy)
+        await stop(scheduler)
+        return bot.sent
+
+    sent = run(scenario)
+    assert [content for _, content, _ in sent] == ["reply b", "bulk", "reply a"]
+
+
+def test_messages_to_a_channel_keep_their_order():
+    async def scenario(loop):
+        bot = FakeBot(loop, slow={"a"}, delay=0.01)
+        scheduler = OutboundScheduler(bot, workers=4)
+        scheduler.start()
+        futures = [scheduler.submit(Channel("a"), str(i), priority=ALERT)
+                   for i in range(5)]
+        await asyncio.gather(*futures)
+        await stop(scheduler)
+        return bot.sent
+
+    sent = run(scenario)
+    assert [content for _, content, _ in sent] == ["0", "1", "2", "3", "4"]
+
+
+def test_bulk_is_sent_with_one_general_worker():
+    async def scenario(loop):
+        bot = FakeBot(loop)
+        scheduler = OutboundScheduler(bot, workers=2)
+        scheduler.start()
+        await asyncio.sleep(0)
+        await asyncio.wait_for(scheduler.submit(Channel("a"), "bulk", priority=BULK), 1)
+        await stop(scheduler)
+        assert scheduler.get_backlog() == 0
+        assert not scheduler.busy_channels
+
+    run(scenario)
+
+
+def test_priority_worker_never_sends_bulk():
+    async def scenario(loop):
+        bot = FakeBot(loop, slow={"a"})
+        scheduler = OutboundScheduler(bot, workers=2)
+        scheduler.start()
+        first = scheduler.submit(Channel("a"), "bulk a", priority=BULK)
+        second = scheduler.submit(Channel("b"), "bulk b", priority=BULK)
+        await asyncio.sleep(0.05)
+        # the general worker is busy with "a", the priority worker leaves "b"
+        assert not second.done()
+        assert scheduler.get_backlog() == 1
+        await asyncio.gather(first, second)
+        await stop(scheduler)
+
+    run(scenario)
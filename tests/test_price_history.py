@@ -0,0 +1,87 @@
+from bot_metrics import metrics
+from cogs.modules.price_history import PriceHistory
+
+
+class Table:
+    """The parts of MarketTable PriceHistory reads"""
+
+    def __init__(self, coins):
+        self.columns = {"id": [], "price": [], "volume_24h": [], "market_cap": []}
+        self.index = {}
+        for i, (coin_id, price) in enumerate(coins):
+            self.columns["id"].append(float(coin_id))
+            self.columns["price"].append(price)
+            self.columns["volume_24h"].append(price * 10)
+            self.columns["market_cap"].append(price * 100)
+            self.index["coin-{}".format(coin_id)] = i
+
+    def column(self, field):
+        return self.columns[field]
+
+
+def make_history(tmpdir, max_coins=2):
+    # 4 slots of 60 seconds
+    return PriceHistory(str(tmpdir.join("history.bin")), 60, 240, max_coins)
+
+
+def test_lookup_and_change(tmpdir):
+    history = make_history(tmpdir)
+    history.record(Table([(1, 100.0)]), 600)
+    history.record(Table([(1, 110.0)]), 660)
+    assert history.lookup(1, 600)[1] == 100.0
+    assert round(history.get_change(1, 60, 660), 3) == 10.0
+
+
+def test_full_history_drops_and_counts_new_coins(tmpdir):
+    history = make_history(tmpdir)
+    dropped = metrics.counters.get("history.dropped_coins", 0)
+    history.record(Table([(1, 1.0), (2, 2.0), (3, 3.0)]), 600)
+    assert history.lookup(3, 600) is None
+    assert metrics.counters["history.dropped_coins"] == dropped + 1
+
+
+def test_delisted_coin_row_is_reclaimed(tmpdir):
+    history = make_history(tmpdir)
+    history.record(Table([(1, 1.0), (2, 2.0)]), 600)
+    # coin 1 is delisted; once its samples are older than the retention
+    # its row goes to the new coin 3
+    history.record(Table([(2, 2.0), (3, 3.0)]), 720)
+    assert history.lookup(3, 720) is None
+    history.record(Table([(2, 2.0), (3, 3.0)]), 900)
+    assert history.lookup(3, 900)[1] == 3.0
+    assert history.lookup(1, 600) is None
+    assert history.lookup(2, 900)[1] == 2.0
+
+
+def test_reclaimed_rows_survive_reopening(tmpdir):
+    history = make_history(tmpdir)
+    history.record(Table([(1, 1.0), (2, 2.0)]), 600)
+    history.record(Table([(2, 2.0)]), 900)
+    history.flush()
+    reopened = make_history(tmpdir)
+    assert reopened.last_periods[reopened.rows[2]] == 15
+    reopened.record(Table([(2, 2.0), (3, 3.0)]), 960)
+    assert reopened.lookup(3, 960)[1] == 3.0
+    assert 1 not in reopened.rows
+
+
+def test_windows_at_the_default_refresh_interval(tmpdir):
+    # 5 minute slots, a coin is recorded every 20 minutes
+    history = PriceHistory(str(tmpdir.join("default.bin")), 300, 86400, 2,
+                           sample_interval=1200)
+    assert not history.covers(300)
+    assert not history.covers(900)
+    assert history.covers(1200)
+    assert history.covers(86400 - 300)
+    start = 1000 * 1200
+    for run in range(12):
+        # the 9th refresh is skipped
+        if run != 8:
+            history.record(Table([(1, 100.0 + run)]), start + run * 1200 + 3)
+    now = start + 11 * 1200 + 3
+    assert round(history.get_change(1, 1200, now), 3) == round(1 / 110 * 100, 3)
+    # between two samples, the earlier one is used
+    assert round(history.get_change(1, 1800, now), 3) == round(2 / 109 * 100, 3)
+    # the sample a window back was skipped, the one before is found
+    assert round(history.get_change(1, 3 * 1200, now), 3) == round(4 / 107 * 100, 3)
+    assert round(history.get_change(1, 3600, now - 1200), 3) == round(3 / 107 * 100, 3)
@@ -0,0 +1,64 @@
+from cogs.modules.rate_limiter import DEFAULT_LIMITS, RateLimiter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Obj:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+def make_message(user="u", channel="c", server="s"):
+    return Obj(author=Obj(id=user),
+               channel=Obj(id=channel),
+               server=Obj(id=server) if server else None)
+
+
+def test_partial_override_keeps_default_keys():
+    limiter = RateLimiter({"user": {"rate": 1}}, clock=Clock())
+    assert limiter.limits["user"] == {"rate": 1, "burst": DEFAULT_LIMITS["user"]["burst"]}
+    assert limiter.limits["channel"] == DEFAULT_LIMITS["channel"]
+    assert limiter.allow(make_message())
+
+
+def test_override_does_not_change_defaults():
+    RateLimiter({"server": {"burst": 1}})
+    assert DEFAULT_LIMITS["server"]["burst"] == 20
+
+
+def test_burst_then_refill():
+    clock = Clock()
+    limiter = RateLimiter({"user": {"rate": 1, "burst": 2}}, clock=clock)
+    message = make_message()
+    assert limiter.allow(message)
+    assert limiter.allow(message)
+    assert not limiter.allow(message)
+    clock.now += 1
+    assert limiter.allow(message)
+
+
+def test_rejected_scope_spends_no_tokens():
+    clock = Clock()
+    limiter = RateLimiter({"channel": {"rate": 0, "burst": 1}}, clock=clock)
+    assert limiter.allow(make_message(user="a"))
+    assert not limiter.allow(make_message(user="b"))
+    # user b's token wasn't spent by the rejected command
+    assert limiter.buckets["user"]["b"].tokens == DEFAULT_LIMITS["user"]["burst"]
+
+
+def test_direct_messages_have_no_server_scope():
+    limiter = RateLimiter(clock=Clock())
+    assert limiter.allow(make_message(server=None))
+    assert "server" not in {scope for scope, buckets in limiter.buckets.items() if buckets}
+
+
+def test_sheds_only_above_backlog():
+    limiter = RateLimiter(shed_backlog=50)
+    assert not limiter.should_shed(50)
+    assert limiter.should_shed(51)
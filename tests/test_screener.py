@@ -0,0 +1,94 @@
+from bot_metrics import metrics
+from cogs.modules.market_table import MarketTable
+from cogs.modules.screener import MAX_LIMIT, Screener, ScreenerException
+import operator
+import pytest
+
+
+def make_market(coins):
+    market = MarketTable()
+    for rank, (slug, price, volume) in enumerate(coins, 1):
+        market.append({"id": rank, "cmc_rank": rank, "slug": slug, "name": slug.title(),
+                       "symbol": slug[:3].upper(), "circulating_supply": 1,
+                       "total_supply": 1, "max_supply": None, "last_updated": "",
+                       "quote": {"USD": {"price": price, "volume_24h": volume,
+                                         "market_cap": 1.0,
+                                         "percent_change_1h": 0,
+                                         "percent_change_24h": 0,
+                                         "percent_change_7d": 0}}})
+    return market
+
+
+MARKET = make_market([("bitcoin", 8000.0, 5e9), ("ethereum", 300.0, 2e9),
+                      ("ripple", 0.5, 4e8), ("no-price", None, 1e9),
+                      ("dogecoin", 0.002, 1e8)])
+
+
+@pytest.mark.parametrize("term, compare", [("price>=5", operator.ge),
+                                           ("price<=5", operator.le),
+                                           ("price!=5", operator.ne),
+                                           ("price>5", operator.gt),
+                                           ("price<5", operator.lt),
+                                           ("price=5", operator.eq)])
+def test_longest_operator_wins(term, compare):
+    filters = Screener().parse(term)[0]
+    assert filters == (("price", compare, 5.0),)
+
+
+def test_options():
+    screener = Screener()
+    assert screener.parse("change24h>-5 volume>5e7") == (
+        (("percent_change_24h", operator.gt, -5.0), ("volume_24h", operator.gt, 5e7)),
+        "percent_change_24h", True, 10, "USD")
+    # rank sorts ascending, a '-' reverses either way
+    assert screener.parse("sort=rank limit=3 fiat=eur")[1:] == ("cmc_rank", False, 3, "EUR")
+    assert screener.parse("sort=-rank")[1:3] == ("cmc_rank", True)
+    assert screener.parse("price>1 sort=-volume")[1:3] == ("volume_24h", False)
+
+
+@pytest.mark.parametrize("query", ["", "limit=5", "limit=0",
+                                   "price>1 limit={}".format(MAX_LIMIT + 1),
+                                   "price>1 limit=x", "colour>1", "price>cheap",
+                                   "price", "sort=colour"])
+def test_invalid_queries(query):
+    with pytest.raises(ScreenerException):
+        Screener().parse(query)
+
+
+def test_filter_and_sort():
+    screener = Screener()
+    assert screener.screen(MARKET, "price>0.01 sort=volume") == (
+        ["bitcoin", "ethereum", "ripple"], "USD")
+    assert screener.screen(MARKET, "volume>1e8 sort=-price limit=2")[0] == [
+        "ripple", "ethereum"]
+    assert screener.screen(MARKET, "rank<=3 sort=rank")[0] == [
+        "bitcoin", "ethereum", "ripple"]
+    assert screener.screen(MARKET, "price=300")[0] == ["ethereum"]
+
+
+def test_coins_missing_a_value_are_dropped():
+    screener = Screener()
+    # sorted by price, which 'no-price' doesn't have
+    assert "no-price" not in screener.screen(MARKET, "volume>0 sort=price limit=50")[0]
+    # filtered on price, sorted by something else
+    assert "no-price" not in screener.screen(MARKET, "price!=1 sort=volume limit=50")[0]
+    assert "no-price" not in screener.screen(MARKET, "price<1e9 sort=volume limit=50")[0]
+
+
+def test_results_are_kept_for_one_market_list():
+    screener = Screener()
+    cached = metrics.counters.get("screener.cached", 0)
+    first = screener.screen(MARKET, "price>1")[0]
+    assert screener.screen(MARKET, "price>1")[0] is first
+    assert metrics.counters["screener.cached"] == cached + 1
+    # a refresh hands out a new market list, results are worked out again
+    refreshed = make_market([("ethereum", 300.0, 2e9)])
+    assert screener.screen(refreshed, "price>1")[0] == ["ethereum"]
+    assert metrics.counters["screener.cached"] == cached + 1
+    assert len(screener.results) == 1
+
+
+def test_parsed_queries_are_reused():
+    screener = Screener()
+    parsed = screener.parse("price>1")
+    assert screener.parse("price>1") is parsed
@@ -0,0 +1,179 @@
+from cogs.modules.task_scheduler import (MISSED_CATCH_UP, OVERLAP_ALLOW,
+                                         PeriodicJob, TaskScheduler)
+import asyncio
+import pytest
+
+
+class Clock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class Recorder:
+    """Job function that records when it ran and can be held open"""
+
+    def __init__(self, clock, fail=False):
+        self.clock = clock
+        self.fail = fail
+        self.calls = []
+        self.release = None
+
+    async def __call__(self):
+        self.calls.append(self.clock())
+        if self.release is not None:
+            await self.release.wait()
+        if self.fail:
+            raise RuntimeError("boom")
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+def settle(loop):
+    """Lets every started run finish"""
+    for _ in range(10):
+        loop.run_until_complete(asyncio.sleep(0))
+
+
+def make_event(loop):
+    async def make():
+        return asyncio.Event()
+    return loop.run_until_complete(make())
+
+
+def make_scheduler(loop, clock, wall=0.0, rand=0.0):
+    return TaskScheduler(loop, clock=clock, wall_clock=lambda: wall + clock(),
+                         rand=lambda: rand)
+
+
+def test_aligned_job_lands_on_wall_clock_multiple(loop):
+    clock = Clock()
+    scheduler = make_scheduler(loop, clock, wall=1234.0)
+    job = PeriodicJob("market", Recorder(clock), 300, align=True)
+    scheduler.add_job(job)
+    # wall clock 1234 -> next multiple of 300 is 1500, 266 seconds away
+    assert job.next_run == 266
+
+
+def test_jitter_does_not_shift_later_slots(loop):
+    clock = Clock()
+    scheduler = make_scheduler(loop, clock, rand=0.5)
+    job = PeriodicJob("presence", Recorder(clock), 3600, jitter=60)
+    scheduler.add_job(job)
+    assert job.next_run == 3630
+    clock.now = 3630
+    scheduler._run_due(clock.now)
+    settle(loop)
+    assert job.slot == 7200
+    assert job.next_run == 7230
+    assert job.func.calls == [3630]
+
+
+def test_overlapping_run_is_skipped(loop):
+    clock = Clock()
+    scheduler = make_scheduler(loop, clock)
+    func = Recorder(clock)
+    func.release = make_event(loop)
+    job = PeriodicJob("market", func, 300)
+    scheduler.add_job(job)
+    clock.now = 300
+    scheduler._run_due(clock.now)
+    settle(loop)
+    clock.now = 600
+    scheduler._run_due(clock.now)
+    settle(loop)
+    assert func.calls == [300]
+    assert job.skipped_runs == 1
+    func.release.set()
+    settle(loop)
+    assert job.runs == 1
+
+
+def test_overlap_allowed_runs_concurrently(loop):
+    clock = Clock()
+    scheduler = make_scheduler(loop, clock)
+    func = Recorder(clock)
+    func.release = make_event(loop)
+    job = PeriodicJob("market", func, 300, overlap=OVERLAP_ALLOW)
+    scheduler.add_job(job)
+    for now in (300, 600):
+        clock.now = now
+        scheduler._run_due(clock.now)
+        settle(loop)
+    assert job.running == 2
+    func.release.set()
+    settle(loop)
+    assert job.runs == 2
+
+
+def test_missed_slots_are_skipped(loop):
+    clock = Clock()
+    scheduler = make_scheduler(loop, clock)
+    job = PeriodicJob("market", Recorder(clock), 300)
+    scheduler.add_job(job)
+    # the bot was busy from 300 until 1000: slots 300, 600 and 900 passed
+    clock.now = 1000
+    scheduler._run_due(clock.now)
+    settle(loop)
+    assert job.func.calls == [1000]
+    assert job.missed_runs == 2
+    assert job.next_run == 1200
+
+
+def test_missed_slots_are_caught_up_behind_running_one(loop):
+    clock = Clock()
+    scheduler = make_scheduler(loop, clock)
+    func = Recorder(clock)
+    job = PeriodicJob("market", func, 300, missed=MISSED_CATCH_UP)
+    scheduler.add_job(job)
+    clock.now = 1000
+    # _run calls _run_due again right away while slots are still due
+    while job.next_run <= clock.now:
+        scheduler._run_due(clock.now)
+    assert job.queued_runs == 2
+    settle(loop)
+    assert len(func.calls) == 3
+    assert job.skipped_runs == 0
+    assert job.queued_runs == 0
+    assert job.next_run == 1200
+
+
+def test_followers_run_only_after_success(loop):
+    clock = Clock()
+    scheduler = make_scheduler(loop, clock)
+    leader = Recorder(clock)
+    follower = Recorder(clock)
+    scheduler.add_job(PeriodicJob("market", leader, 300))
+    scheduler.add_job(PeriodicJob("alerts", follower, follows="market"))
+    scheduler.trigger("market")
+    settle(loop)
+    assert len(follower.calls) == 1
+    leader.fail = True
+    scheduler.trigger("market")
+    settle(loop)
+    assert len(leader.calls) == 2
+    assert len(follower.calls) == 1
+
+
+def test_unchanged_run_does_not_start_followers(loop):
+    clock = Clock()
+    scheduler = make_scheduler(loop, clock)
+    follower = Recorder(clock)
+
+    async def refresh():
+        return False
+
+    job = PeriodicJob("market", refresh, 300)
+    scheduler.add_job(job)
+    scheduler.add_job(PeriodicJob("alerts", follower, follows="market"))
+    scheduler.trigger("market")
+    settle(loop)
+    assert job.runs == 1
+    assert follower.calls == []
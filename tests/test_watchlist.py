@@ -0,0 +1,82 @@
+from bot_metrics import metrics
+from cogs.modules.watchlist_functionality import WatchlistFunctionality
+import asyncio
+
+DAY_START = 737000 * 24  # midnight of some day, in hours since year 1
+
+
+class FakeOutbound:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, destination=None, content=None, embed=None, priority=0):
+        self.sent.append((destination, embed.description))
+
+
+class FakeBot:
+    async def get_user_info(self, user_id):
+        return user_id
+
+
+def make_watchlist(users):
+    watchlist = WatchlistFunctionality.__new__(WatchlistFunctionality)
+    watchlist.bot = FakeBot()
+    watchlist.outbound = FakeOutbound()
+    watchlist.digest_concurrency = 5
+    watchlist.digest_hours = {}
+    watchlist.market_list = {"bitcoin": {}}
+    # rendered lines are cached per fiat, so no market data is needed
+    watchlist.cache_data = {"USD": {"bitcoin": "**Bitcoin** $8,000"}}
+    watchlist.watchlist_data = {user: {"currencies": ["bitcoin"], "fiat": "USD",
+                                       "digest": interval}
+                                for user, interval in users.items()}
+    return watchlist
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def test_nothing_is_due_on_the_first_check():
+    watchlist = make_watchlist({})
+    assert watchlist._due_intervals(DAY_START + 6) == set()
+
+
+def test_due_on_the_hour():
+    watchlist = make_watchlist({})
+    watchlist._due_intervals(DAY_START + 5)
+    assert watchlist._due_intervals(DAY_START + 6) == {"1h", "2h", "3h", "6h"}
+    assert watchlist._due_intervals(DAY_START + 6) == set()
+    assert watchlist._due_intervals(DAY_START + 7) == {"1h"}
+
+
+def test_hours_without_a_refresh_are_caught_up():
+    watchlist = make_watchlist({})
+    late = metrics.counters.get("watchlist.late_digests", 0)
+    watchlist._due_intervals(DAY_START + 23)
+    # no refresh at midnight or 1am
+    assert watchlist._due_intervals(DAY_START + 26) == {"1h", "2h", "3h", "6h",
+                                                        "12h", "24h"}
+    # 2am is still a 1h and 2h digest hour, the others were due at midnight
+    assert metrics.counters["watchlist.late_digests"] == late + 4
+
+
+def test_missed_digest_is_sent_on_the_next_refresh():
+    watchlist = make_watchlist({"a": "6h", "b": "24h", "c": "1h"})
+    run(watchlist.send_digests(DAY_START + 5))
+    assert watchlist.outbound.sent == []
+    run(watchlist.send_digests(DAY_START + 7))
+    assert sorted(user for user, _ in watchlist.outbound.sent) == ["a", "c"]
+
+
+def test_chunks_count_the_newline():
+    watchlist = make_watchlist({})
+    lines = {"coin-{}".format(i): "x" * 999 for i in range(3)}
+    watchlist.cache_data["USD"].update(lines)
+    chunks = watchlist._render_watchlist(list(lines), "USD")
+    assert len(chunks) == 3
+    assert all(len(chunk) < 2000 for chunk in chunks)